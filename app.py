@@ -1,238 +1,275 @@
+import math
+import time
+
 import streamlit as st
-from src.blockchain_utils.credentials import get_client, get_account_credentials
+from src.blockchain_utils.credentials import get_rate_limited_client, get_account_credentials
 from src.services.nft_service import NFTService
 from src.services.nft_marketplace import NFTMarketplace
-from src.repository.nft_repository import NFTRepository
-from src.repository.marketplace_repository import NFTMarketplaceRepository
-import time
+from src.services.app_state_refresher import AppStateRefresher
+from src.services.deployment_pipeline import DeploymentPipeline
+from src.repository.deployment_registry import DeploymentRegistry
+from src.repository.trade_history import TradeHistory
+from src.services.preflight import PreflightError
+from src.services import NetworkInteraction
 import algosdk
 
-client = get_client()
+NFT_CATALOGUE = [
+    {
+        "unit_name": "bot",
+        "asset_name": "Algobot 76",
+        "nft_url": "https://gateway.pinata.cloud/ipfs/QmZBiFNgb6hWj4JYwXc3PL5QqsoHYaGd4dNv2RWZZzSbjY",
+    },
+    {
+        "unit_name": "goan",
+        "asset_name": "Al Goanna 25",
+        "nft_url": "https://ipfs.io/ipfs/QmWxUWbMRfG1fvdopnk1erw6EnY9D8ANrhWEkMfApgXMr5",
+    },
+]
 
-if "admin" not in st.session_state:
-    st.session_state.admin = algosdk.account.generate_account()
-    st.session_state.algobot_owner = st.session_state.admin
-    st.session_state.algoanna_owner = st.session_state.admin
-
-if "buyer_1" not in st.session_state:
-    st.session_state.buyer_1 = algosdk.account.generate_account()
-
-if "app_is_deployed" not in st.session_state:
-    st.session_state.app_is_deployed = False
-
-if "algobot_image" not in st.session_state:
-    st.session_state.algobot_image = None
-
-if "algoanna_image" not in st.session_state:
-    st.session_state.algoanna_image = None
-
-if "transactions" not in st.session_state:
-    st.session_state.transactions = []
+PAGE_SIZE = 10
 
-admin_pk, admin_address = st.session_state.admin
-buyer_1_pk, buyer_1_address = st.session_state.buyer_1
 
-st.title("Fund addresses")
-st.text(f"Admin address: {admin_address}")
-st.text(f"Buyer 1 address: {buyer_1_address}")
+@st.cache(allow_output_mutation=True)
+def get_shared_client():
+    return get_rate_limited_client()
 
-nft_repository = NFTRepository()
 
-if "nfts_deployed" not in st.session_state:
-    st.session_state.nfts_deployed = False
+@st.cache(allow_output_mutation=True)
+def get_app_state_refresher():
+    return AppStateRefresher(client=get_shared_client(), max_entries=4 * PAGE_SIZE)
 
-if "should_deploy_apps" not in st.session_state:
-    st.session_state.should_deploy_apps = True
 
-if "algobot" not in st.session_state:
-    st.session_state.algobot = NFTService(nft_creator_pk=admin_pk,
-                                          nft_creator_address=admin_address,
-                                          client=client,
-                                          unit_name="bot",
-                                          asset_name="Algobot 76",
-                                          nft_url="https://gateway.pinata.cloud/ipfs/QmZBiFNgb6hWj4JYwXc3PL5QqsoHYaGd4dNv2RWZZzSbjY")
+@st.cache(allow_output_mutation=True)
+def get_deployment_registry():
+    return DeploymentRegistry()
 
-if "algoanna" not in st.session_state:
-    st.session_state.algoanna = NFTService(nft_creator_pk=admin_pk,
-                                           nft_creator_address=admin_address,
-                                           client=client,
-                                           unit_name="goan",
-                                           asset_name="Al Goanna 25",
-                                           nft_url="https://ipfs.io/ipfs/QmWxUWbMRfG1fvdopnk1erw6EnY9D8ANrhWEkMfApgXMr5")
 
+@st.cache(allow_output_mutation=True)
+def get_trade_history():
+    return TradeHistory()
 
-# 1. Mint NFTS
 
-def mint_algobot_nft():
-    if st.session_state.algobot.nft_id is None:
-        tx_id = st.session_state.algobot.create_nft()
-        st.session_state.transactions.append(f"Algobot 76 minted in {tx_id}")
+def configured_or_new_account(account_id: int):
+    """
+    The account configured in config.yml, so the listings in the DeploymentRegistry can still be traded after a
+    restart, or a new account when none is configured.
+    """
+    try:
+        private_key, address, _ = get_account_credentials(account_id)
+    except AttributeError:
+        return algosdk.account.generate_account()
+    return private_key, address
 
 
-def mint_algoanna_nft():
-    if st.session_state.algoanna.nft_id is None:
-        tx_id = st.session_state.algoanna.create_nft()
-        st.session_state.transactions.append(f"Al Goanna 025 minted in {tx_id}")
+client = get_shared_client()
+app_state_refresher = get_app_state_refresher()
+registry = get_deployment_registry()
+trade_history = get_trade_history()
 
+if "admin" not in st.session_state:
+    st.session_state.admin = configured_or_new_account(1)
 
-st.title("Step 1: Mint NFTs")
-buttons = st.columns(2)
+if "buyer_1" not in st.session_state:
+    st.session_state.buyer_1 = configured_or_new_account(2)
 
-if st.session_state.algobot.nft_id is None:
-    _ = buttons[0].button("Mint Algobot 76", on_click=mint_algobot_nft)
-else:
-    nft_id = st.session_state.algobot.nft_id
-    if st.session_state.algobot_image is None:
-        st.session_state.algobot_image = nft_repository.nft_image(nft_id)
-
-    buttons[0].image(st.session_state.algobot_image,
-                     caption=f"Algobot 76 with nft_id: {nft_id}",
-                     use_column_width=True)
-
-    if "algobot_market" not in st.session_state:
-        st.session_state.algobot_market = NFTMarketplace(admin_pk=admin_pk,
-                                                         admin_address=admin_address,
-                                                         nft_id=nft_id,
-                                                         client=client)
-
-if st.session_state.algoanna.nft_id is None:
-    _ = buttons[1].button(f"Mint Al Goanna 025", on_click=mint_algoanna_nft)
-else:
-    nft_id = st.session_state.algoanna.nft_id
-    if st.session_state.algoanna_image is None:
-        st.session_state.algoanna_image = nft_repository.nft_image(st.session_state.algoanna.nft_id)
-    buttons[1].image(st.session_state.algoanna_image,
-                     caption=f"Mint Al Goanna 025 with nft_id: {nft_id}",
-                     use_column_width=True)
+if "transactions" not in st.session_state:
+    st.session_state.transactions = []
 
-    if "algoanna_market" not in st.session_state:
-        st.session_state.algoanna_market = NFTMarketplace(admin_pk=admin_pk,
-                                                          admin_address=admin_address,
-                                                          nft_id=nft_id,
-                                                          client=client)
+admin_pk, admin_address = st.session_state.admin
+buyer_1_pk, buyer_1_address = st.session_state.buyer_1
 
-time.sleep(2)
+if "listings" not in st.session_state:
+    accounts = {account[1]: account for account in (st.session_state.admin, st.session_state.buyer_1)}
+    # Listings deployed by earlier sessions are rehydrated from the registry instead of being minted again.
+    records = [record for record in registry.listings()
+               if record.admin_address == admin_address and record.owner_address in accounts]
+    deployed_names = {record.asset_name for record in records}
+
+    # Every listing holds the NFT service, its marketplace once the NFT is minted and the current owner account.
+    st.session_state.listings = [
+        {
+            "nft": NFTService.from_listing_record(record, nft_creator_pk=admin_pk, client=client),
+            "market": NFTMarketplace.from_listing_record(record, admin_pk=admin_pk, client=client),
+            "deployed": True,
+            "owner": accounts[record.owner_address],
+        }
+        for record in records
+    ] + [
+        {
+            "nft": NFTService(nft_creator_pk=admin_pk,
+                              nft_creator_address=admin_address,
+                              client=client,
+                              unit_name=nft["unit_name"],
+                              asset_name=nft["asset_name"],
+                              nft_url=nft["nft_url"]),
+            "market": None,
+            "deployed": False,
+            "owner": st.session_state.admin,
+        }
+        for nft in NFT_CATALOGUE if nft["asset_name"] not in deployed_names
+    ]
+
+listings = st.session_state.listings
 
-st.title("Step 2: Deploy Stateful Smart Contracts that enable the buy/sell interactions")
+st.title("Fund addresses")
+st.text(f"Admin address: {admin_address}")
+st.text(f"Buyer 1 address: {buyer_1_address}")
 
-can_deploy = ("algoanna_market" in st.session_state) and ("algobot_market" in st.session_state)
-if can_deploy and st.session_state.should_deploy_apps:
-    st.warning("Deploying of the Stateful Smart Contracts started...")
 
-    tx_id = st.session_state.algobot_market.app_initialization(nft_owner_address=admin_address)
-    st.session_state.transactions.append(f"ASC1 for Algobot 76 deployed in {tx_id}")
+def page_of(items, page: int):
+    start = (page - 1) * PAGE_SIZE
+    return list(range(start, min(start + PAGE_SIZE, len(items))))
 
-    tx_id = st.session_state.algoanna_market.app_initialization(nft_owner_address=admin_address)
-    st.session_state.transactions.append(f"ASC1 for Al Goanna 025 deployed in {tx_id}")
 
-    tx_id = st.session_state.algobot.change_nft_credentials_txn(
-        escrow_address=st.session_state.algobot_market.escrow_address)
-    st.session_state.transactions.append(f"NFT credentials changed for Algobot 76 in {tx_id}")
+def page_selector(label: str, items):
+    total_pages = max(1, math.ceil(len(items) / PAGE_SIZE))
+    return st.number_input(label, min_value=1, max_value=total_pages, value=1, step=1)
 
-    tx_id = st.session_state.algoanna.change_nft_credentials_txn(
-        escrow_address=st.session_state.algoanna_market.escrow_address)
-    st.session_state.transactions.append(f"NFT credentials changed for Al Goanna 025 in {tx_id}")
 
-    tx_id = st.session_state.algobot_market.initialize_escrow()
-    st.session_state.transactions.append(f"Escrow for Algobot 76 initialized in {tx_id}")
+# 1. Mint NFTS
 
-    tx_id = st.session_state.algoanna_market.initialize_escrow()
-    st.session_state.transactions.append(f"Escrow for Al Goanna 025 initialized in {tx_id}")
+def mint_nft(index: int):
+    listing = listings[index]
+    if listing["nft"].nft_id is None:
+        tx_id = listing["nft"].create_nft()
+        listing["market"] = NFTMarketplace(admin_pk=admin_pk,
+                                           admin_address=admin_address,
+                                           nft_id=listing["nft"].nft_id,
+                                           client=client)
+        st.session_state.transactions.append(f"{listing['nft'].asset_name} minted in {tx_id}")
 
-    tx_id = st.session_state.algobot_market.fund_escrow()
-    st.session_state.transactions.append(f"Escrow for Algobot 76 funded in {tx_id}")
 
-    tx_id = st.session_state.algoanna_market.fund_escrow()
-    st.session_state.transactions.append(f"Escrow for Al Goanna 025 funded in {tx_id}")
+st.title("Step 1: Mint NFTs")
 
-    st.session_state.should_deploy_apps = False
-    st.session_state.app_is_deployed = True
-else:
-    if not can_deploy:
-        st.error("You firs need to mint the NFTs.")
+for index in page_of(listings, page_selector("Mint page", listings)):
+    nft = listings[index]["nft"]
+    columns = st.columns(2)
+    columns[0].image(nft.nft_url, caption=nft.asset_name, use_column_width=True)
+    if nft.nft_id is None:
+        _ = columns[1].button(f"Mint {nft.asset_name}", key=f"mint_{index}", on_click=mint_nft, args=(index,))
     else:
-        st.success("Stateful Smart Contracts were successfully deployed.")
-
-
-def sell_algobot(sell_price: int):
-    nft_owner_pk = st.session_state.algobot_owner[0]
-    tx_id = st.session_state.algobot_market.make_sell_offer(sell_price=sell_price,
-                                                            nft_owner_pk=nft_owner_pk)
-    st.session_state.transactions.append(f"Algobot 76 is put on sale for {sell_price} micro algos in {tx_id}")
+        columns[1].success(f"{nft.asset_name} minted with nft_id: {nft.nft_id}")
 
+# 2. Deploy the marketplaces
 
-def buy_algobot(buy_price: int, owner_address):
-    tx_id = st.session_state.algobot.opt_in(buyer_1_pk)
-    st.session_state.transactions.append(f"Account opted-in for Algobot 76 in {tx_id}")
-
-    tx_id = st.session_state.algobot_market.buy_nft(nft_owner_address=owner_address,
-                                                    buyer_address=buyer_1_address,
-                                                    buyer_pk=buyer_1_pk,
-                                                    buy_price=buy_price)
-    st.session_state.transactions.append(f"Algobot 76 bought by {buyer_1_address} in {tx_id}")
-    st.session_state.algobot_owner = st.session_state.buyer_1
-
+st.title("Step 2: Deploy Stateful Smart Contracts that enable the buy/sell interactions")
 
-def sell_algoanna(sell_price: int):
-    nft_owner_pk = st.session_state.algoanna_owner[0]
-    tx_id = st.session_state.algoanna_market.make_sell_offer(sell_price=sell_price,
-                                                             nft_owner_pk=nft_owner_pk)
 
-    st.session_state.transactions.append(f"Al Goanna 025 is put on sale for {sell_price} micro algos in {tx_id}")
+def deploy_marketplaces():
+    pending = [listing for listing in listings if listing["market"] is not None and not listing["deployed"]]
+    progress = []
 
+    def on_progress(index: int, stage: str, tx_id, error):
+        # Called from the pipeline worker threads, so the messages are only collected here.
+        name = pending[index]["nft"].asset_name
+        if error is None:
+            progress.append(f"{name}: {stage} completed in {tx_id}")
+        else:
+            progress.append(f"{name}: {stage} failed with {error}")
 
-def buy_algoanna(buy_price: int, owner_address):
-    tx_id = st.session_state.algoanna.opt_in(buyer_1_pk)
-    st.session_state.transactions.append(f"Account opted-in for Al Goanna 025 in {tx_id}")
+    pipeline = DeploymentPipeline(listings=[(listing["nft"], listing["market"]) for listing in pending],
+                                  on_progress=on_progress,
+                                  grouped_setup=True,
+                                  registry=registry)
+    results = pipeline.deploy(nft_owner_address=admin_address)
 
-    tx_id = st.session_state.algoanna_market.buy_nft(nft_owner_address=owner_address,
-                                                     buyer_address=buyer_1_address,
-                                                     buyer_pk=buyer_1_pk,
-                                                     buy_price=buy_price)
-    st.session_state.transactions.append(f"Al Goanna 025 bought by {buyer_1_address} in {tx_id}")
-    st.session_state.algoanna_owner = st.session_state.buyer_1
+    st.session_state.transactions.extend(progress)
+    for listing, result in zip(pending, results):
+        listing["deployed"] = result.succeeded
 
 
-if st.session_state.app_is_deployed:
+pending_deployments = [listing for listing in listings if listing["market"] is not None and not listing["deployed"]]
+if pending_deployments:
+    _ = st.button(f"Deploy {len(pending_deployments)} marketplaces", on_click=deploy_marketplaces)
+elif not any(listing["deployed"] for listing in listings):
+    st.error("You first need to mint the NFTs.")
+else:
+    st.success("Stateful Smart Contracts were successfully deployed.")
+
+
+# 3. Buy/Sell
+
+def sell_nft(index: int, sell_price: int):
+    listing = listings[index]
+    try:
+        tx_id = listing["market"].make_sell_offer(sell_price=sell_price,
+                                                  nft_owner_pk=listing["owner"][0],
+                                                  app_state=app_state_refresher.get(listing["market"].app_id))
+    except PreflightError as e:
+        st.session_state.transactions.append(str(e))
+        return
+
+    st.session_state.transactions.append(
+        f"{listing['nft'].asset_name} is put on sale for {sell_price} micro algos in {tx_id}")
+    app_state_refresher.invalidate(listing["market"].app_id)
+
+
+def buy_nft(index: int, buy_price: int, owner_address):
+    listing = listings[index]
+    name = listing["nft"].asset_name
+
+    # The buyer's opt-in, if needed, is part of the atomic buy group.
+    try:
+        tx_id = listing["market"].buy_nft_with_opt_in(nft_owner_address=owner_address,
+                                                      buyer_address=buyer_1_address,
+                                                      buyer_pk=buyer_1_pk,
+                                                      buy_price=buy_price,
+                                                      app_state=app_state_refresher.get(listing["market"].app_id))
+    except PreflightError as e:
+        st.session_state.transactions.append(str(e))
+        return
+
+    st.session_state.transactions.append(f"{name} bought by {buyer_1_address} in {tx_id}")
+    listing["owner"] = st.session_state.buyer_1
+    txinfo = NetworkInteraction.wait_for_confirmation(client, tx_id)
+    trade_history.add_trade(round_number=txinfo["confirmed-round"],
+                            timestamp=int(time.time()),
+                            app_id=listing["market"].app_id,
+                            asa_id=listing["market"].nft_id,
+                            price=buy_price,
+                            buyer=buyer_1_address,
+                            seller=owner_address)
+    registry.update_owner(listing["market"].app_id, buyer_1_address)
+    app_state_refresher.invalidate(listing["market"].app_id)
+
+
+deployed = [index for index, listing in enumerate(listings) if listing["deployed"]]
+
+if deployed:
     st.title("Step 3: Buy/Sell the NFTs")
 
-    algobot_app_state = NFTMarketplaceRepository.load_app_state(st.session_state.algobot_market.app_id)
-
-    st.image(st.session_state.algobot_image,
-             caption=f"Algobot 76 connected with asc1: {st.session_state.algobot_market.app_id}")
-
-    if algobot_app_state["APP_STATE"] == 1:
-        st.warning("The Algobot 76 is not on SALE")
-        price_algobot = st.number_input(f'Algobot 76 Price',
-                                        value=1000000,
-                                        step=100)
-        _ = st.button(f'Sale Algobot 76 for {price_algobot} micro algos', on_click=sell_algobot,
-                      args=(price_algobot,))
-    else:
-        nft_price = algobot_app_state["ASA_PRICE"]
-        nft_seller = algobot_app_state["ASA_OWNER"]
-        st.success(f"The Algobot 76 is on sale for: {nft_price} micro algos by: {nft_seller}")
-        _ = st.button(f'Buy Algobot 76', on_click=buy_algobot,
-                      args=(nft_price, nft_seller))
-
-    algoanna_app_state = NFTMarketplaceRepository.load_app_state(st.session_state.algoanna_market.app_id)
-
-    st.image(st.session_state.algoanna_image,
-             caption=f"Al Goanna 025 connected with asc1: {st.session_state.algoanna_market.app_id}")
-
-    if algoanna_app_state["APP_STATE"] == 1:
-        st.warning("The Al Goanna 025 is not on SALE")
-        price_algoanna = st.number_input(f'Al Goanna 025 Price',
-                                         value=1000000,
-                                         step=100)
-        _ = st.button(f'Sale Al Goanna 025 for {price_algoanna} micro algos', on_click=sell_algoanna,
-                      args=(price_algoanna,))
-    else:
-        nft_price = algoanna_app_state["ASA_PRICE"]
-        nft_seller = algoanna_app_state["ASA_OWNER"]
-        st.success(f"The Al Goanna 025 is on sale for: {nft_price} micro algos by: {nft_seller}")
-        _ = st.button(f'Buy Al Goanna 025', on_click=buy_algoanna,
-                      args=(nft_price, nft_seller))
+    visible = [deployed[position] for position in page_of(deployed, page_selector("Gallery page", deployed))]
+    # Only the listings on the current page are fetched, all of them in one batch.
+    app_states = app_state_refresher.get_many([listings[index]["market"].app_id for index in visible])
+
+    for index in visible:
+        listing = listings[index]
+        name = listing["nft"].asset_name
+        app_id = listing["market"].app_id
+        app_state = app_states[app_id]
+
+        st.image(listing["nft"].nft_url, caption=f"{name} connected with asc1: {app_id}")
+        if app_id in app_state_refresher.refresh_errors:
+            st.warning(f"The state of {name} may be outdated: {app_state_refresher.refresh_errors[app_id]}")
+
+        if app_state["APP_STATE"] == 1:
+            st.warning(f"The {name} is not on SALE")
+            price = st.number_input(f'{name} Price', value=1000000, step=100, key=f"price_{index}")
+            _ = st.button(f'Sale {name} for {price} micro algos', key=f"sell_{index}",
+                          on_click=sell_nft, args=(index, price))
+        else:
+            nft_price = app_state["ASA_PRICE"]
+            nft_seller = app_state["ASA_OWNER"]
+            st.success(f"The {name} is on sale for: {nft_price} micro algos by: {nft_seller}")
+            _ = st.button(f'Buy {name}', key=f"buy_{index}", on_click=buy_nft,
+                          args=(index, nft_price, nft_seller))
+
+if len(trade_history):
+    st.title("Trades")
+    st.text(f"{len(trade_history)} trades, volume {trade_history.volume()} micro algos, "
+            f"floor price {trade_history.floor_price()} micro algos")
+    for address, (sold, bought) in trade_history.turnover_by_owner().items():
+        st.text(f"{address}: sold for {sold}, bought for {bought} micro algos")
 
 st.title("Executed transactions")
 
@@ -0,0 +1,58 @@
+from pyteal import compileTeal, Mode
+
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+from src.simulation.contract_harness import MarketplaceContractHarness
+from src.smart_contracts import NFTMarketplaceASC1, NFTMarketplaceASC1Optimized
+
+
+def count_instructions(teal_source: str) -> int:
+    """
+    Counts the TEAL instructions in a compiled program, ignoring the version pragma, labels, comments and blank lines.
+    :param teal_source: compiled TEAL source code.
+    :return:
+    """
+    instructions = 0
+    for line in teal_source.splitlines():
+        line = line.split("//")[0].strip()
+        if not line or line.startswith("#pragma") or line.endswith(":"):
+            continue
+        instructions += 1
+    return instructions
+
+
+def call_costs(harness: MarketplaceContractHarness) -> dict:
+    """
+    Opcode budget used by each successful call of the approval program, measured by evaluating it.
+    """
+    created_state = harness.created_state()
+    active_state = harness.global_state(app_state=NFTMarketplaceSchema.AppState.active)
+
+    scenarios = {
+        "create": ([harness.create_call()], 0, dict()),
+        "initializeEscrow": (harness.setup_group(), 1, created_state),
+        "makeSellOffer": ([harness.make_sell_offer_call()], 0, active_state),
+        "stopSellOffer": ([harness.stop_sell_offer_call()], 0, None),
+        "buy": (harness.buy_group(), 0, None),
+        "buy with opt-in": (harness.buy_group(with_opt_in=True), 1, None),
+    }
+
+    costs = dict()
+    for name, (txns, index, global_state) in scenarios.items():
+        result = harness.evaluate_app(txns, index=index, global_state=global_state)
+        if not result.approved:
+            raise AssertionError(f"{name} was rejected: {result.error}")
+        costs[name] = result.cost
+    return costs
+
+
+contracts = (NFTMarketplaceASC1(), NFTMarketplaceASC1Optimized())
+before, after = (call_costs(MarketplaceContractHarness(contract)) for contract in contracts)
+
+print(f"{'executed opcodes':<20}{'before':>10}{'after':>10}{'saved':>10}")
+for name in before:
+    print(f"{name:<20}{before[name]:>10}{after[name]:>10}{before[name] - after[name]:>10}")
+
+before_size, after_size = (count_instructions(compileTeal(contract.approval_program(), mode=Mode.Application,
+                                                          version=4))
+                           for contract in contracts)
+print(f"{'program size':<20}{before_size:>10}{after_size:>10}{before_size - after_size:>10}")
@@ -0,0 +1,48 @@
+import argparse
+
+from src.blockchain_utils.credentials import get_rate_limited_client, load_config
+from src.blockchain_utils.offline_pipeline import BatchSubmitter, OfflineSigner
+
+# Sign and submit stages of the offline pipeline. Batch files are prepared with PreparedBatchWriter.
+#   python offline_batch.py sign listings.unsigned listings.signed      (isolated machine, keys from config.yml)
+#   python offline_batch.py submit listings.signed --max-in-flight 16   (network-facing host)
+
+parser = argparse.ArgumentParser(description="Signs or submits a batch file of prepared transactions.")
+subparsers = parser.add_subparsers(dest="stage", required=True)
+
+sign_parser = subparsers.add_parser("sign", help="sign a prepared batch with the keys of the config accounts")
+sign_parser.add_argument("unsigned_path")
+sign_parser.add_argument("signed_path")
+sign_parser.add_argument("--processes", type=int, default=None)
+
+submit_parser = subparsers.add_parser("submit", help="submit a signed batch")
+submit_parser.add_argument("signed_path")
+submit_parser.add_argument("--max-in-flight", type=int, default=8)
+submit_parser.add_argument("--no-wait", action="store_true", help="do not wait for confirmations")
+
+args = parser.parse_args()
+
+if args.stage == "sign":
+    accounts = load_config().get("accounts") or dict()
+    private_keys = {account.get("address"): account.get("private_key")
+                    for account in accounts.values() if isinstance(account, dict)}
+
+    signed, failed = OfflineSigner(private_keys, processes=args.processes).sign_file(args.unsigned_path,
+                                                                                      args.signed_path)
+    print(f"Signed {signed} records, {failed} failed.")
+else:
+    submitter = BatchSubmitter(get_rate_limited_client(),
+                               max_in_flight=args.max_in_flight,
+                               wait_for_confirmation=not args.no_wait)
+
+    failed, expired = 0, 0
+    for result in submitter.submit_file(args.signed_path):
+        if result.expired:
+            expired += 1
+            print(f"Record {result.id} expired and has to be prepared again: {result.error}")
+        elif result.error is not None:
+            failed += 1
+            print(f"Record {result.id} failed: {result.error}")
+        else:
+            print(f"Record {result.id} submitted in {result.tx_id}, confirmed in round {result.confirmed_round}")
+    print(f"{failed} records failed, {expired} expired.")
@@ -1,6 +1,7 @@
 from src.blockchain_utils.credentials import get_client, get_account_credentials
-from src.blockchain_utils.transaction_repository import get_default_suggested_params, ApplicationTransactionRepository, \
-    ASATransactionRepository, PaymentTransactionRepository
+from src.blockchain_utils.transaction_repository import ApplicationTransactionRepository, ASATransactionRepository, \
+    PaymentTransactionRepository
+from src.blockchain_utils.group_builder import GroupTransactionBuilder
 from src.services import NetworkInteraction
 from algosdk import logic as algo_logic
 from algosdk.future import transaction as algo_txn
@@ -141,6 +142,8 @@ print('Opt-in transaction completed')
 # Buy nft
 
 
+group = GroupTransactionBuilder(client)
+
 # 1. Application call txn
 app_args = [
     decentralized_marketplace_contract.AppMethods.buy
@@ -151,7 +154,9 @@ app_call_txn = ApplicationTransactionRepository.call_application(client=client,
                                                                  app_id=app_id,
                                                                  on_complete=algo_txn.OnComplete.NoOpOC,
                                                                  app_args=app_args,
+                                                                 suggested_params=group.suggested_params,
                                                                  sign_transaction=False)
+group.add(app_call_txn, nft_buyer_pk)
 
 # 2. Payment transaction
 asa_buy_txn = PaymentTransactionRepository.payment(client=client,
@@ -159,36 +164,19 @@ asa_buy_txn = PaymentTransactionRepository.payment(client=client,
                                                    receiver_address=acc_address,
                                                    amount=10000,
                                                    sender_private_key=None,
+                                                   suggested_params=group.suggested_params,
                                                    sign_transaction=False)
+group.add(asa_buy_txn, nft_buyer_pk)
 
 # 3. Asset transfer transaction
-sp = get_default_suggested_params(client)
 asa_transfer_txn = algo_txn.AssetTransferTxn(sender=escrow_fund_address,
-                                             sp=sp,
+                                             sp=group.suggested_params,
                                              receiver=nft_buyer_address,
                                              amt=1,
                                              index=nft1_id,
                                              revocation_target=acc_address)  # current owner
+group.add(asa_transfer_txn, algo_txn.LogicSig(escrow_fund_program_bytes))
 
 # Atomic transfer
-gid = algo_txn.calculate_group_id([app_call_txn,
-                                   asa_buy_txn,
-                                   asa_transfer_txn])
-
-app_call_txn.group = gid
-asa_buy_txn.group = gid
-asa_transfer_txn.group = gid
-
-app_call_txn_signed = app_call_txn.sign(nft_buyer_pk)
-
-asa_buy_txn_signed = asa_buy_txn.sign(nft_buyer_pk)
-
-asa_transfer_txn_logic_signature = algo_txn.LogicSig(escrow_fund_program_bytes)
-asa_transfer_txn_signed = algo_txn.LogicSigTransaction(asa_transfer_txn, asa_transfer_txn_logic_signature)
-
-signed_group = [app_call_txn_signed,
-                asa_buy_txn_signed,
-                asa_transfer_txn_signed]
-
-txid = client.send_transactions(signed_group)
+txid = group.submit()
 print(f'Buy asa transaction completed in: {txid}')
@@ -0,0 +1,34 @@
+import argparse
+
+from src.simulation import LoadGenerator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulates sellers and buyers racing for NFTs on a local ledger.")
+    parser.add_argument("--sellers", type=int, default=10)
+    parser.add_argument("--buyers", type=int, default=100)
+    parser.add_argument("--listings-per-seller", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--round-time", type=float, default=0.1, help="seconds between simulated rounds")
+    parser.add_argument("--price", type=int, default=1000, help="sell price in micro algos")
+    parser.add_argument("--popularity-skew", type=float, default=1.0,
+                        help="Zipf exponent of the listing popularity, 0 for uniform")
+    parser.add_argument("--no-preflight", action="store_true", help="submit without validating the state read")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    load_generator = LoadGenerator(sellers=args.sellers,
+                                   buyers=args.buyers,
+                                   listings_per_seller=args.listings_per_seller,
+                                   duration=args.duration,
+                                   round_time=args.round_time,
+                                   price=args.price,
+                                   popularity_skew=args.popularity_skew,
+                                   preflight=not args.no_preflight,
+                                   seed=args.seed)
+
+    print(load_generator.run().summary())
+
+
+if __name__ == "__main__":
+    main()
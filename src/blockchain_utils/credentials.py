@@ -1,10 +1,21 @@
-from algosdk.v2client import algod
-from algosdk import account as algo_acc
+import atexit
 import yaml
 import os
 from pathlib import Path
-from algosdk import mnemonic
-from algosdk.v2client import indexer
+from typing import List, TYPE_CHECKING
+from functools import lru_cache
+from src.blockchain_utils.endpoint_router import EndpointRouter
+from src.blockchain_utils.network_gateway import NetworkGateway, TokenBucket
+from src.blockchain_utils.signer import PrivateKeySigner, Signer
+
+if TYPE_CHECKING:
+    from src.blockchain_utils.response_cache import ResponseCache
+
+# algosdk imports every one of its modules, including the transaction builders, when any of them is imported, so it
+# is loaded by the functions below on first use and not when the credentials are imported.
+
+
+DEFAULT_INDEXER_ADDRESS = "https://testnet-algorand.api.purestake.io/idx2"
 
 
 def get_project_root_path() -> Path:
@@ -12,7 +23,11 @@ def get_project_root_path() -> Path:
     return path.parent.parent
 
 
+@lru_cache(maxsize=1)
 def load_config():
+    """
+    Parses config.yml once. add_account_to_config clears the cache after changing the file.
+    """
     root_path = get_project_root_path()
     config_location = os.path.join(root_path, 'config.yml')
 
@@ -25,6 +40,8 @@ def get_client():
     :return:
         Returns algod_client
     """
+    from algosdk.v2client import algod
+
     config = load_config()
 
     token = config.get('client_credentials').get('token')
@@ -35,18 +52,159 @@ def get_client():
     return algod_client
 
 
+@lru_cache(maxsize=1)
+def get_response_cache() -> "ResponseCache":
+    """
+    The ResponseCache shared by the cached clients. The optional response_cache section of the config sets its
+    bounds, e.g. response_cache: {max_entries: 10000, max_bytes: 67108864, round_ttl: 4.5}.
+    """
+    from src.blockchain_utils.response_cache import ResponseCache
+
+    config = load_config()
+    return ResponseCache(**(config.get('response_cache') or dict()))
+
+
+def get_cached_client():
+    """
+    :return:
+        Returns algod_client whose GET and compile responses are cached by round.
+    """
+    from src.blockchain_utils.response_cache import CachingAlgodClient
+
+    config = load_config()
+
+    token = config.get('client_credentials').get('token')
+    address = config.get('client_credentials').get('address')
+
+    return CachingAlgodClient(token, address, headers={'X-Api-key': token}, cache=get_response_cache())
+
+
+def _configured_endpoints(section: str) -> List[dict]:
+    """
+    Reads a list of {address, token} endpoints, e.g. algod_endpoints: [{address: ..., token: ...}]. A missing token
+    defaults to the one of client_credentials.
+    """
+    config = load_config()
+    default_token = config.get('client_credentials').get('token')
+
+    return [{'address': endpoint.get('address'), 'token': endpoint.get('token', default_token)}
+            for endpoint in (config.get(section) or [])]
+
+
+@lru_cache(maxsize=1)
+def get_routed_client():
+    """
+    Returns an EndpointRouter over the nodes of the optional algod_endpoints section of the config, or the single
+    cached algod_client of client_credentials when fewer than two are configured. The clients of the nodes share the
+    response cache. The router, and its probe thread, is created once per process and stopped when it exits.
+    """
+    from src.blockchain_utils.response_cache import CachingAlgodClient
+
+    endpoints = _configured_endpoints('algod_endpoints')
+    if len(endpoints) < 2:
+        return get_cached_client()
+
+    router = EndpointRouter([CachingAlgodClient(endpoint['token'], endpoint['address'],
+                                                headers={'X-Api-key': endpoint['token']}, cache=get_response_cache())
+                             for endpoint in endpoints],
+                            kind=EndpointRouter.ALGOD)
+    atexit.register(router.stop)
+    return router
+
+
+def _rate_limit_buckets() -> dict:
+    """
+    Token buckets of the optional rate_limits section of the config, e.g. rate_limits: {submit: {rate: 5, capacity:
+    10}}. A missing rate or capacity keeps the value of NetworkGateway.DEFAULT_BUCKETS.
+    """
+    config = load_config()
+
+    buckets = dict()
+    for endpoint_class, limits in (config.get('rate_limits') or dict()).items():
+        limits = limits or dict()
+        rate, capacity = NetworkGateway.DEFAULT_BUCKETS.get(endpoint_class,
+                                                            NetworkGateway.DEFAULT_BUCKETS[NetworkGateway.READ])
+        buckets[endpoint_class] = TokenBucket(rate=limits.get('rate', rate), capacity=limits.get('capacity', capacity))
+    return buckets
+
+
+@lru_cache(maxsize=1)
+def get_rate_limited_client():
+    """
+    Returns the routed, cached algod_client wrapped in a NetworkGateway, rate limited by the buckets of the
+    rate_limits section of the config. The gateway is created once per process, so its buckets hold back every caller.
+    """
+    return NetworkGateway(get_routed_client(), buckets=_rate_limit_buckets())
+
+
 def get_indexer():
+    """
+    The indexer address is read from client_credentials.indexer_address and defaults to the PureStake testnet
+    indexer.
+    """
+    from algosdk.v2client import indexer
+
     config = load_config()
 
     token = config.get('client_credentials').get('token')
+    address = config.get('client_credentials').get('indexer_address', DEFAULT_INDEXER_ADDRESS)
     headers = {'X-Api-key': token}
     my_indexer = indexer.IndexerClient(indexer_token=token,
-                                       indexer_address="https://testnet-algorand.api.purestake.io/idx2",
+                                       indexer_address=address,
                                        headers=headers)
 
     return my_indexer
 
 
+def get_cached_indexer():
+    """
+    Returns the indexer of get_indexer with its GET responses cached by round.
+    """
+    from src.blockchain_utils.response_cache import CachingIndexerClient
+
+    config = load_config()
+
+    token = config.get('client_credentials').get('token')
+    address = config.get('client_credentials').get('indexer_address', DEFAULT_INDEXER_ADDRESS)
+
+    return CachingIndexerClient(indexer_token=token,
+                                indexer_address=address,
+                                headers={'X-Api-key': token},
+                                cache=get_response_cache())
+
+
+@lru_cache(maxsize=1)
+def get_routed_indexer():
+    """
+    Returns an EndpointRouter over the nodes of the optional indexer_endpoints section of the config, or the single
+    cached indexer of get_cached_indexer when fewer than two are configured. The clients of the nodes share the
+    response cache. Like the algod router, it is created once per process and stopped when it exits.
+    """
+    from src.blockchain_utils.response_cache import CachingIndexerClient
+
+    endpoints = _configured_endpoints('indexer_endpoints')
+    if len(endpoints) < 2:
+        return get_cached_indexer()
+
+    router = EndpointRouter([CachingIndexerClient(indexer_token=endpoint['token'],
+                                                  indexer_address=endpoint['address'],
+                                                  headers={'X-Api-key': endpoint['token']},
+                                                  cache=get_response_cache())
+                             for endpoint in endpoints],
+                            kind=EndpointRouter.INDEXER)
+    atexit.register(router.stop)
+    return router
+
+
+@lru_cache(maxsize=1)
+def get_rate_limited_indexer():
+    """
+    Returns the routed, cached indexer wrapped in a NetworkGateway, rate limited by the buckets of the rate_limits
+    section of the config. Every indexer search is a read. Like the algod gateway, it is created once per process.
+    """
+    return NetworkGateway(get_routed_indexer(), buckets=_rate_limit_buckets())
+
+
 def get_account_credentials(account_id: int) -> (str, str, str):
     """
     Gets the credentials for the account with number: account_id
@@ -60,6 +218,17 @@ def get_account_credentials(account_id: int) -> (str, str, str):
     return account.get("private_key"), account.get("address"), account.get("mnemonic")
 
 
+@lru_cache(maxsize=None)
+def get_account_signer(account_id: int) -> Signer:
+    """
+    Gets the Signer of the account with number: account_id. The signer is created once per account.
+    :param account_id: Number of the account for which we want the signer
+    :return:
+    """
+    private_key, _, _ = get_account_credentials(account_id)
+    return PrivateKeySigner(private_key)
+
+
 def get_account_with_name(account_name: str) -> (str, str, str):
     config = load_config()
     account = config.get(account_name)
@@ -70,6 +239,9 @@ def add_account_to_config():
     """
     Adds account to the accounts list in the config.yml file.
     """
+    from algosdk import account as algo_acc
+    from algosdk import mnemonic
+
     private_key, address = algo_acc.generate_account()
 
     account_data = {
@@ -95,3 +267,5 @@ def add_account_to_config():
 
     with open(config_location, 'w') as file:
         yaml.safe_dump(cur_yaml, file)
+
+    load_config.cache_clear()
@@ -0,0 +1,280 @@
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+from urllib.error import URLError
+
+from src.blockchain_utils.network_gateway import NetworkGateway
+
+
+class Endpoint:
+    """
+    One node behind an EndpointRouter, with the health, round and latency found by probing it.
+    """
+
+    def __init__(self, client, name: Optional[str] = None):
+        self.client = client
+        self.name = name or getattr(client, "algod_address", None) or getattr(client, "indexer_address", None) \
+            or repr(client)
+
+        self.healthy = True
+        self.last_round = 0
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.requests = 0
+
+    def record_latency(self, seconds: float, smoothing: float):
+        self.latency = seconds if self.latency is None else (1 - smoothing) * self.latency + smoothing * seconds
+
+    def snapshot(self) -> dict:
+        return dict(name=self.name, healthy=self.healthy, last_round=self.last_round, latency=self.latency,
+                    failures=self.failures, requests=self.requests)
+
+
+class NoCaughtUpEndpointError(ConnectionError):
+    """
+    Raised when no node has reached the round a call needs. It is a ConnectionError, so a NetworkGateway retries the
+    call with backoff while the nodes catch up.
+    """
+
+
+class EndpointRouter:
+    """
+    Drop-in replacement for an algod or indexer client that spreads over several nodes. A background thread probes
+    every node for health and its latest round. Each call goes to the fastest healthy node that is at most
+    max_round_lag rounds behind the most advanced round seen on any node; if the node fails with a connection error
+    or a 5xx/429 response, it is marked unhealthy and the call fails over to the next caught-up node, healthy ones
+    first. A node that lags behind is never used in place of a failed one: when no caught-up node answers, the call
+    fails. Unhealthy nodes come back once a probe succeeds.
+
+    Transactions are gossiped between nodes, but pending_transaction_info is sent first to the node that accepted the
+    submission, so a confirmation wait never asks a node that has not seen the transaction yet. Once a transaction is
+    seen confirmed, account_info, application_info and asset_info of every account, application and asset referenced
+    by its group, e.g. the seller, the escrow and the application of a buy confirmed through its opt-in, only go to
+    nodes that reached the confirmation round, so they always reflect it. Wrapping the router in a NetworkGateway
+    adds rate limiting and makes a submission retried on another node idempotent.
+    """
+
+    ALGOD = "algod"
+    INDEXER = "indexer"
+
+    # Long polls, whose duration says nothing about the node.
+    LONG_POLLS = {"status_after_block"}
+    SUBMISSIONS = {"send_transaction", "send_transactions", "send_raw_transaction"}
+    # Reads of the state changed by a transaction, by the name of the argument that identifies it.
+    PINNED_READS = {"account_info": "address", "application_info": "application_id", "asset_info": "asset_id"}
+
+    def __init__(self,
+                 clients: list,
+                 kind: str = ALGOD,
+                 probe_interval: float = 2.0,
+                 max_round_lag: int = 2,
+                 latency_smoothing: float = 0.3,
+                 max_tracked_submissions: int = 10000):
+        """
+        :param clients: algod clients, or indexer clients, of the nodes.
+        :param kind: EndpointRouter.ALGOD or EndpointRouter.INDEXER, which selects the probe.
+        :param probe_interval: seconds between two probes of every node.
+        :param max_round_lag: how many rounds a node may be behind the most advanced node and still get calls.
+        :param latency_smoothing: weight of the newest latency sample in the moving average.
+        :param max_tracked_submissions: maximum number of txids whose accepting node is remembered, and of accounts
+        and applications whose last confirmation round is remembered.
+        """
+        if not clients:
+            raise ValueError("At least one client is required.")
+
+        self.endpoints = [client if isinstance(client, Endpoint) else Endpoint(client) for client in clients]
+        self.kind = kind
+        self.probe_interval = probe_interval
+        self.max_round_lag = max_round_lag
+        self.latency_smoothing = latency_smoothing
+        self.max_tracked_submissions = max_tracked_submissions
+
+        self._lock = threading.Lock()
+        # txid -> (node that accepted it, accounts, applications and assets referenced by its group)
+        self._submissions = OrderedDict()
+        # account or application -> round of its last confirmed transaction
+        self._confirmed_rounds = OrderedDict()
+
+        self.probe()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._probe_periodically, daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.endpoints[0].client, name)
+        if not callable(attribute) or name.startswith("_"):
+            return attribute
+
+        def call(*args, **kwargs):
+            return self._call(name, *args, **kwargs)
+
+        return call
+
+    def stop(self):
+        self._stopped.set()
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            return [endpoint.snapshot() for endpoint in self.endpoints]
+
+    # Probing
+
+    def probe(self):
+        """
+        Probes every node once.
+        """
+        for endpoint in self.endpoints:
+            self._probe(endpoint)
+
+    def _probe_periodically(self):
+        while not self._stopped.wait(self.probe_interval):
+            self.probe()
+
+    def _probe(self, endpoint: Endpoint):
+        start = time.perf_counter()
+        try:
+            if self.kind == self.INDEXER:
+                health = endpoint.client.health()
+                last_round = health.get("round", 0)
+                healthy = health.get("db-available", True) and not health.get("is-migrating", False)
+            else:
+                last_round = endpoint.client.status().get("last-round", 0)
+                healthy = True
+        except Exception:
+            last_round, healthy = None, False
+
+        with self._lock:
+            endpoint.healthy = healthy
+            if healthy:
+                endpoint.last_round = last_round
+                endpoint.record_latency(time.perf_counter() - start, self.latency_smoothing)
+            else:
+                endpoint.failures += 1
+
+    # Routing
+
+    def candidates(self, min_round: int = 0) -> List[Endpoint]:
+        """
+        :param min_round: round the nodes must have reached.
+        :return: the healthy, caught-up nodes from the fastest to the slowest, followed by the unhealthy caught-up
+        nodes as a last resort. Nodes lagging behind are left out.
+        """
+        with self._lock:
+            best_round = max(endpoint.last_round for endpoint in self.endpoints)
+            floor = max(best_round - self.max_round_lag, min_round)
+
+            caught_up = [endpoint for endpoint in self.endpoints if endpoint.last_round >= floor]
+            caught_up.sort(key=lambda endpoint: (not endpoint.healthy,
+                                                 endpoint.latency if endpoint.latency is not None else float("inf")))
+        return caught_up
+
+    def _call(self, name: str, *args, **kwargs):
+        min_round = self._pinned_round(name, *args, **kwargs)
+        candidates = self.candidates(min_round=min_round)
+
+        txid = None
+        if name == "pending_transaction_info":
+            txid = args[0] if args else kwargs.get("transaction_id")
+            with self._lock:
+                submitted_to = self._submissions.get(txid, (None,))[0]
+            if submitted_to is not None:
+                if submitted_to in candidates:
+                    candidates.remove(submitted_to)
+                candidates.insert(0, submitted_to)
+
+        if not candidates:
+            raise NoCaughtUpEndpointError(f"No node has reached round {min_round} for {name}.")
+
+        last_error = None
+        for endpoint in candidates:
+            start = time.perf_counter()
+            try:
+                result = getattr(endpoint.client, name)(*args, **kwargs)
+            except Exception as e:
+                if not self._is_node_failure(e):
+                    raise
+                last_error = e
+                with self._lock:
+                    endpoint.healthy = False
+                    endpoint.failures += 1
+                continue
+
+            with self._lock:
+                endpoint.requests += 1
+                if name not in self.LONG_POLLS:
+                    endpoint.record_latency(time.perf_counter() - start, self.latency_smoothing)
+
+            if name in self.SUBMISSIONS:
+                self._remember_submission(endpoint, *args, **kwargs)
+            elif txid is not None and isinstance(result, dict) and (result.get("confirmed-round") or 0) > 0:
+                self._remember_confirmation(endpoint, txid, result["confirmed-round"])
+            return result
+
+        raise last_error
+
+    def _pinned_round(self, name: str, *args, **kwargs) -> int:
+        """
+        :return: round of the last confirmed transaction of the account or application a read is about, or 0.
+        """
+        argument = self.PINNED_READS.get(name)
+        if argument is None:
+            return 0
+
+        key = args[0] if args else kwargs.get(argument)
+        with self._lock:
+            return self._confirmed_rounds.get(key, 0)
+
+    def _remember_submission(self, endpoint: Endpoint, *args, **kwargs):
+        payload = args[0] if args else next(iter(kwargs.values()), None)
+        payloads = payload if isinstance(payload, list) else [payload]
+        # Any transaction of a group may be waited on, so each of them pins the state of the whole group.
+        group_state = tuple(dict.fromkeys(key for item in payloads for key in self._referenced_state(item)))
+
+        with self._lock:
+            for item in payloads:
+                txid = NetworkGateway._local_txid(item)
+                if txid is not None:
+                    self._submissions[txid] = (endpoint, group_state)
+                    self._submissions.move_to_end(txid)
+            while len(self._submissions) > self.max_tracked_submissions:
+                self._submissions.popitem(last=False)
+
+    def _remember_confirmation(self, endpoint: Endpoint, txid: str, confirmed_round: int):
+        with self._lock:
+            # The node has seen the round even if it has not been probed since.
+            endpoint.last_round = max(endpoint.last_round, confirmed_round)
+
+            _, group_state = self._submissions.get(txid, (None, ()))
+            for key in group_state:
+                self._confirmed_rounds[key] = max(self._confirmed_rounds.get(key, 0), confirmed_round)
+                self._confirmed_rounds.move_to_end(key)
+            while len(self._confirmed_rounds) > self.max_tracked_submissions:
+                self._confirmed_rounds.popitem(last=False)
+
+    @staticmethod
+    def _referenced_state(signed_txn) -> Iterable:
+        """
+        :return: the accounts, applications and assets a submitted transaction references.
+        """
+        txn = getattr(signed_txn, "transaction", None)
+        if txn is None:
+            return ()
+
+        referenced = [txn.sender]
+        for field in ("receiver", "close_remainder_to", "revocation_target", "close_assets_to", "index"):
+            if getattr(txn, field, None):
+                referenced.append(getattr(txn, field))
+        for field in ("accounts", "foreign_apps", "foreign_assets"):
+            referenced.extend(getattr(txn, field, None) or [])
+        return tuple(referenced)
+
+    @staticmethod
+    def _is_node_failure(error: Exception) -> bool:
+        from algosdk.error import AlgodHTTPError, IndexerHTTPError
+
+        if isinstance(error, (AlgodHTTPError, IndexerHTTPError)):
+            code = NetworkGateway.http_status(error)
+            return code is not None and (code == 429 or code >= 500)
+        return isinstance(error, (URLError, socket.timeout, ConnectionError))
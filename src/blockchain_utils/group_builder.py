@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple, Union
+
+from algosdk.future import transaction as algo_txn
+from algosdk.future.transaction import Transaction
+
+from src.blockchain_utils.signer import Signer, resolve_signer
+from src.blockchain_utils.transaction_repository import get_default_suggested_params
+from src.services.network_interaction import NetworkInteraction
+
+MAX_GROUP_SIZE = 16
+
+_signing_executor = ThreadPoolExecutor(max_workers=4)
+
+
+class GroupTransactionBuilder:
+    """
+    Composes an atomic group:
+        builder = GroupTransactionBuilder(client)
+        app_call = ApplicationTransactionRepository.call_application(..., suggested_params=builder.suggested_params,
+                                                                     sign_transaction=False)
+        builder.add(app_call, buyer_signer)
+        builder.add(escrow_transfer, escrow_logic_signature)
+        tx_id = builder.submit()
+    The suggested params are fetched once for the whole group, the group id is assigned to every transaction and the
+    transactions are signed in parallel, each with its Signer (or private key) or LogicSig.
+    """
+
+    def __init__(self, client, suggested_params: Optional[algo_txn.SuggestedParams] = None):
+        self.client = client
+        self._suggested_params = suggested_params
+        self._entries: List[Tuple[Transaction, Union[Signer, algo_txn.LogicSig]]] = []
+
+    @property
+    def suggested_params(self) -> algo_txn.SuggestedParams:
+        if self._suggested_params is None:
+            self._suggested_params = get_default_suggested_params(client=self.client)
+        return self._suggested_params
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, txn: Transaction, signer: Union[str, Signer, algo_txn.LogicSig]) -> "GroupTransactionBuilder":
+        """
+        :param txn: unsigned transaction.
+        :param signer: private key, Signer or, for transactions sent by a smart signature, its LogicSig.
+        :return: the builder itself, so calls can be chained.
+        """
+        if len(self._entries) == MAX_GROUP_SIZE:
+            raise ValueError(f"An atomic group can not have more than {MAX_GROUP_SIZE} transactions.")
+
+        if not isinstance(signer, algo_txn.LogicSig):
+            signer = resolve_signer(signer)
+
+        self._entries.append((txn, signer))
+        return self
+
+    def build(self) -> list:
+        """
+        Assigns the group id and signs every transaction.
+        :return: the signed transactions in the order they were added.
+        """
+        if not self._entries:
+            raise ValueError("The group is empty.")
+
+        txns = [txn for txn, _ in self._entries]
+        if len(txns) > 1:
+            gid = algo_txn.calculate_group_id(txns)
+            for txn in txns:
+                txn.group = gid
+
+        return list(_signing_executor.map(self._sign, self._entries))
+
+    def submit(self, wait: bool = False) -> str:
+        """
+        Signs and sends the group.
+        :param wait: whether to block until the group is confirmed.
+        :return: the txid of the first transaction of the group.
+        """
+        signed_group = self.build()
+        if len(signed_group) == 1:
+            tx_id = self.client.send_transaction(signed_group[0])
+        else:
+            tx_id = self.client.send_transactions(signed_group)
+
+        if wait:
+            NetworkInteraction.wait_for_confirmation(self.client, tx_id)
+
+        return tx_id
+
+    @staticmethod
+    def _sign(entry):
+        txn, signer = entry
+        if isinstance(signer, algo_txn.LogicSig):
+            return algo_txn.LogicSigTransaction(txn, signer)
+        return signer.sign(txn)
@@ -0,0 +1,261 @@
+import random
+import socket
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional, TYPE_CHECKING
+from urllib.error import URLError
+
+if TYPE_CHECKING:
+    from algosdk.error import AlgodHTTPError
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Tokens are refilled continuously at `rate` per second up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Blocks until the tokens are available.
+        :param tokens: number of tokens to take.
+        :return: the number of seconds the caller was throttled.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+
+                wait_time = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait_time)
+            waited += wait_time
+
+
+class GatewayMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.throttled = defaultdict(int)
+        self.throttled_seconds = defaultdict(float)
+        self.retries = defaultdict(int)
+        self.rate_limit_responses = defaultdict(int)
+        self.failures = defaultdict(int)
+        self.duplicate_submissions = 0
+
+    def record(self, counter: str, endpoint_class: Optional[str] = None, value: float = 1):
+        with self._lock:
+            if endpoint_class is None:
+                setattr(self, counter, getattr(self, counter) + value)
+            else:
+                getattr(self, counter)[endpoint_class] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "throttled": dict(self.throttled),
+                "throttled_seconds": dict(self.throttled_seconds),
+                "retries": dict(self.retries),
+                "rate_limit_responses": dict(self.rate_limit_responses),
+                "failures": dict(self.failures),
+                "duplicate_submissions": self.duplicate_submissions,
+            }
+
+
+class NetworkGateway:
+    """
+    Drop-in wrapper around an algod (or indexer) client that rate limits every call with a token bucket per endpoint
+    class and retries transient failures (HTTP 429, 5xx, connection errors) with jittered exponential backoff.
+
+    Submissions are safe to retry because a signed transaction always has the same txid: if the node answers that
+    the transaction is already in the pool or in the ledger, the submission is treated as successful. Transactions
+    that this gateway already submitted recently are not sent again at all.
+    """
+
+    SUBMIT = "submit"
+    STATUS = "status"
+    COMPILE = "compile"
+    READ = "read"
+
+    ENDPOINT_CLASSES = {
+        "send_transaction": SUBMIT,
+        "send_transactions": SUBMIT,
+        "send_raw_transaction": SUBMIT,
+        "status": STATUS,
+        "status_after_block": STATUS,
+        "compile": COMPILE,
+    }
+
+    DEFAULT_BUCKETS = {
+        SUBMIT: (5, 10),
+        STATUS: (10, 20),
+        COMPILE: (2, 5),
+        READ: (10, 20),
+    }
+
+    def __init__(self,
+                 client,
+                 buckets: Optional[Dict[str, TokenBucket]] = None,
+                 max_retries: int = 5,
+                 base_backoff: float = 0.25,
+                 max_backoff: float = 8.0,
+                 dedupe_window: float = 60.0,
+                 max_tracked_submissions: int = 10000):
+        """
+        :param client: algod or indexer client.
+        :param buckets: token bucket per endpoint class (submit, status, compile, read). Missing classes get the
+        defaults from DEFAULT_BUCKETS.
+        :param max_retries: maximum number of retries of a transient failure.
+        :param base_backoff: backoff of the first retry in seconds. It doubles with each retry.
+        :param max_backoff: upper bound of the backoff in seconds.
+        :param dedupe_window: seconds during which a txid that was already submitted is not sent again.
+        :param max_tracked_submissions: maximum number of recently submitted txids that are remembered.
+        """
+        self.client = client
+        self.buckets = {endpoint_class: TokenBucket(rate=rate, capacity=capacity)
+                        for endpoint_class, (rate, capacity) in self.DEFAULT_BUCKETS.items()}
+        self.buckets.update(buckets or dict())
+
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.dedupe_window = dedupe_window
+        self.max_tracked_submissions = max_tracked_submissions
+
+        self.metrics = GatewayMetrics()
+
+        self._submitted = OrderedDict()
+        self._submitted_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not callable(attribute) or name.startswith("_"):
+            return attribute
+
+        endpoint_class = self.ENDPOINT_CLASSES.get(name, self.READ)
+
+        def call(*args, **kwargs):
+            if endpoint_class == self.SUBMIT:
+                return self._submit(attribute, endpoint_class, *args, **kwargs)
+            return self._call(attribute, endpoint_class, *args, **kwargs)
+
+        return call
+
+    def _submit(self, method, endpoint_class, *args, **kwargs):
+        from algosdk.error import AlgodHTTPError
+
+        tx_id = self._local_txid(*args, **kwargs)
+
+        if tx_id is not None and self._recently_submitted(tx_id):
+            self.metrics.record("duplicate_submissions")
+            return tx_id
+
+        try:
+            result = self._call(method, endpoint_class, *args, **kwargs)
+        except AlgodHTTPError as e:
+            if tx_id is None or not self._is_duplicate_submission(e):
+                raise
+            self.metrics.record("duplicate_submissions")
+            result = tx_id
+
+        if tx_id is not None:
+            self._remember_submission(tx_id)
+
+        return result
+
+    def _call(self, method, endpoint_class, *args, **kwargs):
+        attempt = 0
+        while True:
+            waited = self.buckets[endpoint_class].acquire()
+            self.metrics.record("requests", endpoint_class)
+            if waited > 0:
+                self.metrics.record("throttled", endpoint_class)
+                self.metrics.record("throttled_seconds", endpoint_class, waited)
+
+            try:
+                return method(*args, **kwargs)
+            except Exception as e:
+                if not self._is_transient(e) or attempt >= self.max_retries:
+                    self.metrics.record("failures", endpoint_class)
+                    raise
+                if self.http_status(e) == 429:
+                    self.metrics.record("rate_limit_responses", endpoint_class)
+
+            self.metrics.record("retries", endpoint_class)
+            # Full jitter: spreads retries of concurrent callers instead of synchronizing them.
+            time.sleep(random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt)))
+            attempt += 1
+
+    @staticmethod
+    def http_status(error: Exception) -> Optional[int]:
+        """
+        :return: the HTTP status of a failed request, or None. AlgodHTTPError carries it in `code`, but the SDK raises
+        IndexerHTTPError without it, from within the handler of the urllib HTTPError that has it.
+        """
+        while error is not None:
+            code = getattr(error, "code", None)
+            if isinstance(code, int):
+                return code
+            error = error.__cause__ or error.__context__
+        return None
+
+    @classmethod
+    def _is_transient(cls, error: Exception) -> bool:
+        from algosdk.error import AlgodHTTPError, IndexerHTTPError
+
+        if isinstance(error, (AlgodHTTPError, IndexerHTTPError)):
+            code = cls.http_status(error)
+            return code is not None and (code == 429 or code >= 500)
+
+        return isinstance(error, (URLError, socket.timeout, ConnectionError))
+
+    @staticmethod
+    def _is_duplicate_submission(error: "AlgodHTTPError") -> bool:
+        message = str(error).lower()
+        return "already in ledger" in message or "already in pool" in message
+
+    @staticmethod
+    def _local_txid(*args, **kwargs) -> Optional[str]:
+        """
+        Computes the txid of the (first) submitted transaction without a network call, the same one algod returns.
+        """
+        from algosdk import encoding
+
+        payload = args[0] if args else next(iter(kwargs.values()), None)
+
+        try:
+            if isinstance(payload, list):
+                payload = payload[0]
+            if isinstance(payload, str):
+                payload = encoding.future_msgpack_decode(payload)
+            # Signed and LogicSig transactions share the txid of the transaction they wrap.
+            return getattr(payload, "transaction", payload).get_txid()
+        except Exception:
+            return None
+
+    def _recently_submitted(self, tx_id: str) -> bool:
+        with self._submitted_lock:
+            submitted_at = self._submitted.get(tx_id)
+            return submitted_at is not None and time.monotonic() - submitted_at < self.dedupe_window
+
+    def _remember_submission(self, tx_id: str):
+        with self._submitted_lock:
+            self._submitted[tx_id] = time.monotonic()
+            self._submitted.move_to_end(tx_id)
+            while len(self._submitted) > self.max_tracked_submissions:
+                self._submitted.popitem(last=False)
@@ -0,0 +1,238 @@
+"""
+Batch files are streams of msgpack maps, one per transaction or atomic group, so every stage reads and writes them
+one unit at a time and memory does not depend on the size of the job.
+- unsigned: {"id": int, "txns": [msgpack of each transaction], "lsigs": [escrow program or None per transaction],
+             "last_valid": last round in which every transaction is valid}
+- signed:   {"id": int, "stxns": [msgpack of each signed transaction], "last_valid": int} or {"id": int, "error": str}
+"""
+import base64
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import msgpack
+from algosdk import account as algo_acc
+from algosdk import encoding
+from algosdk.future import transaction as algo_txn
+from algosdk.future.transaction import Transaction
+
+from src.blockchain_utils.signer import resolve_signer
+from src.services.network_interaction import NetworkInteraction
+
+
+def read_records(path: str) -> Iterator[dict]:
+    with open(path, "rb") as file:
+        yield from msgpack.Unpacker(file, raw=False)
+
+
+def _bounded_map(executor: Executor, fn: Callable, items: Iterable, window: int) -> Iterator:
+    """
+    Like executor.map, but with at most `window` items in flight, so an unbounded input is never read ahead.
+    """
+    in_flight = deque()
+    for item in items:
+        in_flight.append(executor.submit(fn, item))
+        if len(in_flight) >= window:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
+class PreparedBatchWriter:
+    """
+    Prepare stage: streams unsigned transactions and groups, e.g. built by the repositories with
+    sign_transaction=False, to a batch file. Runs on the network-facing host, without any key. The services write
+    their flows with their prepare_* methods, given AddressOnlySigners for the accounts whose keys are elsewhere:
+        with PreparedBatchWriter("listings.unsigned") as batch:
+            nft_service.prepare_nft(batch)
+            nft_marketplace.prepare_setup_listing(batch, nft_creator_pk=AddressOnlySigner(creator_address))
+            batch.add_group([app_call_txn, payment_txn, transfer_txn], logic_programs=[None, None, escrow_bytes])
+    The batch must be signed and submitted before the last valid round of its transactions; records submitted later
+    are reported as expired, so the suggested params of a large job should have a wide enough validity window.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._packer = msgpack.Packer(use_bin_type=True)
+
+    def __enter__(self) -> "PreparedBatchWriter":
+        self._file = open(self.path, "wb")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._file.close()
+
+    def add(self, txn: Transaction, logic_program: Optional[bytes] = None) -> int:
+        return self.add_group([txn], logic_programs=[logic_program])
+
+    def add_group(self, txns: List[Transaction], logic_programs: Optional[Sequence[Optional[bytes]]] = None) -> int:
+        """
+        :param txns: unsigned transactions. A group id is assigned when there is more than one.
+        :param logic_programs: per transaction, the program of the LogicSig that authorizes it, or None when it is
+        signed with a key.
+        :return: id of the record in the batch.
+        """
+        if len(txns) > 1:
+            gid = algo_txn.calculate_group_id(txns)
+            for txn in txns:
+                txn.group = gid
+
+        record = {
+            "id": self.count,
+            "txns": [base64.b64decode(encoding.msgpack_encode(txn)) for txn in txns],
+            "lsigs": list(logic_programs) if logic_programs is not None else [None] * len(txns),
+            "last_valid": min(txn.last_valid_round for txn in txns),
+        }
+        self._file.write(self._packer.pack(record))
+        self.count += 1
+        return record["id"]
+
+
+_worker_keys: Dict[str, str] = dict()
+
+
+def _init_sign_worker(keys: Dict[str, str]):
+    global _worker_keys
+    _worker_keys = keys
+
+
+def _sign_record(record: dict) -> dict:
+    try:
+        signed = []
+        for raw_txn, logic_program in zip(record["txns"], record["lsigs"]):
+            txn = encoding.future_msgpack_decode(base64.b64encode(raw_txn).decode())
+            if logic_program is not None:
+                signed_txn = algo_txn.LogicSigTransaction(txn, algo_txn.LogicSig(logic_program))
+            else:
+                private_key = _worker_keys.get(txn.sender)
+                if private_key is None:
+                    raise KeyError(f"no key for {txn.sender}")
+                signed_txn = resolve_signer(private_key).sign(txn)
+            signed.append(base64.b64decode(encoding.msgpack_encode(signed_txn)))
+        return {"id": record["id"], "stxns": signed, "last_valid": record.get("last_valid")}
+    except Exception as e:
+        return {"id": record["id"], "error": f"{type(e).__name__}: {e}"}
+
+
+class OfflineSigner:
+    """
+    Sign stage: signs a prepared batch file on an isolated machine with a pool of processes. A record whose
+    transactions can not all be signed is written as an error and skipped by the submit stage. Only private keys can
+    be used, since the keys are sent to the worker processes.
+    """
+
+    def __init__(self, private_keys: Union[Dict[str, str], Iterable[str]], processes: Optional[int] = None,
+                 window: int = 1024):
+        """
+        :param private_keys: address -> private key, or a list of private keys.
+        :param processes: number of worker processes. Defaults to the number of CPUs.
+        :param window: maximum number of records in flight.
+        """
+        if not isinstance(private_keys, dict):
+            private_keys = {algo_acc.address_from_private_key(private_key): private_key
+                            for private_key in private_keys}
+        self.private_keys = private_keys
+        self.processes = processes
+        self.window = window
+
+    def sign_file(self, unsigned_path: str, signed_path: str) -> Tuple[int, int]:
+        """
+        :return: (number of signed records, number of records that failed)
+        """
+        signed, failed = 0, 0
+        packer = msgpack.Packer(use_bin_type=True)
+
+        with ProcessPoolExecutor(max_workers=self.processes,
+                                 initializer=_init_sign_worker,
+                                 initargs=(self.private_keys,)) as executor, open(signed_path, "wb") as file:
+            for result in _bounded_map(executor, _sign_record, read_records(unsigned_path), self.window):
+                file.write(packer.pack(result))
+                if "error" in result:
+                    failed += 1
+                else:
+                    signed += 1
+
+        return signed, failed
+
+
+class SubmissionResult(NamedTuple):
+    id: int
+    tx_id: Optional[str] = None
+    confirmed_round: Optional[int] = None
+    error: Optional[str] = None
+    # Whether the record failed because its last valid round had passed. It has to be prepared again.
+    expired: bool = False
+
+
+class BatchSubmitter:
+    """
+    Submit stage: streams a signed batch file to the network with a bounded number of submissions in flight. The
+    signed bytes are sent as they are, so the submitting host never decodes or holds a key. A record whose last valid
+    round has passed is not sent and is reported as expired, as is one the node rejects for being out of its
+    validity window.
+    """
+
+    def __init__(self, client, max_in_flight: int = 8, wait_for_confirmation: bool = True,
+                 status_interval: float = 1.0):
+        """
+        :param client: algorand client, e.g. a NetworkGateway for rate limiting and idempotent retries.
+        :param max_in_flight: maximum number of records being submitted or confirmed at the same time.
+        :param wait_for_confirmation: whether each record is reported only once it is confirmed.
+        :param status_interval: seconds the last round of the network is reused for the expiry checks.
+        """
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.wait_for_confirmation = wait_for_confirmation
+        self.status_interval = status_interval
+
+        self._lock = threading.Lock()
+        self._last_round = 0
+        self._last_round_at = None
+
+    def submit_file(self, signed_path: str) -> Iterator[SubmissionResult]:
+        """
+        :return: one result per record, in the order of the file, yielded as the records complete.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            yield from _bounded_map(executor, self._submit_record, read_records(signed_path), self.max_in_flight)
+
+    def _submit_record(self, record: dict) -> SubmissionResult:
+        if "error" in record:
+            return SubmissionResult(id=record["id"], error=record["error"])
+
+        try:
+            last_valid = record.get("last_valid")
+            # A transaction can only go into the next round, so it has expired once the last round reached its
+            # last valid round.
+            if last_valid is not None and self._current_round() >= last_valid:
+                return SubmissionResult(id=record["id"], error=f"last valid round {last_valid} has passed",
+                                        expired=True)
+
+            tx_id = self.client.send_raw_transaction(base64.b64encode(b"".join(record["stxns"])))
+            confirmed_round = None
+            if self.wait_for_confirmation:
+                txinfo = NetworkInteraction.wait_for_confirmation(self.client, tx_id)
+                confirmed_round = txinfo.get("confirmed-round")
+        except Exception as e:
+            return SubmissionResult(id=record["id"], error=f"{type(e).__name__}: {e}", expired=self._is_expired(e))
+
+        return SubmissionResult(id=record["id"], tx_id=tx_id, confirmed_round=confirmed_round)
+
+    def _current_round(self) -> int:
+        """
+        :return: the last round of the network, fetched at most once per status_interval.
+        """
+        with self._lock:
+            if self._last_round_at is None or time.monotonic() - self._last_round_at >= self.status_interval:
+                self._last_round = self.client.status().get("last-round", 0)
+                self._last_round_at = time.monotonic()
+            return self._last_round
+
+    @staticmethod
+    def _is_expired(error: Exception) -> bool:
+        # algod rejects a transaction outside of its validity window with "txn dead: round X outside of F--L".
+        return "txn dead" in str(error).lower()
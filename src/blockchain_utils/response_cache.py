@@ -0,0 +1,242 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Callable, List, Optional, Tuple
+
+from algosdk.v2client import algod, indexer
+
+IMMUTABLE = "immutable"
+ROUND_SCOPED = "round_scoped"
+VOLATILE = "volatile"
+
+# (HTTP method, path pattern, class); the first matching rule wins and unmatched requests are volatile. Paths are
+# matched without the /v2 prefix.
+ALGOD_RULES = [
+    ("POST", r"/teal/compile$", IMMUTABLE),
+    ("GET", r"/blocks/\d+$", IMMUTABLE),
+    ("GET", r"/transactions/params$", ROUND_SCOPED),
+    ("GET", r"/(accounts|applications|assets)/[^/]+$", ROUND_SCOPED),
+]
+
+INDEXER_RULES = [
+    ("GET", r"/blocks/\d+$", IMMUTABLE),
+    # A single asset: the url, name and total an NFT is read for never change once it is created.
+    ("GET", r"/assets/\d+$", IMMUTABLE),
+    ("GET", r"/health$", VOLATILE),
+    ("GET", r"/(accounts|applications|assets|transactions)(/.*)?$", ROUND_SCOPED),
+]
+
+
+class CacheMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.evictions = 0
+        self.expirations = 0
+
+    def record(self, counter: str, cache_class: Optional[str] = None):
+        with self._lock:
+            if cache_class is None:
+                setattr(self, counter, getattr(self, counter) + 1)
+            else:
+                getattr(self, counter)[cache_class] += 1
+
+    def hit_rate(self, cache_class: Optional[str] = None) -> float:
+        with self._lock:
+            hits = self.hits[cache_class] if cache_class else sum(self.hits.values())
+            misses = self.misses[cache_class] if cache_class else sum(self.misses.values())
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class ResponseCache:
+    """
+    LRU cache of node responses, bounded both in number of entries and in approximate bytes.
+    - immutable responses (compiled programs, blocks) are kept until evicted.
+    - round-scoped responses (account, application and asset params, suggested params, indexer searches) are
+      valid while no newer round has been observed and for at most round_ttl seconds, since the round is only
+      known from the responses that pass through the cache. A response is stamped with the round it reports, or
+      else with the round known before it was requested, never with a round observed while it was loading.
+    - volatile responses (status, pending transactions, submissions) are never cached. A confirmed pending
+      transaction advances the current round to its confirmation round, so the account and application reads
+      cached before it was confirmed are loaded again.
+    Cached responses are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, round_ttl: float = 4.5):
+        """
+        :param max_entries: maximum number of cached responses.
+        :param max_bytes: maximum approximate size of the cached responses.
+        :param round_ttl: seconds a round-scoped response stays valid, about one block time.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.round_ttl = round_ttl
+
+        self.current_round = 0
+        self.metrics = CacheMetrics()
+
+        # key -> (response, cache class, round, stored at, size)
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def classify(method: str, path: str, rules: List[Tuple[str, str, str]]) -> str:
+        path = re.sub(r"^/v2(?=/)", "", path.split("?")[0])
+        for rule_method, pattern, cache_class in rules:
+            if method.upper() == rule_method and re.search(pattern, path):
+                return cache_class
+        return VOLATILE
+
+    def request(self, key: tuple, cache_class: str, load: Callable[[], object]):
+        """
+        :param key: hashable identity of the request.
+        :param cache_class: IMMUTABLE, ROUND_SCOPED or VOLATILE.
+        :param load: performs the request on a miss.
+        :return: the cached or loaded response.
+        """
+        if cache_class == VOLATILE:
+            response = load()
+            self.observe_round(response)
+            return response
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_valid(entry):
+                self._entries.move_to_end(key)
+                self.metrics.record("hits", cache_class)
+                return entry[0]
+            if entry is not None:
+                self._remove(key)
+                self.metrics.record("expirations")
+
+        self.metrics.record("misses", cache_class)
+        round_before_load = self.current_round
+        response = load()
+        entry_round = self._reported_round(response) or round_before_load
+        self.observe_round(response)
+
+        size = self._estimate_size(response)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response, cache_class, entry_round, time.monotonic(), size)
+            self._size += size
+            while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.metrics.record("evictions")
+
+        return response
+
+    def observe_round(self, response):
+        """
+        Advances the current round from the round a response reports, which expires older round-scoped entries.
+        """
+        observed = self._reported_round(response)
+        if observed > self.current_round:
+            with self._lock:
+                self.current_round = max(self.current_round, observed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @staticmethod
+    def _reported_round(response) -> int:
+        """
+        :return: the round a response reports, e.g. the last-round of a status or the confirmed-round of a pending
+        transaction, or 0.
+        """
+        if not isinstance(response, dict):
+            return 0
+        return max((response[key] for key in ("last-round", "current-round", "round", "confirmed-round")
+                    if isinstance(response.get(key), int)), default=0)
+
+    def _is_valid(self, entry) -> bool:
+        _, cache_class, entry_round, stored_at, _ = entry
+        if cache_class == IMMUTABLE:
+            return True
+        return entry_round >= self.current_round and time.monotonic() - stored_at < self.round_ttl
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._size -= entry[4]
+
+    @staticmethod
+    def _estimate_size(response) -> int:
+        if isinstance(response, (bytes, bytearray, str)):
+            return len(response)
+        try:
+            return len(json.dumps(response))
+        except (TypeError, ValueError):
+            return 1024
+
+
+def _request_key(kind: str, method: str, requrl: str, params, data, **kwargs) -> tuple:
+    frozen_params = tuple(sorted(params.items())) if isinstance(params, dict) else params
+    return kind, method.upper(), requrl, repr(frozen_params), data, tuple(sorted(kwargs.items()))
+
+
+class CachingAlgodClient(algod.AlgodClient):
+    """
+    AlgodClient whose GET and compile responses go through a ResponseCache.
+    """
+
+    def __init__(self, algod_token, algod_address, headers=None, cache: Optional[ResponseCache] = None,
+                 rules: Optional[List[Tuple[str, str, str]]] = None):
+        """
+        :param cache: cache to use, which may be shared between clients. Defaults to a new one.
+        :param rules: extra classification rules checked before ALGOD_RULES.
+        """
+        super().__init__(algod_token, algod_address, headers)
+        self.cache = cache if cache is not None else ResponseCache()
+        self.rules = (rules or []) + ALGOD_RULES
+
+    def algod_request(self, method, requrl, params=None, data=None, headers=None, **kwargs):
+        cache_class = self.cache.classify(method, requrl, self.rules)
+        key = _request_key("algod", method, requrl, params, data, **kwargs)
+        return self.cache.request(key, cache_class,
+                                  lambda: super(CachingAlgodClient, self).algod_request(method, requrl, params=params,
+                                                                                        data=data, headers=headers,
+                                                                                        **kwargs))
+
+
+class CachingIndexerClient(indexer.IndexerClient):
+    """
+    IndexerClient whose GET responses go through a ResponseCache.
+    """
+
+    def __init__(self, indexer_token, indexer_address, headers=None, cache: Optional[ResponseCache] = None,
+                 rules: Optional[List[Tuple[str, str, str]]] = None):
+        """
+        :param cache: cache to use, which may be shared between clients. Defaults to a new one.
+        :param rules: extra classification rules checked before INDEXER_RULES.
+        """
+        super().__init__(indexer_token, indexer_address, headers)
+        self.cache = cache if cache is not None else ResponseCache()
+        self.rules = (rules or []) + INDEXER_RULES
+
+    def indexer_request(self, method, requrl, params=None, data=None, headers=None, **kwargs):
+        cache_class = self.cache.classify(method, requrl, self.rules)
+        key = _request_key("indexer", method, requrl, params, data, **kwargs)
+        return self.cache.request(key, cache_class,
+                                  lambda: super(CachingIndexerClient, self).indexer_request(method, requrl,
+                                                                                            params=params, data=data,
+                                                                                            headers=headers,
+                                                                                            **kwargs))
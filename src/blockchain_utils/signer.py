@@ -0,0 +1,92 @@
+import base64
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List, TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    from algosdk.future.transaction import SignedTransaction, Transaction
+
+
+class Signer(ABC):
+    """
+    An account that can sign transactions. Everywhere a private key is accepted, a Signer can be passed instead.
+    """
+
+    address: str
+
+    @abstractmethod
+    def sign(self, txn: "Transaction") -> "SignedTransaction":
+        pass
+
+    def sign_many(self, txns: List["Transaction"]) -> List["SignedTransaction"]:
+        return [self.sign(txn) for txn in txns]
+
+
+class PrivateKeySigner(Signer):
+    """
+    Signs with a private key that is decoded only once, when the signer is created.
+    """
+
+    def __init__(self, private_key: str):
+        from algosdk import constants, encoding
+        from nacl.signing import SigningKey
+
+        key_bytes = base64.b64decode(private_key)
+
+        self._signing_key = SigningKey(key_bytes[:constants.key_len_bytes])
+        self.address = encoding.encode_address(key_bytes[constants.key_len_bytes:])
+
+    def sign(self, txn: "Transaction") -> "SignedTransaction":
+        from algosdk import constants, encoding
+        from algosdk.future.transaction import SignedTransaction
+
+        message = constants.txid_prefix + base64.b64decode(encoding.msgpack_encode(txn))
+        signature = base64.b64encode(self._signing_key.sign(message).signature).decode()
+
+        # A transaction from a rekeyed account is authorized by this signer's address.
+        authorizing_address = None if txn.sender == self.address else self.address
+        return SignedTransaction(txn, signature, authorizing_address)
+
+
+class KMDSigner(Signer):
+    """
+    Delegates signing to a KMD wallet, or to any stand-in exposing the same sign_transaction method, so the private
+    key never enters this process.
+    """
+
+    def __init__(self, kmd_client, wallet_handle: str, wallet_password: str, address: str):
+        self.kmd_client = kmd_client
+        self.wallet_handle = wallet_handle
+        self.wallet_password = wallet_password
+        self.address = address
+
+    def sign(self, txn: "Transaction") -> "SignedTransaction":
+        return self.kmd_client.sign_transaction(self.wallet_handle, self.wallet_password, txn)
+
+
+class AddressOnlySigner(Signer):
+    """
+    Stands for an account whose key is on another machine, e.g. the one of the offline sign stage, so transactions
+    can be prepared for it on a host without the key. It can not sign.
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+
+    def sign(self, txn: "Transaction") -> "SignedTransaction":
+        raise ValueError(f"The key of {self.address} is not available on this host.")
+
+
+@lru_cache(maxsize=1024)
+def _private_key_signer(private_key: str) -> PrivateKeySigner:
+    return PrivateKeySigner(private_key)
+
+
+def resolve_signer(private_key_or_signer: Union[str, Signer]) -> Signer:
+    """
+    :param private_key_or_signer: a Signer or a base64 private key.
+    :return: the Signer itself, or the cached PrivateKeySigner of the private key.
+    """
+    if isinstance(private_key_or_signer, Signer):
+        return private_key_or_signer
+    return _private_key_signer(private_key_or_signer)
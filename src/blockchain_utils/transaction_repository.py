@@ -2,8 +2,8 @@ import base64
 from algosdk.v2client import algod
 from algosdk.future import transaction as algo_txn
 from typing import List, Any, Optional, Union
-from algosdk import account as algo_acc
 from algosdk.future.transaction import Transaction, SignedTransaction
+from src.blockchain_utils.signer import Signer, resolve_signer
 
 
 def get_default_suggested_params(client: algod.AlgodClient):
@@ -28,19 +28,20 @@ class ApplicationTransactionRepository:
     @classmethod
     def create_application(cls,
                            client: algod.AlgodClient,
-                           creator_private_key: str,
+                           creator_private_key: Union[str, Signer],
                            approval_program: bytes,
                            clear_program: bytes,
                            global_schema: algo_txn.StateSchema,
                            local_schema: algo_txn.StateSchema,
                            app_args: Optional[List[Any]] = None,
                            foreign_assets: Optional[List[int]] = None,
+                           suggested_params: Optional[algo_txn.SuggestedParams] = None,
                            sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
 
-        creator_address = algo_acc.address_from_private_key(private_key=creator_private_key)
-        suggested_params = get_default_suggested_params(client=client)
+        creator = resolve_signer(creator_private_key)
+        suggested_params = suggested_params or get_default_suggested_params(client=client)
 
-        txn = algo_txn.ApplicationCreateTxn(sender=creator_address,
+        txn = algo_txn.ApplicationCreateTxn(sender=creator.address,
                                             sp=suggested_params,
                                             on_complete=algo_txn.OnComplete.NoOpOC.real,
                                             approval_program=approval_program,
@@ -51,34 +52,36 @@ class ApplicationTransactionRepository:
                                             foreign_assets=foreign_assets)
 
         if sign_transaction:
-            txn = txn.sign(private_key=creator_private_key)
+            txn = creator.sign(txn)
 
         return txn
 
     @classmethod
     def call_application(cls,
                          client: algod.AlgodClient,
-                         caller_private_key: str,
+                         caller_private_key: Union[str, Signer],
                          app_id: int,
                          on_complete: algo_txn.OnComplete,
                          app_args: Optional[List[Any]] = None,
                          foreign_assets: Optional[List[int]] = None,
+                         suggested_params: Optional[algo_txn.SuggestedParams] = None,
                          sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
         """
         Creates a transaction that represents an application call.
         :param client: algorand client.
-        :param caller_private_key: the private key of the caller of the application.
+        :param caller_private_key: the private key or the Signer of the caller of the application.
         :param app_id: the application id which identifies the app.
         :param on_complete: Type of the application call.
         :param app_args: Arguments of the application.
+        :param suggested_params: params shared by the transactions of a group. Fetched from the client when omitted.
         :param sign_transaction: boolean value that determines whether the created transaction should be signed or not.
         :return:
         Returns SignedTransaction or Transaction depending on the boolean property sign_transaction.
         """
-        caller_address = algo_acc.address_from_private_key(private_key=caller_private_key)
-        suggested_params = get_default_suggested_params(client=client)
+        caller = resolve_signer(caller_private_key)
+        suggested_params = suggested_params or get_default_suggested_params(client=client)
 
-        txn = algo_txn.ApplicationCallTxn(sender=caller_address,
+        txn = algo_txn.ApplicationCallTxn(sender=caller.address,
                                           sp=suggested_params,
                                           index=app_id,
                                           app_args=app_args,
@@ -86,7 +89,7 @@ class ApplicationTransactionRepository:
                                           on_complete=on_complete)
 
         if sign_transaction:
-            txn = txn.sign(private_key=caller_private_key)
+            txn = caller.sign(txn)
 
         return txn
 
@@ -99,7 +102,7 @@ class ASATransactionRepository:
     @classmethod
     def create_asa(cls,
                    client: algod.AlgodClient,
-                   creator_private_key: str,
+                   creator_private_key: Union[str, Signer],
                    unit_name: str,
                    asset_name: str,
                    total: int,
@@ -111,6 +114,7 @@ class ASATransactionRepository:
                    clawback_address: Optional[str] = None,
                    url: Optional[str] = None,
                    default_frozen: bool = False,
+                   suggested_params: Optional[algo_txn.SuggestedParams] = None,
                    sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
         """
 
@@ -127,15 +131,16 @@ class ASATransactionRepository:
         :param clawback_address:
         :param url:
         :param default_frozen:
+        :param suggested_params:
         :param sign_transaction:
         :return:
         """
 
-        suggested_params = get_default_suggested_params(client=client)
+        suggested_params = suggested_params or get_default_suggested_params(client=client)
 
-        creator_address = algo_acc.address_from_private_key(private_key=creator_private_key)
+        creator = resolve_signer(creator_private_key)
 
-        txn = algo_txn.AssetConfigTxn(sender=creator_address,
+        txn = algo_txn.AssetConfigTxn(sender=creator.address,
                                       sp=suggested_params,
                                       total=total,
                                       default_frozen=default_frozen,
@@ -150,14 +155,14 @@ class ASATransactionRepository:
                                       note=note)
 
         if sign_transaction:
-            txn = txn.sign(private_key=creator_private_key)
+            txn = creator.sign(txn)
 
         return txn
 
     @classmethod
     def create_non_fungible_asa(cls,
                                 client: algod.AlgodClient,
-                                creator_private_key: str,
+                                creator_private_key: Union[str, Signer],
                                 unit_name: str,
                                 asset_name: str,
                                 note: Optional[bytes] = None,
@@ -167,6 +172,7 @@ class ASATransactionRepository:
                                 clawback_address: Optional[str] = None,
                                 url: Optional[str] = None,
                                 default_frozen: bool = False,
+                                suggested_params: Optional[algo_txn.SuggestedParams] = None,
                                 sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
         """
 
@@ -181,6 +187,7 @@ class ASATransactionRepository:
         :param clawback_address:
         :param url:
         :param default_frozen:
+        :param suggested_params:
         :param sign_transaction:
         :return:
         """
@@ -198,34 +205,37 @@ class ASATransactionRepository:
                                                    clawback_address=clawback_address,
                                                    url=url,
                                                    default_frozen=default_frozen,
+                                                   suggested_params=suggested_params,
                                                    sign_transaction=sign_transaction)
 
     @classmethod
     def asa_opt_in(cls,
                    client: algod.AlgodClient,
-                   sender_private_key: str,
+                   sender_private_key: Union[str, Signer],
                    asa_id: int,
+                   suggested_params: Optional[algo_txn.SuggestedParams] = None,
                    sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
         """
         Opts-in the sender's account to the specified asa with an id: asa_id.
         :param client:
         :param sender_private_key:
         :param asa_id:
+        :param suggested_params:
         :param sign_transaction:
         :return:
         """
 
-        suggested_params = get_default_suggested_params(client=client)
-        sender_address = algo_acc.address_from_private_key(sender_private_key)
+        suggested_params = suggested_params or get_default_suggested_params(client=client)
+        sender = resolve_signer(sender_private_key)
 
-        txn = algo_txn.AssetTransferTxn(sender=sender_address,
+        txn = algo_txn.AssetTransferTxn(sender=sender.address,
                                         sp=suggested_params,
-                                        receiver=sender_address,
+                                        receiver=sender.address,
                                         amt=0,
                                         index=asa_id)
 
         if sign_transaction:
-            txn = txn.sign(private_key=sender_private_key)
+            txn = sender.sign(txn)
 
         return txn
 
@@ -237,7 +247,8 @@ class ASATransactionRepository:
                      asa_id: int,
                      amount: int,
                      revocation_target: Optional[str],
-                     sender_private_key: Optional[str],
+                     sender_private_key: Optional[Union[str, Signer]],
+                     suggested_params: Optional[algo_txn.SuggestedParams] = None,
                      sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
         """
         :param client:
@@ -247,10 +258,11 @@ class ASATransactionRepository:
         :param amount:
         :param revocation_target:
         :param sender_private_key:
+        :param suggested_params:
         :param sign_transaction:
         :return:
         """
-        suggested_params = get_default_suggested_params(client=client)
+        suggested_params = suggested_params or get_default_suggested_params(client=client)
 
         txn = algo_txn.AssetTransferTxn(sender=sender_address,
                                         sp=suggested_params,
@@ -260,20 +272,21 @@ class ASATransactionRepository:
                                         revocation_target=revocation_target)
 
         if sign_transaction:
-            txn = txn.sign(private_key=sender_private_key)
+            txn = resolve_signer(sender_private_key).sign(txn)
 
         return txn
 
     @classmethod
     def change_asa_management(cls,
                               client: algod.AlgodClient,
-                              current_manager_pk: str,
+                              current_manager_pk: Union[str, Signer],
                               asa_id: int,
                               manager_address: Optional[str] = None,
                               reserve_address: Optional[str] = None,
                               freeze_address: Optional[str] = None,
                               clawback_address: Optional[str] = None,
                               strict_empty_address_check: bool = True,
+                              suggested_params: Optional[algo_txn.SuggestedParams] = None,
                               sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
         """
         Changes the management properties of a given ASA.
@@ -285,16 +298,17 @@ class ASATransactionRepository:
         :param freeze_address:
         :param clawback_address:
         :param strict_empty_address_check:
+        :param suggested_params:
         :param sign_transaction:
         :return:
         """
 
-        params = get_default_suggested_params(client=client)
+        params = suggested_params or get_default_suggested_params(client=client)
 
-        current_manager_address = algo_acc.address_from_private_key(private_key=current_manager_pk)
+        current_manager = resolve_signer(current_manager_pk)
 
         txn = algo_txn.AssetConfigTxn(
-            sender=current_manager_address,
+            sender=current_manager.address,
             sp=params,
             index=asa_id,
             manager=manager_address,
@@ -304,7 +318,7 @@ class ASATransactionRepository:
             strict_empty_address_check=strict_empty_address_check)
 
         if sign_transaction:
-            txn = txn.sign(private_key=current_manager_pk)
+            txn = current_manager.sign(txn)
 
         return txn
 
@@ -317,7 +331,8 @@ class PaymentTransactionRepository:
                 sender_address: str,
                 receiver_address: str,
                 amount: int,
-                sender_private_key: Optional[str],
+                sender_private_key: Optional[Union[str, Signer]],
+                suggested_params: Optional[algo_txn.SuggestedParams] = None,
                 sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
         """
         Creates a payment transaction in ALGOs.
@@ -326,10 +341,11 @@ class PaymentTransactionRepository:
         :param receiver_address:
         :param amount:
         :param sender_private_key:
+        :param suggested_params:
         :param sign_transaction:
         :return:
         """
-        suggested_params = get_default_suggested_params(client=client)
+        suggested_params = suggested_params or get_default_suggested_params(client=client)
 
         txn = algo_txn.PaymentTxn(sender=sender_address,
                                   sp=suggested_params,
@@ -337,6 +353,6 @@ class PaymentTransactionRepository:
                                   amt=amount)
 
         if sign_transaction:
-            txn = txn.sign(private_key=sender_private_key)
+            txn = resolve_signer(sender_private_key).sign(txn)
 
         return txn
@@ -0,0 +1,43 @@
+class NFTMarketplaceSchema:
+    """
+    Plain-Python description of the NFTMarketplaceASC1 state and methods. It is shared by the contract and by the
+    off-chain code, which can therefore use it without importing pyteal.
+    """
+
+    ADDRESS = "address"
+    UINT = "uint"
+
+    class Variables:
+        escrow_address = "ESCROW_ADDRESS"
+        asa_id = "ASA_ID"
+        asa_price = "ASA_PRICE"
+        asa_owner = "ASA_OWNER"
+        app_state = "APP_STATE"
+        app_admin = "APP_ADMIN"
+
+    class AppMethods:
+        initialize_escrow = "initializeEscrow"
+        make_sell_offer = "makeSellOffer"
+        buy = "buy"
+        stop_sell_offer = "stopSellOffer"
+
+    class AppState:
+        not_initialized = 0
+        active = 1
+        selling_in_progress = 2
+
+    global_state_types = {
+        Variables.escrow_address: ADDRESS,
+        Variables.asa_id: UINT,
+        Variables.asa_price: UINT,
+        Variables.asa_owner: ADDRESS,
+        Variables.app_state: UINT,
+        Variables.app_admin: ADDRESS,
+    }
+
+    @classmethod
+    def variables(cls) -> dict:
+        """
+        :return: attribute name -> global state key, e.g. asa_owner -> ASA_OWNER.
+        """
+        return {name: key for name, key in vars(cls.Variables).items() if not name.startswith("_")}
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import threading
+from typing import List, NamedTuple, Optional
+
+from src.blockchain_utils.credentials import get_project_root_path
+
+
+class ListingRecord(NamedTuple):
+    app_id: int
+    asa_id: int
+    escrow_program: bytes
+    escrow_address: str
+    owner_address: str
+    admin_address: str
+    creator_address: str
+    unit_name: str
+    asset_name: str
+    nft_url: Optional[str]
+    # Which NFTMarketplace.CONTRACT_VARIANTS the application was compiled from.
+    contract_variant: str = "original"
+
+
+class DeploymentRegistry:
+    """
+    Local SQLite registry of deployed listings. It stores everything needed to rehydrate NFTService and
+    NFTMarketplace at startup without recompiling the escrow or querying the network. Private keys are never stored.
+    """
+
+    _COLUMNS = ListingRecord._fields
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        :param path: location of the SQLite database. Defaults to deployments.db in the project root.
+        """
+        self.path = path or os.path.join(get_project_root_path(), "deployments.db")
+
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS listings (
+                    app_id INTEGER PRIMARY KEY,
+                    asa_id INTEGER NOT NULL,
+                    escrow_program BLOB NOT NULL,
+                    escrow_address TEXT NOT NULL,
+                    owner_address TEXT NOT NULL,
+                    admin_address TEXT NOT NULL,
+                    creator_address TEXT NOT NULL,
+                    unit_name TEXT NOT NULL,
+                    asset_name TEXT NOT NULL,
+                    nft_url TEXT,
+                    contract_variant TEXT NOT NULL DEFAULT 'original'
+                )
+            """)
+
+            # Databases created before the contract variant was recorded only hold original listings.
+            columns = {row[1] for row in self._connection.execute("PRAGMA table_info(listings)")}
+            if "contract_variant" not in columns:
+                self._connection.execute(
+                    "ALTER TABLE listings ADD COLUMN contract_variant TEXT NOT NULL DEFAULT 'original'")
+
+    def record_listing(self, nft_service, nft_marketplace, owner_address: Optional[str] = None) -> ListingRecord:
+        """
+        Stores a deployed listing, replacing any previous record of the same application.
+        :param nft_service: NFTService of the listed NFT.
+        :param nft_marketplace: deployed NFTMarketplace that sells the NFT.
+        :param owner_address: current owner of the NFT. Defaults to the NFT creator.
+        :return:
+        """
+        record = ListingRecord(app_id=nft_marketplace.app_id,
+                               asa_id=nft_service.nft_id,
+                               escrow_program=nft_marketplace.escrow_bytes,
+                               escrow_address=nft_marketplace.escrow_address,
+                               owner_address=owner_address or nft_service.nft_creator_address,
+                               admin_address=nft_marketplace.admin_address,
+                               creator_address=nft_service.nft_creator_address,
+                               unit_name=nft_service.unit_name,
+                               asset_name=nft_service.asset_name,
+                               nft_url=nft_service.nft_url,
+                               contract_variant=nft_marketplace.contract_variant)
+
+        placeholders = ", ".join("?" for _ in self._COLUMNS)
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO listings ({', '.join(self._COLUMNS)}) VALUES ({placeholders})",
+                tuple(record))
+
+        return record
+
+    def update_owner(self, app_id: int, owner_address: str):
+        with self._lock, self._connection:
+            self._connection.execute("UPDATE listings SET owner_address = ? WHERE app_id = ?",
+                                     (owner_address, app_id))
+
+    def remove_listing(self, app_id: int):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM listings WHERE app_id = ?", (app_id,))
+
+    def listing(self, app_id: int) -> Optional[ListingRecord]:
+        with self._lock:
+            row = self._connection.execute(f"SELECT {', '.join(self._COLUMNS)} FROM listings WHERE app_id = ?",
+                                           (app_id,)).fetchone()
+        return ListingRecord(*row) if row is not None else None
+
+    def listings(self) -> List[ListingRecord]:
+        with self._lock:
+            rows = self._connection.execute(f"SELECT {', '.join(self._COLUMNS)} FROM listings "
+                                            f"ORDER BY app_id").fetchall()
+        return [ListingRecord(*row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=8)
+
+
+def iterate_pages(search: Callable[..., dict], result_key: str, page_size: Optional[int] = None,
+                  prefetch: bool = True, **params) -> Iterator[dict]:
+    """
+    Lazily yields every result of a paginated indexer search, following next-token. While the items of a page are
+    being consumed the next page is already being fetched, and at most two pages are held at any time, so memory
+    does not grow with the size of the result.
+    :param search: indexer method accepting limit and next_page, e.g. indexer.search_assets.
+    :param result_key: key of the result list in the response, e.g. "assets".
+    :param page_size: number of results per request. Defaults to the indexer's limit.
+    :param prefetch: whether to request the next page in the background.
+    :param params: filters passed on to the search.
+    :return:
+    """
+
+    def fetch(next_page):
+        return search(limit=page_size, next_page=next_page, **params)
+
+    response = fetch(None)
+    while True:
+        items = response.get(result_key, [])
+        next_page = response.get("next-token")
+        has_next = bool(next_page) and bool(items)
+
+        pending = _prefetch_executor.submit(fetch, next_page) if has_next and prefetch else None
+
+        yield from items
+
+        if not has_next:
+            return
+
+        response = pending.result() if pending is not None else fetch(next_page)
+
+
+class IndexerIterators:
+    """
+    Iterators over the indexer searches the repositories need at collection or creator scale.
+    """
+
+    @staticmethod
+    def assets(indexer, creator: Optional[str] = None, page_size: Optional[int] = None, **params) -> Iterator[dict]:
+        if creator is not None:
+            params["creator"] = creator
+        return iterate_pages(indexer.search_assets, "assets", page_size=page_size, **params)
+
+    @staticmethod
+    def asset_balances(indexer, asset_id: int, page_size: Optional[int] = None, **params) -> Iterator[dict]:
+        return iterate_pages(indexer.asset_balances, "balances", page_size=page_size, asset_id=asset_id, **params)
+
+    @staticmethod
+    def asset_holders(indexer, asset_id: int, page_size: Optional[int] = None, **params) -> Iterator[dict]:
+        """
+        Balances of the accounts holding a positive amount of the asset. The filter is applied here because the SDK
+        drops a min_balance of 0 from the request, so the indexer also returns opted-in accounts with a zero balance,
+        such as the creator of an NFT that was transferred.
+        """
+        return (balance for balance in IndexerIterators.asset_balances(indexer, asset_id, page_size=page_size, **params)
+                if balance.get("amount", 0) > 0)
+
+    @staticmethod
+    def applications(indexer, page_size: Optional[int] = None, **params) -> Iterator[dict]:
+        return iterate_pages(indexer.search_applications, "applications", page_size=page_size, **params)
+
+    @staticmethod
+    def transactions(indexer, page_size: Optional[int] = None, **params) -> Iterator[dict]:
+        return iterate_pages(indexer.search_transactions, "transactions", page_size=page_size, **params)
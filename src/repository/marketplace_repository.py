@@ -1,24 +1,62 @@
-from src.blockchain_utils.credentials import get_indexer
+from src.blockchain_utils.credentials import get_rate_limited_indexer
+from src.repository.indexer_iterators import IndexerIterators
+from src.repository.state_decoding import GlobalStateDecoder
 import base64
-from algosdk.encoding import encode_address
 import time
 
+_global_state_decoder = GlobalStateDecoder()
+
 
 def decode_state_parameter(param_value):
     return base64.b64decode(param_value).decode('utf-8')
 
 
+def decode_global_state(global_state) -> dict:
+    """
+    Decodes the global-state list returned by algod or the indexer into a dictionary.
+    :param global_state: list of {key, value} entries with base64 encoded keys.
+    :return:
+    """
+    return _global_state_decoder.decode_state(global_state)
+
+
 class NFTMarketplaceRepository:
     @staticmethod
     def load_app_state(app_id: int):
         time.sleep(5)
-        indexer = get_indexer()
+        indexer = get_rate_limited_indexer()
         response = indexer.search_applications(application_id=app_id)
-        state = dict()
-        for state_k in response['applications'][0]['params']['global-state']:
-            key = decode_state_parameter(state_k['key'])
-            if state_k['value']['type'] == 1:
-                state[key] = encode_address(base64.b64decode(state_k['value']['bytes']))
-            else:
-                state[key] = state_k['value']['uint']
-        return state
+        return decode_global_state(response['applications'][0]['params']['global-state'])
+
+    @staticmethod
+    def load_app_state_from_client(client, app_id: int):
+        """
+        Loads the global state directly from algod. Unlike the indexer, algod reflects a transaction as soon as it is
+        confirmed, so there is no need to wait for the state to catch up.
+        :param client: algorand client.
+        :param app_id: the application id which identifies the app.
+        :return:
+        """
+        response = client.application_info(app_id)
+        return decode_global_state(response['params'].get('global-state', []))
+
+    @staticmethod
+    def load_created_app_records(client, creator_address: str):
+        """
+        Loads and decodes the state of every application created by the address with a single account lookup.
+        :param client: algorand client.
+        :param creator_address: address of the applications' creator.
+        :return: list of MarketplaceAppRecord.
+        """
+        return _global_state_decoder.decode_applications(client.account_info(creator_address))
+
+    @staticmethod
+    def iterate_app_records(indexer=None, **params):
+        """
+        Lazily decodes every application matched by an indexer search, page by page.
+        :param indexer: indexer client. Defaults to the configured one.
+        :param params: filters passed on to search_applications.
+        :return: iterator of MarketplaceAppRecord.
+        """
+        indexer = indexer or get_rate_limited_indexer()
+        return map(_global_state_decoder.decode_application, IndexerIterators.applications(indexer, **params))
@@ -1,17 +1,54 @@
-from src.blockchain_utils.credentials import get_indexer
-import time
+from src.blockchain_utils.credentials import get_rate_limited_indexer
+from src.repository.indexer_iterators import IndexerIterators
+from src.repository.ownership_index import OwnershipIndex
+from typing import Iterator, Optional
 
 
 class NFTRepository:
-    def __init__(self):
-        self.indexer = get_indexer()
+    """
+    Owners are answered from an OwnershipIndex: the first lookup of an NFT loads its owner, and later lookups are
+    local reads while a background thread applies the NFTs' new transfers every sync_interval seconds.
+    """
+
+    def __init__(self, indexer=None, sync_interval: Optional[float] = 2.0):
+        """
+        :param indexer:
+        :param sync_interval: seconds between two syncs of the owners. None leaves the syncing to the caller, e.g.
+        by feeding the index the transfers or sold events it observes.
+        """
+        self.indexer = indexer or get_rate_limited_indexer()
+        self.ownership_index = OwnershipIndex(self.indexer)
+        self.sync_interval = sync_interval
 
     def nft_image(self, nft_id: int):
-        time.sleep(5)
-        response = self.indexer.search_assets(asset_id=nft_id)
-        return response["assets"][0]["params"]["url"]
+        response = self.indexer.asset_info(nft_id)
+        return response["asset"]["params"]["url"]
 
     def nft_owner(self, nft_id: int):
-        time.sleep(5)
-        response = self.indexer.asset_balances(asset_id=nft_id)
-        return response["balances"][0]["address"]
+        if nft_id not in self.ownership_index:
+            self.ownership_index.seed([nft_id])
+            if self.sync_interval is not None:
+                self.ownership_index.start(sync_interval=self.sync_interval)
+        return self.ownership_index.owner_of(nft_id)
+
+    def stop(self):
+        """
+        Stops the background sync of the owners.
+        """
+        self.ownership_index.stop()
+
+    def nfts_created_by(self, creator_address: str) -> Iterator[dict]:
+        """
+        Lazily iterates over every asset created by the address, across all the indexer pages.
+        :param creator_address:
+        :return: asset entries as returned by the indexer.
+        """
+        return IndexerIterators.assets(self.indexer, creator=creator_address)
+
+    def nft_holders(self, nft_id: int) -> Iterator[dict]:
+        """
+        Lazily iterates over the accounts holding a positive amount of the NFT.
+        :param nft_id:
+        :return: balance entries as returned by the indexer.
+        """
+        return IndexerIterators.asset_holders(self.indexer, asset_id=nft_id)
@@ -0,0 +1,207 @@
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from src.blockchain_utils.credentials import get_rate_limited_indexer
+from src.repository.indexer_iterators import IndexerIterators
+
+
+class OwnershipIndex:
+    """
+    Local index of who owns which NFT. It is seeded once from the indexer and then kept up to date from the asset
+    transfers and sold MarketplaceEvents it is fed, so owner_of and assets_of are dictionary lookups. Every update
+    carries its round and updates older than the last one seen for the asset are ignored, so transfers can be fed
+    out of order. reconcile re-reads the owners from the indexer to correct any drift.
+    """
+
+    def __init__(self, indexer=None):
+        self.indexer = indexer or get_rate_limited_indexer()
+        self.last_round = 0
+
+        self._owners: Dict[int, str] = dict()
+        self._assets: Dict[str, Set[int]] = dict()
+        self._rounds: Dict[int, int] = dict()
+        self._lock = threading.Lock()
+
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # Queries
+
+    def owner_of(self, asa_id: int) -> Optional[str]:
+        return self._owners.get(asa_id)
+
+    def assets_of(self, owner_address: str) -> FrozenSet[int]:
+        with self._lock:
+            return frozenset(self._assets.get(owner_address, ()))
+
+    def __contains__(self, asa_id: int) -> bool:
+        return asa_id in self._owners
+
+    def __len__(self):
+        return len(self._owners)
+
+    # Seeding and reconciliation
+
+    def seed(self, asa_ids: Iterable[int]):
+        """
+        Loads the current owner of every NFT from the indexer.
+        :param asa_ids:
+        """
+        for asa_id in asa_ids:
+            owner_address, round_number = self._load_owner(asa_id)
+            self._set_owner(asa_id, owner_address, round_number)
+
+    def seed_creator(self, creator_address: str):
+        """
+        Loads the current owner of every asset created by the address.
+        :param creator_address:
+        """
+        self.seed(asset["index"] for asset in IndexerIterators.assets(self.indexer, creator=creator_address))
+
+    def reconcile(self, asa_ids: Optional[Iterable[int]] = None) -> List[int]:
+        """
+        Compares the index with the indexer and corrects the owners that drifted.
+        :param asa_ids: NFTs to check. Defaults to every indexed NFT.
+        :return: ids of the corrected NFTs.
+        """
+        if asa_ids is None:
+            with self._lock:
+                asa_ids = list(self._owners)
+
+        corrected = []
+        for asa_id in asa_ids:
+            owner_address, round_number = self._load_owner(asa_id)
+            if self._set_owner(asa_id, owner_address, round_number):
+                corrected.append(asa_id)
+        return corrected
+
+    def sync(self, min_round: Optional[int] = None, asa_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Applies the transfers of the indexed NFTs confirmed since min_round, read from the indexer page by page with
+        one search per NFT, so the transfers of every other asset on the network are never read.
+        :param min_round: first round to read. Defaults to the round after the last update of each NFT.
+        :param asa_ids: NFTs to update. Defaults to every indexed NFT.
+        :return: number of transactions read.
+        """
+        with self._lock:
+            asa_ids = list(self._owners) if asa_ids is None else [asa_id for asa_id in asa_ids
+                                                                    if asa_id in self._owners]
+            rounds = {asa_id: self._rounds.get(asa_id, 0) for asa_id in asa_ids}
+
+        count = 0
+        for asa_id, asset_round in rounds.items():
+            first_round = asset_round + 1 if min_round is None else min_round
+            for txn in IndexerIterators.transactions(self.indexer, txn_type="axfer", asset_id=asa_id,
+                                                     min_round=first_round):
+                self.ingest_transaction(txn)
+                count += 1
+        return count
+
+    def start(self, sync_interval: float = 2.0):
+        """
+        Syncs every indexed NFT in a background thread, every sync_interval seconds, until stop is called. A failed
+        sync is retried at the next interval. Calling start again while the thread runs does nothing.
+        :param sync_interval: seconds between two syncs.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._sync_periodically, args=(sync_interval,), daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _sync_periodically(self, sync_interval: float):
+        while not self._stopped.wait(sync_interval):
+            try:
+                self.sync()
+            except Exception:
+                pass
+
+    # Incremental updates
+
+    def ingest_transaction(self, txn: dict) -> bool:
+        """
+        Applies a confirmed asset transfer, as returned by the indexer. Transfers of indexed NFTs only.
+        :return: whether the owner of an indexed NFT changed.
+        """
+        if txn.get("tx-type") != "axfer":
+            return False
+
+        transfer = txn["asset-transfer-transaction"]
+        asa_id = transfer["asset-id"]
+        if asa_id not in self._owners:
+            return False
+
+        round_number = txn.get("confirmed-round")
+        if transfer.get("amount", 0) > 0:
+            return self._set_owner(asa_id, transfer["receiver"], round_number)
+        if transfer.get("close-to") and transfer.get("close-amount", 0) > 0:
+            return self._set_owner(asa_id, transfer["close-to"], round_number)
+        return False
+
+    def ingest_group(self, group: List[dict]) -> bool:
+        """
+        Applies the transfers of a confirmed atomic group, e.g. the escrow's transfer of a buy group.
+        :return: whether any owner changed.
+        """
+        changed = False
+        for txn in group:
+            changed = self.ingest_transaction(txn) or changed
+        return changed
+
+    def ingest_event(self, event) -> bool:
+        """
+        Applies a sold MarketplaceEvent produced by MarketplaceEventFollower: the buyer is the new owner.
+        :return: whether the owner of an indexed NFT changed.
+        """
+        if event.kind != "sold" or event.asa_id is None or event.asa_id not in self._owners:
+            return False
+        return self._set_owner(event.asa_id, event.sender, event.round)
+
+    # Internals
+
+    def _load_owner(self, asa_id: int):
+        """
+        Pages through the balances until the first positive one. The indexer also returns opted-in accounts with a
+        zero balance, e.g. the creator after the NFT was transferred, because the SDK drops a min_balance of 0.
+        :return: (address holding a positive amount of the NFT or None, round the answer is valid for)
+        """
+        round_number = None
+        next_page = None
+        while True:
+            response = self.indexer.asset_balances(asa_id, next_page=next_page)
+            if round_number is None:
+                round_number = response.get("current-round")
+
+            balances = response.get("balances", [])
+            owner_address = next((balance["address"] for balance in balances if balance.get("amount", 0) > 0), None)
+            next_page = response.get("next-token")
+            if owner_address is not None or not next_page or not balances:
+                return owner_address, round_number
+
+    def _set_owner(self, asa_id: int, owner_address: Optional[str], round_number: Optional[int]) -> bool:
+        with self._lock:
+            if round_number is not None:
+                if round_number < self._rounds.get(asa_id, 0):
+                    return False
+                self._rounds[asa_id] = round_number
+                self.last_round = max(self.last_round, round_number)
+
+            previous_owner = self._owners.get(asa_id)
+            if asa_id in self._owners and previous_owner == owner_address:
+                return False
+
+            if previous_owner is not None:
+                assets = self._assets.get(previous_owner)
+                if assets is not None:
+                    assets.discard(asa_id)
+                    if not assets:
+                        del self._assets[previous_owner]
+
+            self._owners[asa_id] = owner_address
+            if owner_address is not None:
+                self._assets.setdefault(owner_address, set()).add(asa_id)
+            return True
@@ -0,0 +1,77 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller executes the function and every caller that
+    arrives while it is in flight waits for and receives the same result (or exception).
+    Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = dict()
+        self._lock = threading.Lock()
+
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class SingleFlightRepository:
+    """
+    Wraps a repository (class or instance), e.g. NFTMarketplaceRepository or NFTRepository(), so that concurrent
+    identical reads share one upstream request:
+
+        marketplace_repository = SingleFlightRepository(NFTMarketplaceRepository)
+        marketplace_repository.load_app_state(app_id)
+    """
+
+    def __init__(self, repository, single_flight: SingleFlight = None):
+        self.repository = repository
+        self.single_flight = single_flight or SingleFlight()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.repository, name)
+        if not callable(attribute) or name.startswith("_"):
+            return attribute
+
+        def call(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            return self.single_flight.do(key, lambda: attribute(*args, **kwargs))
+
+        return call
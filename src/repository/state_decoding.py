@@ -0,0 +1,106 @@
+import base64
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional, Union
+
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+
+
+class MarketplaceAppRecord(NamedTuple):
+    app_id: int
+    escrow_address: Optional[str] = None
+    asa_id: Optional[int] = None
+    asa_price: Optional[int] = None
+    asa_owner: Optional[str] = None
+    app_state: Optional[int] = None
+    app_admin: Optional[str] = None
+
+
+class GlobalStateDecoder:
+    """
+    Decodes marketplace global state in bulk. The key of every schema variable is pre-encoded to the base64 form the
+    nodes return, so known keys are matched without decoding them, and the type of each value comes from
+    NFTMarketplaceSchema instead of being guessed. Unknown keys and addresses are decoded once and cached.
+    """
+
+    BYTES_TYPE = 1
+
+    def __init__(self, schema=NFTMarketplaceSchema, max_cached_addresses: int = 100000):
+        self._known_keys = {
+            base64.b64encode(key.encode()).decode(): (name, key, schema.global_state_types.get(key))
+            for name, key in schema.variables().items()
+        }
+        self._unknown_keys = dict()
+
+        self._addresses = OrderedDict()
+        self._max_cached_addresses = max_cached_addresses
+
+    def decode_state(self, global_state: Iterable[dict]) -> dict:
+        """
+        :param global_state: list of {key, value} entries as returned by algod or the indexer.
+        :return: state key -> decoded value, e.g. {"ASA_OWNER": "...", "ASA_PRICE": 1000}.
+        """
+        state = dict()
+        for entry in global_state:
+            _, key, value = self._decode_entry(entry)
+            state[key] = value
+        return state
+
+    def decode_application(self, application: dict) -> MarketplaceAppRecord:
+        fields = dict()
+        for entry in application["params"].get("global-state", []):
+            name, _, value = self._decode_entry(entry)
+            if name is not None:
+                fields[name] = value
+        return MarketplaceAppRecord(app_id=application["id"], **fields)
+
+    def decode_applications(self, page: Union[dict, List[dict]]) -> List[MarketplaceAppRecord]:
+        """
+        Decodes every application of a result page in one pass.
+        :param page: indexer search_applications response, algod account_info response (created-apps), algod
+        application_info response or a plain list of applications.
+        :return:
+        """
+        if isinstance(page, dict):
+            if "applications" in page:
+                applications = page["applications"]
+            elif "created-apps" in page:
+                applications = page["created-apps"]
+            else:
+                applications = [page]
+        else:
+            applications = page
+
+        decode_application = self.decode_application
+        return [decode_application(application) for application in applications]
+
+    def _decode_entry(self, entry: dict):
+        encoded_key = entry["key"]
+        known = self._known_keys.get(encoded_key)
+        if known is not None:
+            name, key, value_type = known
+        else:
+            name, value_type = None, None
+            key = self._unknown_keys.get(encoded_key)
+            if key is None:
+                key = base64.b64decode(encoded_key).decode("utf-8", errors="replace")
+                self._unknown_keys[encoded_key] = key
+
+        value = entry["value"]
+        if value["type"] != self.BYTES_TYPE:
+            return name, key, value.get("uint", 0)
+
+        if value_type == NFTMarketplaceSchema.ADDRESS:
+            return name, key, self._address(value["bytes"])
+
+        return name, key, base64.b64decode(value["bytes"])
+
+    def _address(self, encoded_bytes: str) -> str:
+        address = self._addresses.get(encoded_bytes)
+        if address is None:
+            from algosdk.encoding import encode_address
+
+            address = encode_address(base64.b64decode(encoded_bytes))
+            self._addresses[encoded_bytes] = address
+            if len(self._addresses) > self._max_cached_addresses:
+                self._addresses.popitem(last=False)
+        return address
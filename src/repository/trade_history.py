@@ -0,0 +1,241 @@
+import base64
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class TradeHistory:
+    """
+    Column-oriented store of completed NFT sales. Every column is a NumPy array, so the analytics below are
+    vectorized and stay fast across millions of trades. The store can be saved to a directory of .npy files and
+    loaded back memory-mapped.
+    """
+
+    COLUMNS = {
+        "round": np.int64,
+        "timestamp": np.int64,
+        "app_id": np.int64,
+        "asa_id": np.int64,
+        "price": np.int64,
+        "amount": np.int64,
+        "buyer": np.int32,
+        "seller": np.int32,
+    }
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._columns = {name: np.empty(initial_capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self._size = 0
+        self._sorted = True
+
+        self._addresses: List[str] = []
+        self._address_ids: Dict[str, int] = dict()
+
+    def __len__(self):
+        return self._size
+
+    def column(self, name: str) -> np.ndarray:
+        self._ensure_sorted()
+        return self._columns[name][:self._size]
+
+    def address(self, address_id: int) -> str:
+        return self._addresses[address_id]
+
+    # Ingestion
+
+    def add_trade(self, round_number: int, timestamp: int, app_id: int, asa_id: int, price: int,
+                  buyer: str, seller: str, amount: int = 1):
+        if self._size == len(self._columns["round"]) or not self._columns["round"].flags.writeable:
+            self._grow()
+
+        index = self._size
+        values = dict(round=round_number, timestamp=timestamp, app_id=app_id, asa_id=asa_id, price=price,
+                      amount=amount, buyer=self._address_id(buyer), seller=self._address_id(seller))
+        for name, value in values.items():
+            self._columns[name][index] = value
+
+        if index > 0 and timestamp < self._columns["timestamp"][index - 1]:
+            self._sorted = False
+        self._size += 1
+
+    def ingest_group(self, group: List[dict], round_number: int, timestamp: int) -> bool:
+        """
+        Ingests a confirmed atomic group, as returned by the indexer, if it is a marketplace buy: an application call
+        with the "buy" argument, the payment from the buyer to the seller and the escrow's NFT transfer.
+        :param group: transactions of the group.
+        :param round_number: confirmation round of the group.
+        :param timestamp: round time of the confirmation round.
+        :return: whether the group was a buy.
+        """
+        app_call = payment = transfer = None
+        for txn in group:
+            tx_type = txn.get("tx-type")
+            if tx_type == "appl":
+                args = txn["application-transaction"].get("application-args", [])
+                if args and base64.b64decode(args[0]) == b"buy":
+                    app_call = txn
+            elif tx_type == "pay":
+                payment = txn
+            elif tx_type == "axfer" and txn["asset-transfer-transaction"].get("amount", 0) > 0:
+                transfer = txn
+
+        if app_call is None or payment is None or transfer is None:
+            return False
+
+        self.add_trade(round_number=round_number,
+                       timestamp=timestamp,
+                       app_id=app_call["application-transaction"]["application-id"],
+                       asa_id=transfer["asset-transfer-transaction"]["asset-id"],
+                       price=payment["payment-transaction"]["amount"],
+                       amount=transfer["asset-transfer-transaction"]["amount"],
+                       buyer=app_call["sender"],
+                       seller=payment["payment-transaction"]["receiver"])
+        return True
+
+    def ingest_event(self, event) -> bool:
+        """
+        Ingests a sold MarketplaceEvent produced by MarketplaceEventFollower.
+        :return: whether the event was a sale.
+        """
+        if event.kind != "sold" or event.price is None or event.seller is None:
+            return False
+
+        self.add_trade(round_number=event.round,
+                       timestamp=event.timestamp or 0,
+                       app_id=event.app_id,
+                       asa_id=event.asa_id or 0,
+                       price=event.price,
+                       buyer=event.sender,
+                       seller=event.seller)
+        return True
+
+    # Analytics
+
+    def floor_price(self, start: Optional[int] = None, end: Optional[int] = None,
+                    asa_ids: Optional[List[int]] = None) -> Optional[int]:
+        prices = self._window("price", start, end, asa_ids)
+        return int(prices.min()) if len(prices) else None
+
+    def volume(self, start: Optional[int] = None, end: Optional[int] = None,
+               asa_ids: Optional[List[int]] = None) -> int:
+        return int(self._window("price", start, end, asa_ids).sum())
+
+    def vwap(self, start: Optional[int] = None, end: Optional[int] = None,
+             asa_ids: Optional[List[int]] = None) -> Optional[float]:
+        """
+        Volume weighted average unit price. The price column holds the total paid for `amount` units.
+        """
+        prices = self._window("price", start, end, asa_ids)
+        amounts = self._window("amount", start, end, asa_ids)
+        total_amount = amounts.sum()
+        return float(prices.sum() / total_amount) if total_amount else None
+
+    def turnover_by_owner(self, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, Tuple[int, int]]:
+        """
+        :return: address -> (volume sold, volume bought) within the window.
+        """
+        prices = self._window("price", start, end)
+        sellers = self._window("seller", start, end)
+        buyers = self._window("buyer", start, end)
+
+        # Accumulated in int64: bincount weights are float64, which cannot represent every price sum exactly.
+        size = len(self._addresses)
+        sold = np.zeros(size, dtype=np.int64)
+        bought = np.zeros(size, dtype=np.int64)
+        np.add.at(sold, sellers, prices)
+        np.add.at(bought, buyers, prices)
+
+        active = np.flatnonzero((sold > 0) | (bought > 0))
+        return {self._addresses[i]: (int(sold[i]), int(bought[i])) for i in active}
+
+    def series(self, bucket_seconds: int, start: Optional[int] = None, end: Optional[int] = None) -> dict:
+        """
+        Aggregates the trades into fixed time buckets.
+        :return: dictionary of equally long arrays: bucket_start, trades, volume, vwap and floor_price.
+        """
+        timestamps = self._window("timestamp", start, end)
+        prices = self._window("price", start, end)
+        amounts = self._window("amount", start, end)
+
+        if not len(timestamps):
+            empty = np.empty(0, dtype=np.int64)
+            return dict(bucket_start=empty, trades=empty, volume=empty, vwap=np.empty(0), floor_price=empty)
+
+        buckets = timestamps // bucket_seconds
+        # The window is sorted by timestamp, so each bucket is a contiguous run.
+        bucket_ids, offsets = np.unique(buckets, return_index=True)
+        volume = np.add.reduceat(prices, offsets)
+
+        return dict(bucket_start=bucket_ids * bucket_seconds,
+                    trades=np.diff(np.append(offsets, len(buckets))),
+                    volume=volume,
+                    vwap=volume / np.add.reduceat(amounts, offsets),
+                    floor_price=np.minimum.reduceat(prices, offsets))
+
+    # Persistence
+
+    def save(self, directory: str):
+        self._ensure_sorted()
+        os.makedirs(directory, exist_ok=True)
+        for name in self.COLUMNS:
+            np.save(os.path.join(directory, f"{name}.npy"), self._columns[name][:self._size])
+        with open(os.path.join(directory, "addresses.json"), "w") as file:
+            json.dump(self._addresses, file)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "TradeHistory":
+        """
+        Loads a saved store. With mmap the columns are memory-mapped read-only and only copied into memory when a
+        new trade is added.
+        """
+        history = cls(initial_capacity=0)
+        for name in cls.COLUMNS:
+            history._columns[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+        history._size = len(history._columns["round"])
+
+        with open(os.path.join(directory, "addresses.json")) as file:
+            history._addresses = json.load(file)
+        history._address_ids = {address: i for i, address in enumerate(history._addresses)}
+
+        return history
+
+    # Internals
+
+    def _address_id(self, address: str) -> int:
+        address_id = self._address_ids.get(address)
+        if address_id is None:
+            address_id = len(self._addresses)
+            self._addresses.append(address)
+            self._address_ids[address] = address_id
+        return address_id
+
+    def _grow(self):
+        capacity = max(1024, 2 * len(self._columns["round"]))
+        for name, dtype in self.COLUMNS.items():
+            column = np.empty(capacity, dtype=dtype)
+            column[:self._size] = self._columns[name][:self._size]
+            self._columns[name] = column
+
+    def _ensure_sorted(self):
+        if self._sorted:
+            return
+
+        order = np.argsort(self._columns["timestamp"][:self._size], kind="stable")
+        for name in self.COLUMNS:
+            self._columns[name][:self._size] = self._columns[name][:self._size][order]
+        self._sorted = True
+
+    def _window(self, name: str, start: Optional[int], end: Optional[int],
+                asa_ids: Optional[List[int]] = None) -> np.ndarray:
+        """
+        Values of the column for the trades with start <= timestamp < end, found with a binary search.
+        """
+        timestamps = self.column("timestamp")
+        low = 0 if start is None else np.searchsorted(timestamps, start, side="left")
+        high = self._size if end is None else np.searchsorted(timestamps, end, side="left")
+
+        values = self._columns[name][low:high]
+        if asa_ids is not None:
+            values = values[np.isin(self._columns["asa_id"][low:high], asa_ids)]
+        return values
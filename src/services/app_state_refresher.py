@@ -0,0 +1,138 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from src.repository.marketplace_repository import NFTMarketplaceRepository
+from src.repository.single_flight import SingleFlightRepository
+
+
+class AppStateRefresher:
+    """
+    Keeps the global state of the watched marketplace applications cached in memory and refreshes it from algod on a
+    background thread, so readers never wait for the network unless a state has not been loaded yet.
+    At most max_entries states are kept. The least recently requested ones are evicted and no longer refreshed.
+    Every invalidation starts a new generation of the application's state: a load that started before it can no
+    longer overwrite the state it stored.
+    """
+
+    def __init__(self,
+                 client,
+                 refresh_interval: float = 5.0,
+                 max_entries: int = 256,
+                 max_workers: int = 8,
+                 on_error: Optional[Callable[[int, Exception], None]] = None):
+        """
+        :param client: algorand client.
+        :param refresh_interval: seconds between two background refreshes of every cached state.
+        :param max_entries: maximum number of cached states.
+        :param max_workers: maximum number of states loaded at the same time.
+        :param on_error: called from a worker thread as on_error(app_id, error) when a background refresh fails.
+        The previous state stays cached and the error is kept in refresh_errors until a refresh succeeds.
+        """
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.max_entries = max_entries
+        self.on_error = on_error
+        self.refresh_errors: Dict[int, Exception] = dict()
+
+        self._states: Dict[int, dict] = OrderedDict()
+        # app_id -> generation of its cached state. Generations come from one counter, so they are never reused.
+        self._generations: Dict[int, int] = dict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        # First reads and background refreshes of the same app at the same time share one request.
+        self._repository = SingleFlightRepository(NFTMarketplaceRepository)
+
+        self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._thread.start()
+
+    def get(self, app_id: int) -> dict:
+        """
+        Returns the cached state of the application, loading it synchronously the first time it is requested.
+        :param app_id: the application id which identifies the app.
+        :return:
+        """
+        return self.get_many([app_id])[app_id]
+
+    def get_many(self, app_ids: List[int]) -> Dict[int, dict]:
+        """
+        Returns the states of all the applications. The ones that are not cached yet are loaded concurrently.
+        :param app_ids: list of application ids.
+        :return:
+        """
+        states = dict()
+        missing = []
+        with self._lock:
+            for app_id in app_ids:
+                if app_id in self._states:
+                    self._states.move_to_end(app_id)
+                    states[app_id] = self._states[app_id]
+                else:
+                    missing.append(app_id)
+
+        loads = self._executor.map(lambda app_id: self._load(app_id, self._repository), missing)
+        for app_id, state in zip(missing, loads):
+            states[app_id] = state
+
+        return states
+
+    def invalidate(self, app_id: int) -> dict:
+        """
+        Reloads the state of the application immediately. Should be called after a transaction that changes the
+        application state has been confirmed. The load is never shared with one already in flight, since that one
+        may have read the state before the transaction was confirmed.
+        :param app_id: the application id which identifies the app.
+        :return:
+        """
+        return self._load(app_id, NFTMarketplaceRepository)
+
+    def _load(self, app_id: int, repository) -> dict:
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._generations[app_id] = generation
+
+        state = repository.load_app_state_from_client(client=self.client, app_id=app_id)
+        with self._lock:
+            # A later invalidation of the same app has already loaded a newer state.
+            if self._generations.get(app_id) == generation:
+                self._states[app_id] = state
+                self._states.move_to_end(app_id)
+                while len(self._states) > self.max_entries:
+                    evicted_app_id, _ = self._states.popitem(last=False)
+                    del self._generations[evicted_app_id]
+        return state
+
+    def stop(self):
+        self._stop_event.set()
+        self._executor.shutdown(wait=False)
+
+    def _refresh(self, app_id: int):
+        with self._lock:
+            generation = self._generations.get(app_id)
+
+        try:
+            state = self._repository.load_app_state_from_client(client=self.client, app_id=app_id)
+        except Exception as e:
+            # The previous state stays cached until the next successful refresh.
+            self.refresh_errors[app_id] = e
+            if self.on_error is not None:
+                self.on_error(app_id, e)
+            return
+
+        self.refresh_errors.pop(app_id, None)
+        with self._lock:
+            # Refreshing must neither resurrect evicted apps, nor overwrite a state loaded by a later invalidation,
+            # nor change the recency order.
+            if app_id in self._states and self._generations.get(app_id) == generation:
+                self._states[app_id] = state
+
+    def _refresh_loop(self):
+        while not self._stop_event.wait(self.refresh_interval):
+            with self._lock:
+                app_ids = list(self._states.keys())
+
+            list(self._executor.map(self._refresh, app_ids))
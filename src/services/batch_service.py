@@ -0,0 +1,282 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.blockchain_utils.group_builder import GroupTransactionBuilder, MAX_GROUP_SIZE
+from src.blockchain_utils.signer import resolve_signer
+from src.blockchain_utils.transaction_repository import (
+    ASATransactionRepository,
+    PaymentTransactionRepository,
+    get_default_suggested_params,
+)
+from src.services import NetworkInteraction
+from src.services.nft_marketplace import NFTMarketplace
+from src.services.preflight import MarketplacePreflight, PreflightError
+
+
+class TransactionResult:
+    def __init__(self):
+        self.tx_id: Optional[str] = None
+        self.confirmed_round: Optional[int] = None
+        self.error: Optional[Exception] = None
+        self.skipped = False
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None and (self.skipped or self.confirmed_round is not None)
+
+
+class BatchResult(TransactionResult):
+    def __init__(self, nft_marketplace: NFTMarketplace):
+        super().__init__()
+        self.nft_marketplace = nft_marketplace
+
+    @property
+    def app_id(self) -> int:
+        return self.nft_marketplace.app_id
+
+
+class OptInResult(TransactionResult):
+    """
+    skipped is set when the account already held the asset.
+    """
+
+    def __init__(self, asa_id: int):
+        super().__init__()
+        self.asa_id = asa_id
+
+
+class FundingResult(TransactionResult):
+    """
+    balance is the balance found before funding; skipped is set when it was not below the threshold.
+    """
+
+    def __init__(self, escrow_address: str):
+        super().__init__()
+        self.escrow_address = escrow_address
+        self.balance: Optional[int] = None
+        self.amount = 0
+
+
+class MarketplaceBatchService:
+    """
+    Sends the same kind of transaction for many listings or assets of one account, packed into atomic groups of up
+    to 16 transactions. The groups share one set of suggested params, are submitted concurrently and confirmed together,
+    so repricing 1,000 listings takes 63 groups and about one confirmation wait.
+    A group is atomic: if one of its calls is rejected, every listing of that group reports the error. Cached
+    application states, e.g. in AppStateRefresher, should be invalidated for the listings that succeeded.
+    """
+
+    def __init__(self, client, max_workers: int = 8):
+        """
+        :param client: algorand client.
+        :param max_workers: maximum number of groups submitted at the same time.
+        """
+        self.client = client
+        self.max_workers = max_workers
+
+    def reprice(self,
+                sell_offers: List[Tuple[NFTMarketplace, int]],
+                nft_owner_pk,
+                app_states: Optional[Dict[int, dict]] = None) -> List[BatchResult]:
+        """
+        Puts every listing on sale, or changes its price if it already is.
+        :param sell_offers: pairs of a listing and its new price.
+        :param nft_owner_pk: private key or Signer of the owner of all the listings.
+        :param app_states: app_id -> cached application state. Listings with a state are validated locally and
+        only the ones that would pass are submitted.
+        :return: one result per sell offer, in the same order.
+        """
+        seller_address = resolve_signer(nft_owner_pk).address
+
+        def check(nft_marketplace, app_state, sell_price):
+            MarketplacePreflight.check_make_sell_offer(app_state=app_state,
+                                                       seller_address=seller_address,
+                                                       sell_price=sell_price)
+
+        def build_txn(nft_marketplace, sell_price, suggested_params):
+            return nft_marketplace.make_sell_offer_txn(sell_price=sell_price,
+                                                       nft_owner_pk=nft_owner_pk,
+                                                       suggested_params=suggested_params,
+                                                       sign_transaction=False)
+
+        return self._run(sell_offers, nft_owner_pk, app_states, check, build_txn)
+
+    def delist(self,
+               nft_marketplaces: List[NFTMarketplace],
+               nft_owner_pk,
+               app_states: Optional[Dict[int, dict]] = None) -> List[BatchResult]:
+        """
+        Takes every listing off sale.
+        :param nft_marketplaces: the listings.
+        :param nft_owner_pk: private key or Signer of the owner of all the listings.
+        :param app_states: app_id -> cached application state used for local validation, as in reprice.
+        :return: one result per listing, in the same order.
+        """
+        seller_address = resolve_signer(nft_owner_pk).address
+
+        def check(nft_marketplace, app_state):
+            MarketplacePreflight.check_stop_sell_offer(app_state=app_state, seller_address=seller_address)
+
+        def build_txn(nft_marketplace, suggested_params):
+            return nft_marketplace.stop_sell_offer_txn(nft_owner_pk=nft_owner_pk,
+                                                       suggested_params=suggested_params,
+                                                       sign_transaction=False)
+
+        return self._run([(nft_marketplace,) for nft_marketplace in nft_marketplaces],
+                         nft_owner_pk, app_states, check, build_txn)
+
+    def opt_in(self, account_pk, asa_ids: List[int]) -> List[OptInResult]:
+        """
+        Opts the account in to many assets. The assets the account already holds are found with a single account
+        lookup and skipped.
+        :param account_pk: private key or Signer of the account.
+        :param asa_ids: ids of the assets.
+        :return: one result per distinct asset id, in the order of first appearance.
+        """
+        account_info = self.client.account_info(resolve_signer(account_pk).address)
+        held_asa_ids = {asset["asset-id"] for asset in account_info.get("assets", [])}
+
+        results = [OptInResult(asa_id) for asa_id in dict.fromkeys(asa_ids)]
+        entries = []
+        for result in results:
+            if result.asa_id in held_asa_ids:
+                result.skipped = True
+                continue
+
+            entries.append((result, partial(ASATransactionRepository.asa_opt_in,
+                                            client=self.client,
+                                            sender_private_key=account_pk,
+                                            asa_id=result.asa_id,
+                                            sign_transaction=False)))
+
+        self._submit_in_groups(entries, account_pk)
+        return results
+
+    def fund_escrows(self,
+                     funder_pk,
+                     escrow_addresses: List[str],
+                     threshold: int = NFTMarketplace.ESCROW_FUNDING_AMOUNT,
+                     target: Optional[int] = None) -> List[FundingResult]:
+        """
+        Tops up the escrows whose balance is below the threshold. The balances are looked up concurrently and each
+        escrow receives only the difference to the target, so funded escrows cost nothing and the buffer goes where
+        it is needed.
+        :param funder_pk: private key or Signer of the funding account.
+        :param escrow_addresses: addresses of the escrows.
+        :param threshold: escrows with fewer micro algos than this are funded.
+        :param target: balance in micro algos the funded escrows are brought to. Defaults to the threshold.
+        :return: one result per distinct escrow address, in the order of first appearance.
+        """
+        target = threshold if target is None else target
+        if target < threshold:
+            raise ValueError(f"The target balance {target} is lower than the threshold {threshold}.")
+
+        funder_address = resolve_signer(funder_pk).address
+        results = [FundingResult(escrow_address) for escrow_address in dict.fromkeys(escrow_addresses)]
+
+        def load_balance(result: FundingResult):
+            try:
+                result.balance = self.client.account_info(result.escrow_address).get("amount", 0)
+            except Exception as e:
+                result.error = e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(load_balance, results))
+
+        entries = []
+        for result in results:
+            if result.error is not None:
+                continue
+            if result.balance >= threshold:
+                result.skipped = True
+                continue
+
+            result.amount = target - result.balance
+            entries.append((result, partial(PaymentTransactionRepository.payment,
+                                            client=self.client,
+                                            sender_address=funder_address,
+                                            receiver_address=result.escrow_address,
+                                            amount=result.amount,
+                                            sender_private_key=funder_pk,
+                                            sign_transaction=False)))
+
+        self._submit_in_groups(entries, funder_pk)
+        return results
+
+    def _run(self,
+             calls: List[tuple],
+             signer,
+             app_states: Optional[Dict[int, dict]],
+             check: Callable,
+             build_txn: Callable) -> List[BatchResult]:
+        """
+        :param calls: tuples of a listing followed by the extra arguments of check and build_txn.
+        :param check: check(listing, app_state, *args) raises PreflightError if the call would be rejected.
+        :param build_txn: build_txn(listing, *args, suggested_params) returns the unsigned transaction.
+        """
+        app_states = app_states or dict()
+        results = [BatchResult(call[0]) for call in calls]
+
+        entries = []
+        for result, (nft_marketplace, *args) in zip(results, calls):
+            app_state = app_states.get(nft_marketplace.app_id)
+            if app_state is not None:
+                try:
+                    check(nft_marketplace, app_state, *args)
+                except PreflightError as e:
+                    result.error = e
+                    continue
+            entries.append((result, partial(build_txn, nft_marketplace, *args)))
+
+        self._submit_in_groups(entries, signer)
+        return results
+
+    def _submit_in_groups(self, entries: List[Tuple[TransactionResult, Callable]], signer):
+        """
+        Builds, signs and submits the transactions in groups of up to MAX_GROUP_SIZE and waits for all the groups.
+        The outcome is written into the result of each transaction.
+        :param entries: pairs of a result and a function that builds the unsigned transaction when called with
+        suggested_params as keyword argument.
+        :param signer: private key or Signer of the sender of every transaction.
+        """
+        if not entries:
+            return
+
+        suggested_params = get_default_suggested_params(client=self.client)
+        chunks = [entries[start:start + MAX_GROUP_SIZE] for start in range(0, len(entries), MAX_GROUP_SIZE)]
+
+        def submit_chunk(chunk) -> Optional[str]:
+            group = GroupTransactionBuilder(self.client, suggested_params=suggested_params)
+            txns = []
+            try:
+                for _, build_txn in chunk:
+                    txn = build_txn(suggested_params=suggested_params)
+                    group.add(txn, signer)
+                    txns.append(txn)
+                tx_id = group.submit()
+            except Exception as e:
+                for result, _ in chunk:
+                    result.error = e
+                return None
+
+            # The txids are known once the group id has been assigned.
+            for (result, _), txn in zip(chunk, txns):
+                result.tx_id = txn.get_txid()
+            return tx_id
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            group_tx_ids = list(executor.map(submit_chunk, chunks))
+
+        submitted = [(chunk, tx_id) for chunk, tx_id in zip(chunks, group_tx_ids) if tx_id is not None]
+        if not submitted:
+            return
+
+        txinfos = NetworkInteraction.wait_for_confirmations(self.client, [tx_id for _, tx_id in submitted])
+        for chunk, tx_id in submitted:
+            txinfo = txinfos[tx_id]
+            for result, _ in chunk:
+                if txinfo.get('pool-error'):
+                    result.error = Exception(txinfo['pool-error'])
+                else:
+                    result.confirmed_round = txinfo['confirmed-round']
@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.repository.deployment_registry import DeploymentRegistry
+from src.services.nft_marketplace import NFTMarketplace
+from src.services.nft_service import NFTService
+
+
+class DeploymentResult:
+    def __init__(self, nft_service: NFTService, nft_marketplace: NFTMarketplace, stages: Tuple[str, ...]):
+        self.nft_service = nft_service
+        self.nft_marketplace = nft_marketplace
+        self.stages = stages
+        self.tx_ids: Dict[str, str] = dict()
+        self.error: Optional[Exception] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None and all(stage in self.tx_ids for stage in self.stages)
+
+
+class DeploymentPipeline:
+    """
+    Deploys many listings concurrently. Each listing goes through the following stages:
+    1. app_initialization
+    2. change_nft_credentials followed by initialize_escrow, while fund_escrow runs in parallel.
+    Listings do not depend on each other, so the total time is about three confirmation waits regardless of the
+    number of listings. With grouped_setup the second stage is a single atomic group (NFTMarketplace.setup_listing),
+    which brings it down to two confirmation waits.
+    Every listing that is fully deployed is recorded in the DeploymentRegistry, if one is given, as soon as its last
+    stage completes.
+    """
+
+    APP_INITIALIZATION = "app_initialization"
+    CHANGE_NFT_CREDENTIALS = "change_nft_credentials"
+    INITIALIZE_ESCROW = "initialize_escrow"
+    FUND_ESCROW = "fund_escrow"
+    SETUP_LISTING = "setup_listing"
+
+    STAGES = (APP_INITIALIZATION, CHANGE_NFT_CREDENTIALS, INITIALIZE_ESCROW, FUND_ESCROW)
+    GROUPED_STAGES = (APP_INITIALIZATION, SETUP_LISTING)
+
+    def __init__(self,
+                 listings: List[Tuple[NFTService, NFTMarketplace]],
+                 on_progress: Optional[Callable[[int, str, Optional[str], Optional[Exception]], None]] = None,
+                 max_workers: int = 16,
+                 grouped_setup: bool = False,
+                 registry: Optional[DeploymentRegistry] = None):
+        """
+        :param listings: pairs of minted NFTs and the marketplaces that should sell them.
+        :param on_progress: called from a worker thread as on_progress(listing_index, stage, tx_id, error) every
+        time a stage of a listing completes or fails.
+        :param max_workers: maximum number of listings deployed at the same time.
+        :param grouped_setup: whether each listing should be set up with NFTMarketplace.setup_listing.
+        :param registry: registry in which the deployed listings are recorded.
+        """
+        self.listings = listings
+        self.on_progress = on_progress
+        self.max_workers = max_workers
+        self.grouped_setup = grouped_setup
+        self.registry = registry
+
+    def deploy(self, nft_owner_address: Optional[str] = None) -> List[DeploymentResult]:
+        """
+        Deploys all the listings and blocks until every one of them either succeeded or failed.
+        :param nft_owner_address: the initial owner of every NFT. Defaults to the creator of each NFT.
+        :return:
+        """
+        stages = self.GROUPED_STAGES if self.grouped_setup else self.STAGES
+        results = [DeploymentResult(nft_service, nft_marketplace, stages)
+                   for nft_service, nft_marketplace in self.listings]
+
+        # Funding runs on its own pool so a listing waiting for its funding can never starve the funding itself.
+        with ThreadPoolExecutor(max_workers=self.max_workers) as listing_executor, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as funding_executor:
+            if self.grouped_setup:
+                futures = [listing_executor.submit(self._setup_listing, index, result, nft_owner_address)
+                           for index, result in enumerate(results)]
+            else:
+                futures = [listing_executor.submit(self._deploy_listing, index, result, nft_owner_address,
+                                                   funding_executor)
+                           for index, result in enumerate(results)]
+            for future in futures:
+                future.result()
+
+        return results
+
+    def _run_stage(self, index: int, result: DeploymentResult, stage: str, action: Callable[[], str]):
+        try:
+            tx_id = action()
+        except Exception as e:
+            result.error = e
+            self._report(index, stage, None, e)
+            raise
+
+        result.tx_ids[stage] = tx_id
+        self._report(index, stage, tx_id, None)
+
+    def _deploy_listing(self, index: int, result: DeploymentResult, nft_owner_address: Optional[str],
+                        funding_executor: ThreadPoolExecutor):
+        nft_service, nft_marketplace = result.nft_service, result.nft_marketplace
+        owner_address = nft_owner_address or nft_service.nft_creator_address
+
+        try:
+            self._run_stage(index, result, self.APP_INITIALIZATION,
+                            lambda: nft_marketplace.app_initialization(nft_owner_address=owner_address))
+
+            funding = funding_executor.submit(self._run_stage, index, result, self.FUND_ESCROW,
+                                              nft_marketplace.fund_escrow)
+            try:
+                self._run_stage(index, result, self.CHANGE_NFT_CREDENTIALS,
+                                lambda: nft_service.change_nft_credentials_txn(
+                                    escrow_address=nft_marketplace.escrow_address))
+                self._run_stage(index, result, self.INITIALIZE_ESCROW, nft_marketplace.initialize_escrow)
+            finally:
+                funding.result()
+        except Exception:
+            # The error is already recorded on the result and reported through on_progress.
+            return
+
+        self._record(result, owner_address)
+
+    def _setup_listing(self, index: int, result: DeploymentResult, nft_owner_address: Optional[str]):
+        nft_service, nft_marketplace = result.nft_service, result.nft_marketplace
+        owner_address = nft_owner_address or nft_service.nft_creator_address
+
+        try:
+            app_tx_id, setup_tx_id = nft_marketplace.setup_listing(nft_owner_address=owner_address,
+                                                                   nft_creator_pk=nft_service.nft_creator_pk)
+        except Exception as e:
+            stage = self.APP_INITIALIZATION if nft_marketplace.app_id is None else self.SETUP_LISTING
+            result.error = e
+            self._report(index, stage, None, e)
+            return
+
+        for stage, tx_id in ((self.APP_INITIALIZATION, app_tx_id), (self.SETUP_LISTING, setup_tx_id)):
+            result.tx_ids[stage] = tx_id
+            self._report(index, stage, tx_id, None)
+
+        self._record(result, owner_address)
+
+    def _record(self, result: DeploymentResult, owner_address: str):
+        if self.registry is not None and result.succeeded:
+            self.registry.record_listing(result.nft_service, result.nft_marketplace, owner_address=owner_address)
+
+    def _report(self, index: int, stage: str, tx_id: Optional[str], error: Optional[Exception]):
+        if self.on_progress is not None:
+            self.on_progress(index, stage, tx_id, error)
@@ -0,0 +1,254 @@
+import asyncio
+import base64
+import json
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+from src.repository.indexer_iterators import IndexerIterators
+
+
+class MarketplaceEvent(NamedTuple):
+    LISTED = "listed"
+    PRICE_CHANGED = "price_changed"
+    SOLD = "sold"
+    STOPPED = "stopped"
+
+    kind: str
+    app_id: int
+    round: int
+    tx_id: str
+    sender: str
+    price: Optional[int] = None
+    asa_id: Optional[int] = None
+    seller: Optional[str] = None
+    timestamp: Optional[int] = None
+
+
+class MarketplaceEventFollower:
+    """
+    Follows new blocks once and decodes the confirmed calls to marketplace applications into MarketplaceEvents:
+    - makeSellOffer -> listed, or price_changed when the NFT is already on sale.
+    - buy -> sold, with the price, the seller and the NFT taken from the rest of the atomic group.
+    - stopSellOffer -> stopped.
+    Whether an NFT is already on sale is rebuilt from the call history of each application before its first decoded
+    round, so a follower started in the middle of a sale classifies the next makeSellOffer correctly.
+    Events are fanned out to asyncio subscribers through bounded queues. A slow subscriber applies back-pressure:
+    the follower waits for it instead of dropping events.
+    """
+
+    METHODS = {
+        NFTMarketplaceSchema.AppMethods.make_sell_offer,
+        NFTMarketplaceSchema.AppMethods.buy,
+        NFTMarketplaceSchema.AppMethods.stop_sell_offer,
+    }
+
+    def __init__(self,
+                 client,
+                 indexer,
+                 app_ids: Optional[Iterable[int]] = None,
+                 start_round: Optional[int] = None,
+                 indexer_poll_interval: float = 1.0):
+        """
+        :param client: algod client used to wait for new blocks.
+        :param indexer: indexer client used to read the transactions of each block.
+        :param app_ids: marketplace applications of interest. When None, every application call whose first argument
+        is a marketplace method name is decoded.
+        :param start_round: first round to decode. Defaults to the round after the current one.
+        :param indexer_poll_interval: seconds to wait while the indexer has not caught up with algod.
+        """
+        self.client = client
+        self.indexer = indexer
+        self.app_ids: Optional[Set[int]] = set(app_ids) if app_ids is not None else None
+        self.start_round = start_round
+        self.indexer_poll_interval = indexer_poll_interval
+
+        self._subscribers: List[asyncio.Queue] = []
+        self._on_sale: Dict[int, bool] = dict()
+        self._stopped = False
+
+    def subscribe(self, max_queued_events: int = 100) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=max_queued_events)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+        # Unblocks the follower if it is waiting for room in this queue.
+        while not queue.empty():
+            queue.get_nowait()
+
+    def stop(self):
+        self._stopped = True
+
+    async def run(self):
+        from algosdk.error import IndexerHTTPError
+
+        loop = asyncio.get_event_loop()
+
+        current_round = self.start_round
+        if current_round is None:
+            status = await loop.run_in_executor(None, self.client.status)
+            current_round = status["last-round"] + 1
+
+        while not self._stopped:
+            # Returns once the node has seen current_round.
+            await loop.run_in_executor(None, self.client.status_after_block, current_round - 1)
+
+            transactions = await loop.run_in_executor(None, self._load_round, current_round)
+            if transactions is None:
+                # The indexer has not ingested the round yet.
+                await asyncio.sleep(self.indexer_poll_interval)
+                continue
+
+            try:
+                await loop.run_in_executor(None, self.seed_on_sale, current_round, transactions)
+            except (IndexerHTTPError, OSError):
+                # The round is decoded again once the indexer answers.
+                await asyncio.sleep(self.indexer_poll_interval)
+                continue
+
+            for event in self.decode_round(current_round, transactions):
+                await self._publish(event)
+
+            current_round += 1
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, max_queued_events: int = 100):
+        """
+        Streams the events to local socket clients as JSON lines. Every connection is an ordinary subscriber, so a
+        client that does not read also applies back-pressure to the follower.
+        """
+
+        async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            queue = self.subscribe(max_queued_events=max_queued_events)
+            try:
+                while True:
+                    event = await queue.get()
+                    writer.write((json.dumps(event._asdict()) + "\n").encode())
+                    await writer.drain()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+            finally:
+                self.unsubscribe(queue)
+                writer.close()
+
+        return await asyncio.start_server(handle_connection, host=host, port=port)
+
+    async def _publish(self, event: MarketplaceEvent):
+        for queue in list(self._subscribers):
+            if queue in self._subscribers:
+                await queue.put(event)
+
+    def _load_round(self, round_number: int) -> Optional[List[dict]]:
+        """
+        :return: the transactions confirmed in the round, or None while the indexer has not ingested it.
+        """
+        transactions = []
+        next_page = None
+        while True:
+            response = self.indexer.search_transactions(min_round=round_number,
+                                                        max_round=round_number,
+                                                        next_page=next_page)
+
+            if response.get("current-round", round_number) < round_number:
+                return None
+
+            transactions.extend(response.get("transactions", []))
+            next_page = response.get("next-token")
+            if not next_page or not response.get("transactions"):
+                return transactions
+
+    def seed_on_sale(self, round_number: int, transactions: List[dict]):
+        """
+        Rebuilds from the indexer whether the NFT was on sale at the end of the previous round, for every application
+        called in the transactions that the follower has not seen yet. The last marketplace call confirmed before the
+        round decides: makeSellOffer puts the NFT on sale, buy and stopSellOffer take it off. An application without
+        such a call, e.g. one created in this round, is not on sale. Errors of the indexer are raised, not taken as
+        an application that is not on sale.
+        :param round_number: round of the transactions.
+        :param transactions: transactions of the round, as returned by the indexer.
+        """
+        for txn in transactions:
+            call = self._marketplace_call(txn)
+            if call is None or call[0] in self._on_sale:
+                continue
+
+            app_id = call[0]
+            on_sale = False
+            for past_txn in IndexerIterators.transactions(self.indexer, application_id=app_id, txn_type="appl",
+                                                          max_round=round_number - 1):
+                past_call = self._marketplace_call(past_txn)
+                if past_call is not None:
+                    on_sale = past_call[1] == NFTMarketplaceSchema.AppMethods.make_sell_offer
+            self._on_sale[app_id] = on_sale
+
+    def decode_round(self, round_number: int, transactions: List[dict]) -> List[MarketplaceEvent]:
+        groups: Dict[str, List[dict]] = dict()
+        for txn in transactions:
+            groups.setdefault(txn.get("group") or txn["id"], []).append(txn)
+
+        events = []
+        for group in groups.values():
+            for txn in group:
+                event = self._decode_transaction(round_number, txn, group)
+                if event is not None:
+                    events.append(event)
+
+        return events
+
+    def _marketplace_call(self, txn: dict) -> Optional[Tuple[int, str, list]]:
+        """
+        :return: (application id, method, base64 arguments) of a call to a followed marketplace application, or None.
+        """
+        if txn.get("tx-type") != "appl":
+            return None
+
+        app_call = txn["application-transaction"]
+        app_id = app_call.get("application-id", 0)
+        args = app_call.get("application-args", [])
+
+        if app_id == 0 or not args or (self.app_ids is not None and app_id not in self.app_ids):
+            return None
+
+        try:
+            method = base64.b64decode(args[0]).decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+
+        if method not in self.METHODS:
+            return None
+
+        return app_id, method, args
+
+    def _decode_transaction(self, round_number: int, txn: dict, group: List[dict]) -> Optional[MarketplaceEvent]:
+        call = self._marketplace_call(txn)
+        if call is None:
+            return None
+
+        app_id, method, args = call
+        common = dict(app_id=app_id, round=round_number, tx_id=txn["id"], sender=txn["sender"],
+                      timestamp=txn.get("round-time"))
+
+        if method == NFTMarketplaceSchema.AppMethods.make_sell_offer:
+            kind = MarketplaceEvent.PRICE_CHANGED if self._on_sale.get(app_id) else MarketplaceEvent.LISTED
+            self._on_sale[app_id] = True
+            return MarketplaceEvent(kind=kind, price=int.from_bytes(base64.b64decode(args[1]), "big"), **common)
+
+        if method == NFTMarketplaceSchema.AppMethods.stop_sell_offer:
+            self._on_sale[app_id] = False
+            return MarketplaceEvent(kind=MarketplaceEvent.STOPPED, **common)
+
+        self._on_sale[app_id] = False
+
+        payment = next((t for t in group if t.get("tx-type") == "pay" and t["sender"] == txn["sender"]), None)
+        transfer = next((t for t in group if t.get("tx-type") == "axfer"
+                         and t["asset-transfer-transaction"].get("amount") == 1), None)
+
+        return MarketplaceEvent(
+            kind=MarketplaceEvent.SOLD,
+            price=payment["payment-transaction"]["amount"] if payment else None,
+            seller=payment["payment-transaction"]["receiver"] if payment else None,
+            asa_id=transfer["asset-transfer-transaction"]["asset-id"] if transfer else None,
+            **common
+        )
@@ -1,14 +1,15 @@
 import base64
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-from algosdk.future.transaction import SignedTransaction
-from algosdk.v2client import algod
+if TYPE_CHECKING:
+    from algosdk.future.transaction import SignedTransaction
+    from algosdk.v2client import algod
 
 
 class NetworkInteraction:
 
     @staticmethod
-    def wait_for_confirmation(client: algod.AlgodClient, txid):
+    def wait_for_confirmation(client: "algod.AlgodClient", txid):
         """
         Utility function to wait until the transaction is
         confirmed before proceeding.
@@ -24,7 +25,37 @@ class NetworkInteraction:
         return txinfo
 
     @staticmethod
-    def get_default_suggested_params(client: algod.AlgodClient):
+    def wait_for_confirmations(client: "algod.AlgodClient", txids) -> dict:
+        """
+        Waits until every transaction is confirmed or dropped from the pool. All of them are checked after each
+        round, instead of being waited for one by one.
+        :param client:
+        :param txids:
+        :return: txid -> pending transaction info
+        """
+        last_round = client.status().get('last-round')
+        pending = list(dict.fromkeys(txids))
+        txinfos = dict()
+        while True:
+            for txid in pending:
+                txinfo = client.pending_transaction_info(txid)
+                if (txinfo.get('confirmed-round') or 0) > 0 or txinfo.get('pool-error'):
+                    txinfos[txid] = txinfo
+            pending = [txid for txid in pending if txid not in txinfos]
+
+            if not pending:
+                break
+
+            print(f"Waiting for confirmation of {len(pending)} transactions")
+            last_round += 1
+            client.status_after_block(last_round)
+
+        confirmed = sum(1 for txinfo in txinfos.values() if not txinfo.get('pool-error'))
+        print(f"{confirmed} of {len(txinfos)} transactions confirmed by round {last_round}.")
+        return txinfos
+
+    @staticmethod
+    def get_default_suggested_params(client: "algod.AlgodClient"):
         """
         Gets default suggested params with flat transaction fee and fee amount of 1000.
         :param client:
@@ -38,7 +69,7 @@ class NetworkInteraction:
         return suggested_params
 
     @staticmethod
-    def submit_asa_creation(client: algod.AlgodClient, transaction: SignedTransaction) -> (Optional[int], str):
+    def submit_asa_creation(client: "algod.AlgodClient", transaction: "SignedTransaction") -> (Optional[int], str):
         """
         Submits a ASA creation transaction to the network. If the transaction is successful the ASA's id is returned.
         :param client:
@@ -58,7 +89,7 @@ class NetworkInteraction:
             print('Unsuccessful creation of Algorand Standard Asset.')
 
     @staticmethod
-    def submit_transaction(client: algod.AlgodClient, transaction: SignedTransaction) -> Optional[str]:
+    def submit_transaction(client: "algod.AlgodClient", transaction: "SignedTransaction") -> Optional[str]:
         txid = client.send_transaction(transaction)
 
         NetworkInteraction.wait_for_confirmation(client, txid)
@@ -66,7 +97,7 @@ class NetworkInteraction:
         return txid
 
     @staticmethod
-    def compile_program(client: algod.AlgodClient, source_code):
+    def compile_program(client: "algod.AlgodClient", source_code):
         """
         :param client: algorand client
         :param source_code: teal source code
@@ -2,18 +2,40 @@ from src.blockchain_utils.transaction_repository import (
     ApplicationTransactionRepository,
     ASATransactionRepository,
     PaymentTransactionRepository,
+    get_default_suggested_params,
 )
 from src.services import NetworkInteraction
+from src.services.preflight import MarketplacePreflight
+from src.blockchain_utils.signer import resolve_signer
+from src.blockchain_utils.group_builder import GroupTransactionBuilder
 from algosdk import logic as algo_logic
 from algosdk.future import transaction as algo_txn
-from pyteal import compileTeal, Mode
 from algosdk.encoding import decode_address
-from src.smart_contracts import NFTMarketplaceASC1, nft_escrow
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.blockchain_utils.offline_pipeline import PreparedBatchWriter
 
 
 class NFTMarketplace:
+    """
+    Every *_pk argument accepts either a base64 private key or a Signer.
+    pyteal and the contracts are imported only when a program is compiled, so reading and trading on deployed
+    listings does not load them.
+    """
+
+    # Micro algos the admin sends to the escrow of a new listing, covering its minimum balance and fees.
+    ESCROW_FUNDING_AMOUNT = 1000000
+
+    # Contract of every variant a ListingRecord can name, by its name in src.smart_contracts.
+    CONTRACT_VARIANTS = {
+        "original": "NFTMarketplaceASC1",
+        "optimized": "NFTMarketplaceASC1Optimized",
+    }
+
     def __init__(
-            self, admin_pk, admin_address, nft_id, client
+            self, admin_pk, admin_address, nft_id, client, nft_marketplace_asc1=None
     ):
         self.admin_pk = admin_pk
         self.admin_address = admin_address
@@ -22,30 +44,97 @@ class NFTMarketplace:
         self.client = client
 
         self.teal_version = 4
-        self.nft_marketplace_asc1 = NFTMarketplaceASC1()
+        self._nft_marketplace_asc1 = nft_marketplace_asc1
+        self._contract_variant = "original"
 
         self.app_id = None
 
+        self._escrow_bytes = None
+        self._escrow_app_id = None
+        self._escrow_logic_signature = None
+
+        self._opted_in_addresses = set()
+
+    @classmethod
+    def from_listing_record(cls, record, admin_pk, client, nft_marketplace_asc1=None):
+        """
+        Rehydrates a deployed marketplace from a DeploymentRegistry record. The stored escrow program is reused, so
+        neither compilation nor any network call is needed.
+        :param record: ListingRecord of the deployed marketplace.
+        :param admin_pk: private key of the application admin.
+        :param client: algorand client.
+        :param nft_marketplace_asc1: contract the application was deployed with. Defaults to the contract variant
+        stored in the record.
+        :return:
+        """
+        nft_marketplace = cls(admin_pk=admin_pk,
+                              admin_address=record.admin_address,
+                              nft_id=record.asa_id,
+                              client=client,
+                              nft_marketplace_asc1=nft_marketplace_asc1)
+        nft_marketplace._contract_variant = record.contract_variant
+        nft_marketplace.app_id = record.app_id
+        nft_marketplace._escrow_bytes = record.escrow_program
+        nft_marketplace._escrow_app_id = record.app_id
+        return nft_marketplace
+
+    @property
+    def nft_marketplace_asc1(self):
+        if self._nft_marketplace_asc1 is None:
+            import src.smart_contracts as smart_contracts
+
+            self._nft_marketplace_asc1 = getattr(smart_contracts, self.CONTRACT_VARIANTS[self._contract_variant])()
+        return self._nft_marketplace_asc1
+
+    @property
+    def contract_variant(self) -> str:
+        """
+        Name of the contract variant the application is deployed with, without loading the contract.
+        """
+        if self._nft_marketplace_asc1 is not None:
+            return self._nft_marketplace_asc1.variant
+        return self._contract_variant
+
     @property
     def escrow_bytes(self):
         if self.app_id is None:
             raise ValueError("App not deployed")
 
-        escrow_fund_program_compiled = compileTeal(
-            nft_escrow(app_id=self.app_id, asa_id=self.nft_id),
-            mode=Mode.Signature,
-            version=4,
-        )
+        # The escrow program depends only on app_id and nft_id, so it is compiled once per deployed app.
+        if self._escrow_bytes is None or self._escrow_app_id != self.app_id:
+            from pyteal import compileTeal, Mode
+            from src.smart_contracts import nft_escrow
 
-        return NetworkInteraction.compile_program(
-            client=self.client, source_code=escrow_fund_program_compiled
-        )
+            escrow_fund_program_compiled = compileTeal(
+                nft_escrow(app_id=self.app_id, asa_id=self.nft_id),
+                mode=Mode.Signature,
+                version=4,
+            )
+
+            self._escrow_bytes = NetworkInteraction.compile_program(
+                client=self.client, source_code=escrow_fund_program_compiled
+            )
+            self._escrow_app_id = self.app_id
+
+        return self._escrow_bytes
+
+    @property
+    def escrow_logic_signature(self):
+        """
+        LogicSig of the escrow, created once per compiled escrow program.
+        """
+        escrow_bytes = self.escrow_bytes
+        if self._escrow_logic_signature is None or self._escrow_logic_signature.logic != escrow_bytes:
+            self._escrow_logic_signature = algo_txn.LogicSig(escrow_bytes)
+        return self._escrow_logic_signature
 
     @property
     def escrow_address(self):
         return algo_logic.address(self.escrow_bytes)
 
     def app_initialization(self, nft_owner_address):
+        from pyteal import compileTeal, Mode
+
         approval_program_compiled = compileTeal(
             self.nft_marketplace_asc1.approval_program(),
             mode=Mode.Application,
@@ -92,21 +181,37 @@ class NFTMarketplace:
 
         return tx_id
 
-    def initialize_escrow(self):
+    def _initialize_escrow_txn(self, sign_transaction: bool, suggested_params=None):
         app_args = [
-            self.nft_marketplace_asc1.AppMethods.initialize_escrow,
+            NFTMarketplaceSchema.AppMethods.initialize_escrow,
             decode_address(self.escrow_address),
         ]
 
-        initialize_escrow_txn = ApplicationTransactionRepository.call_application(
+        return ApplicationTransactionRepository.call_application(
             client=self.client,
             caller_private_key=self.admin_pk,
             app_id=self.app_id,
             on_complete=algo_txn.OnComplete.NoOpOC,
             app_args=app_args,
             foreign_assets=[self.nft_id],
+            suggested_params=suggested_params,
+            sign_transaction=sign_transaction,
+        )
+
+    def _fund_escrow_txn(self, sign_transaction: bool, suggested_params=None):
+        return PaymentTransactionRepository.payment(
+            client=self.client,
+            sender_address=self.admin_address,
+            receiver_address=self.escrow_address,
+            amount=self.ESCROW_FUNDING_AMOUNT,
+            sender_private_key=self.admin_pk,
+            suggested_params=suggested_params,
+            sign_transaction=sign_transaction,
         )
 
+    def initialize_escrow(self):
+        initialize_escrow_txn = self._initialize_escrow_txn(sign_transaction=True)
+
         tx_id = NetworkInteraction.submit_transaction(
             self.client, transaction=initialize_escrow_txn
         )
@@ -114,14 +219,7 @@ class NFTMarketplace:
         return tx_id
 
     def fund_escrow(self):
-        fund_escrow_txn = PaymentTransactionRepository.payment(
-            client=self.client,
-            sender_address=self.admin_address,
-            receiver_address=self.escrow_address,
-            amount=1000000,
-            sender_private_key=self.admin_pk,
-            sign_transaction=True,
-        )
+        fund_escrow_txn = self._fund_escrow_txn(sign_transaction=True)
 
         tx_id = NetworkInteraction.submit_transaction(
             self.client, transaction=fund_escrow_txn
@@ -129,26 +227,238 @@ class NFTMarketplace:
 
         return tx_id
 
-    def make_sell_offer(self, sell_price: int, nft_owner_pk):
-        app_args = [self.nft_marketplace_asc1.AppMethods.make_sell_offer, sell_price]
+    def setup_listing(self, nft_owner_address, nft_creator_pk=None):
+        """
+        Deploys the application and sets up the escrow in two rounds instead of four.
+        Once the app_id is known, the following transactions are sent as one atomic group:
+        1. Asset config: the NFT's clawback is set to the escrow and the other management addresses are cleared.
+        2. Application call: initializeEscrow.
+        3. Payment from the admin that funds the escrow.
+        :param nft_owner_address: the initial owner of the NFT.
+        :param nft_creator_pk: the private key of the current NFT manager. Defaults to the admin's private key.
+        :return: (app creation tx_id, setup group tx_id)
+        """
+        app_tx_id = self.app_initialization(nft_owner_address=nft_owner_address)
+
+        group = GroupTransactionBuilder(self.client)
+        for txn, signer in self._setup_listing_txns(nft_creator_pk=nft_creator_pk or self.admin_pk,
+                                                    suggested_params=group.suggested_params):
+            group.add(txn, signer)
+
+        tx_id = group.submit(wait=True)
+
+        return app_tx_id, tx_id
+
+    def prepare_setup_listing(self, batch: "PreparedBatchWriter", nft_creator_pk=None, suggested_params=None) -> int:
+        """
+        Writes the unsigned setup group of setup_listing to a batch file of the offline pipeline instead of submitting
+        it. The application must already be deployed, since the escrow depends on its id.
+        :param batch: the batch file being prepared.
+        :param nft_creator_pk: the current NFT manager, e.g. an AddressOnlySigner. Defaults to the admin.
+        :param suggested_params: params shared by the group. Fetched from the client when omitted.
+        :return: id of the record in the batch.
+        """
+        suggested_params = suggested_params or get_default_suggested_params(client=self.client)
+        txns = self._setup_listing_txns(nft_creator_pk=nft_creator_pk or self.admin_pk,
+                                        suggested_params=suggested_params)
+        return batch.add_group([txn for txn, _ in txns])
+
+    def prepare_fund_escrow(self, batch: "PreparedBatchWriter", suggested_params=None) -> int:
+        """
+        Writes the unsigned escrow funding of fund_escrow to a batch file of the offline pipeline.
+        :return: id of the record in the batch.
+        """
+        return batch.add(self._fund_escrow_txn(sign_transaction=False, suggested_params=suggested_params))
+
+    def prepare_sell_offer(self, batch: "PreparedBatchWriter", sell_price: int, nft_owner_pk,
+                           suggested_params=None) -> int:
+        """
+        Writes the unsigned sell offer of make_sell_offer to a batch file of the offline pipeline.
+        :param nft_owner_pk: the owner of the NFT, e.g. an AddressOnlySigner.
+        :return: id of the record in the batch.
+        """
+        return batch.add(self.make_sell_offer_txn(sell_price=sell_price, nft_owner_pk=nft_owner_pk,
+                                                  suggested_params=suggested_params, sign_transaction=False))
+
+    def _setup_listing_txns(self, nft_creator_pk, suggested_params) -> list:
+        """
+        :return: (unsigned transaction, signer) of the setup group: the NFT's clawback is moved to the escrow, the
+        escrow is initialized and then funded.
+        """
+        change_management_txn = ASATransactionRepository.change_asa_management(
+            client=self.client,
+            current_manager_pk=nft_creator_pk,
+            asa_id=self.nft_id,
+            manager_address="",
+            reserve_address="",
+            freeze_address="",
+            strict_empty_address_check=False,
+            clawback_address=self.escrow_address,
+            suggested_params=suggested_params,
+            sign_transaction=False,
+        )
+
+        return [
+            (change_management_txn, nft_creator_pk),
+            (self._initialize_escrow_txn(sign_transaction=False, suggested_params=suggested_params), self.admin_pk),
+            (self._fund_escrow_txn(sign_transaction=False, suggested_params=suggested_params), self.admin_pk),
+        ]
+
+    def make_sell_offer(self, sell_price: int, nft_owner_pk, app_state=None):
+        """
+        :param sell_price:
+        :param nft_owner_pk:
+        :param app_state: cached application state. When provided the call is validated locally before signing and
+        a PreflightError is raised if the contract would reject it.
+        :return:
+        """
+        if app_state is not None:
+            MarketplacePreflight.check_make_sell_offer(app_state=app_state,
+                                                       seller_address=resolve_signer(nft_owner_pk).address,
+                                                       sell_price=sell_price)
+
+        app_call_txn = self.make_sell_offer_txn(sell_price=sell_price, nft_owner_pk=nft_owner_pk)
+
+        tx_id = NetworkInteraction.submit_transaction(self.client, transaction=app_call_txn)
+        return tx_id
+
+    def stop_sell_offer(self, nft_owner_pk, app_state=None):
+        """
+        Takes the NFT off sale.
+        :param nft_owner_pk:
+        :param app_state: cached application state used to validate the call locally before signing.
+        :return:
+        """
+        if app_state is not None:
+            MarketplacePreflight.check_stop_sell_offer(app_state=app_state,
+                                                       seller_address=resolve_signer(nft_owner_pk).address)
 
-        app_call_txn = ApplicationTransactionRepository.call_application(
+        app_call_txn = self.stop_sell_offer_txn(nft_owner_pk=nft_owner_pk)
+
+        tx_id = NetworkInteraction.submit_transaction(self.client, transaction=app_call_txn)
+        return tx_id
+
+    def make_sell_offer_txn(self, sell_price: int, nft_owner_pk, suggested_params=None,
+                            sign_transaction: bool = True):
+        """
+        Builds the makeSellOffer call of make_sell_offer without submitting it, e.g. to pack it into a group.
+        :param sell_price:
+        :param nft_owner_pk:
+        :param suggested_params: parameters of the transaction. Defaults to the ones suggested by the client.
+        :param sign_transaction: whether to return the signed or the unsigned transaction.
+        :return:
+        """
+        app_args = [NFTMarketplaceSchema.AppMethods.make_sell_offer, sell_price]
+
+        return ApplicationTransactionRepository.call_application(
             client=self.client,
             caller_private_key=nft_owner_pk,
             app_id=self.app_id,
             on_complete=algo_txn.OnComplete.NoOpOC,
             app_args=app_args,
-            sign_transaction=True,
+            suggested_params=suggested_params,
+            sign_transaction=sign_transaction,
         )
 
-        tx_id = NetworkInteraction.submit_transaction(self.client, transaction=app_call_txn)
-        return tx_id
+    def stop_sell_offer_txn(self, nft_owner_pk, suggested_params=None, sign_transaction: bool = True):
+        """
+        Builds the stopSellOffer call of stop_sell_offer without submitting it, as make_sell_offer_txn does.
+        :return:
+        """
+        app_args = [NFTMarketplaceSchema.AppMethods.stop_sell_offer]
+
+        return ApplicationTransactionRepository.call_application(
+            client=self.client,
+            caller_private_key=nft_owner_pk,
+            app_id=self.app_id,
+            on_complete=algo_txn.OnComplete.NoOpOC,
+            app_args=app_args,
+            suggested_params=suggested_params,
+            sign_transaction=sign_transaction,
+        )
 
     def buy_nft(self,
-                nft_owner_address, buyer_address, buyer_pk, buy_price):
+                nft_owner_address, buyer_address, buyer_pk, buy_price, app_state=None):
+        """
+        :param nft_owner_address:
+        :param buyer_address:
+        :param buyer_pk:
+        :param buy_price:
+        :param app_state: cached application state. When provided the purchase is validated locally before signing
+        and a PreflightError is raised if the contract or the escrow would reject it.
+        :return:
+        """
+        if app_state is not None:
+            self._check_buy(app_state, nft_owner_address, buy_price)
+
+        return self._submit_buy_group(nft_owner_address=nft_owner_address,
+                                      buyer_address=buyer_address,
+                                      buyer_pk=buyer_pk,
+                                      buy_price=buy_price,
+                                      include_opt_in=False)
+
+    def buy_nft_with_opt_in(self,
+                            nft_owner_address, buyer_address, buyer_pk, buy_price, app_state=None):
+        """
+        Buys the NFT in a single round. If the buyer has not opted-in to the NFT yet, the opt-in transaction is
+        prepended to the atomic buy group instead of being confirmed separately.
+        :param app_state: cached application state used for the same local validation as in buy_nft.
+        :return:
+        """
+        if app_state is not None:
+            self._check_buy(app_state, nft_owner_address, buy_price)
+
+        include_opt_in = not self.is_opted_in(buyer_address)
+
+        tx_id = self._submit_buy_group(nft_owner_address=nft_owner_address,
+                                       buyer_address=buyer_address,
+                                       buyer_pk=buyer_pk,
+                                       buy_price=buy_price,
+                                       include_opt_in=include_opt_in)
+
+        self._opted_in_addresses.add(buyer_address)
+        return tx_id
+
+    def is_opted_in(self, address) -> bool:
+        """
+        Checks whether the address has opted-in to the NFT. Positive answers are cached, a stale one only makes
+        the buy group get rejected.
+        :param address:
+        :return:
+        """
+        if address in self._opted_in_addresses:
+            return True
+
+        account_info = self.client.account_info(address)
+        if any(asset["asset-id"] == self.nft_id for asset in account_info.get("assets", [])):
+            self._opted_in_addresses.add(address)
+            return True
+
+        return False
+
+    def _check_buy(self, app_state, nft_owner_address, buy_price):
+        MarketplacePreflight.check_buy(app_state=app_state,
+                                       nft_owner_address=nft_owner_address,
+                                       buy_price=buy_price,
+                                       asa_id=self.nft_id,
+                                       escrow_address=self.escrow_address)
+
+    def _submit_buy_group(self,
+                          nft_owner_address, buyer_address, buyer_pk, buy_price, include_opt_in: bool):
+        group = GroupTransactionBuilder(self.client)
+
+        # 0. Optional opt-in transaction of the buyer to the NFT
+        if include_opt_in:
+            group.add(ASATransactionRepository.asa_opt_in(client=self.client,
+                                                          sender_private_key=buyer_pk,
+                                                          asa_id=self.nft_id,
+                                                          suggested_params=group.suggested_params,
+                                                          sign_transaction=False),
+                      buyer_pk)
+
         # 1. Application call txn
         app_args = [
-            self.nft_marketplace_asc1.AppMethods.buy
+            NFTMarketplaceSchema.AppMethods.buy
         ]
 
         app_call_txn = ApplicationTransactionRepository.call_application(client=self.client,
@@ -156,7 +466,9 @@ class NFTMarketplace:
                                                                          app_id=self.app_id,
                                                                          on_complete=algo_txn.OnComplete.NoOpOC,
                                                                          app_args=app_args,
+                                                                         suggested_params=group.suggested_params,
                                                                          sign_transaction=False)
+        group.add(app_call_txn, buyer_pk)
 
         # 2. Payment transaction: buyer -> seller
         asa_buy_payment_txn = PaymentTransactionRepository.payment(client=self.client,
@@ -164,10 +476,11 @@ class NFTMarketplace:
                                                                    receiver_address=nft_owner_address,
                                                                    amount=buy_price,
                                                                    sender_private_key=None,
+                                                                   suggested_params=group.suggested_params,
                                                                    sign_transaction=False)
+        group.add(asa_buy_payment_txn, buyer_pk)
 
         # 3. Asset transfer transaction: escrow -> buyer
-
         asa_transfer_txn = ASATransactionRepository.asa_transfer(client=self.client,
                                                                  sender_address=self.escrow_address,
                                                                  receiver_address=buyer_address,
@@ -175,27 +488,9 @@ class NFTMarketplace:
                                                                  asa_id=self.nft_id,
                                                                  revocation_target=nft_owner_address,
                                                                  sender_private_key=None,
+                                                                 suggested_params=group.suggested_params,
                                                                  sign_transaction=False)
+        group.add(asa_transfer_txn, self.escrow_logic_signature)
 
         # Atomic transfer
-        gid = algo_txn.calculate_group_id([app_call_txn,
-                                           asa_buy_payment_txn,
-                                           asa_transfer_txn])
-
-        app_call_txn.group = gid
-        asa_buy_payment_txn.group = gid
-        asa_transfer_txn.group = gid
-
-        app_call_txn_signed = app_call_txn.sign(buyer_pk)
-
-        asa_buy_txn_signed = asa_buy_payment_txn.sign(buyer_pk)
-
-        asa_transfer_txn_logic_signature = algo_txn.LogicSig(self.escrow_bytes)
-        asa_transfer_txn_signed = algo_txn.LogicSigTransaction(asa_transfer_txn, asa_transfer_txn_logic_signature)
-
-        signed_group = [app_call_txn_signed,
-                        asa_buy_txn_signed,
-                        asa_transfer_txn_signed]
-
-        tx_id = self.client.send_transactions(signed_group)
-        return tx_id
+        return group.submit()
@@ -1,12 +1,17 @@
 from src.services import NetworkInteraction
 from src.blockchain_utils.transaction_repository import ASATransactionRepository
+from src.blockchain_utils.signer import Signer
+from typing import TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    from src.blockchain_utils.offline_pipeline import PreparedBatchWriter
 
 
 class NFTService:
     def __init__(
             self,
             nft_creator_address: str,
-            nft_creator_pk: str,
+            nft_creator_pk: Union[str, Signer],
             client,
             unit_name: str,
             asset_name: str,
@@ -22,8 +27,45 @@ class NFTService:
 
         self.nft_id = None
 
+    @classmethod
+    def from_listing_record(cls, record, nft_creator_pk: Union[str, Signer], client):
+        """
+        Rehydrates the service of an already minted NFT from a DeploymentRegistry record without any network call.
+        :param record: ListingRecord of the NFT.
+        :param nft_creator_pk: private key or Signer of the NFT creator.
+        :param client: algorand client.
+        :return:
+        """
+        nft_service = cls(nft_creator_address=record.creator_address,
+                          nft_creator_pk=nft_creator_pk,
+                          client=client,
+                          unit_name=record.unit_name,
+                          asset_name=record.asset_name,
+                          nft_url=record.nft_url)
+        nft_service.nft_id = record.asa_id
+        return nft_service
+
     def create_nft(self):
-        signed_txn = ASATransactionRepository.create_non_fungible_asa(
+        signed_txn = self._create_nft_txn(sign_transaction=True)
+
+        nft_id, tx_id = NetworkInteraction.submit_asa_creation(
+            client=self.client, transaction=signed_txn
+        )
+        self.nft_id = nft_id
+        return tx_id
+
+    def prepare_nft(self, batch: "PreparedBatchWriter", suggested_params=None) -> int:
+        """
+        Writes the unsigned mint transaction to a batch file of the offline pipeline instead of submitting it. The
+        NFT id is known once the signed batch is submitted.
+        :param batch: the batch file being prepared.
+        :param suggested_params: params of the transaction. Fetched from the client when omitted.
+        :return: id of the record in the batch.
+        """
+        return batch.add(self._create_nft_txn(sign_transaction=False, suggested_params=suggested_params))
+
+    def _create_nft_txn(self, sign_transaction: bool, suggested_params=None):
+        return ASATransactionRepository.create_non_fungible_asa(
             client=self.client,
             creator_private_key=self.nft_creator_pk,
             unit_name=self.unit_name,
@@ -35,14 +77,9 @@ class NFTService:
             clawback_address=self.nft_creator_address,
             url=self.nft_url,
             default_frozen=True,
-            sign_transaction=True,
-        )
-
-        nft_id, tx_id = NetworkInteraction.submit_asa_creation(
-            client=self.client, transaction=signed_txn
+            suggested_params=suggested_params,
+            sign_transaction=sign_transaction,
         )
-        self.nft_id = nft_id
-        return tx_id
 
     def change_nft_credentials_txn(self, escrow_address):
         txn = ASATransactionRepository.change_asa_management(
@@ -0,0 +1,76 @@
+from typing import Optional
+
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+
+MAX_UINT64 = 2 ** 64 - 1
+
+Variables = NFTMarketplaceSchema.Variables
+AppMethods = NFTMarketplaceSchema.AppMethods
+AppState = NFTMarketplaceSchema.AppState
+
+
+class PreflightError(Exception):
+    """
+    Raised before signing when the marketplace contract would certainly reject the transaction.
+    """
+
+    def __init__(self, method: str, reason: str):
+        super().__init__(f"{method} would be rejected: {reason}")
+        self.method = method
+        self.reason = reason
+
+
+class MarketplacePreflight:
+    """
+    Mirrors the predicates of NFTMarketplaceASC1 and nft_escrow against a cached application state, so calls that
+    would be rejected fail locally without signing or a network round trip.
+    The app_state is the dictionary returned by NFTMarketplaceRepository.load_app_state.
+    """
+
+    @staticmethod
+    def check_make_sell_offer(app_state: dict, seller_address: str, sell_price: int):
+        method = AppMethods.make_sell_offer
+
+        if app_state.get(Variables.app_state) not in (AppState.active, AppState.selling_in_progress):
+            raise PreflightError(method, "the application is not initialized")
+
+        if seller_address != app_state.get(Variables.asa_owner):
+            raise PreflightError(method, f"{seller_address} is not the owner {app_state.get(Variables.asa_owner)}")
+
+        if not isinstance(sell_price, int) or not 0 <= sell_price <= MAX_UINT64:
+            raise PreflightError(method, f"the price {sell_price} is not a uint64")
+
+    @staticmethod
+    def check_stop_sell_offer(app_state: dict, seller_address: str):
+        method = AppMethods.stop_sell_offer
+
+        if app_state.get(Variables.app_state, AppState.not_initialized) == AppState.not_initialized:
+            raise PreflightError(method, "the application is not initialized")
+
+        if seller_address != app_state.get(Variables.asa_owner):
+            raise PreflightError(method, f"{seller_address} is not the owner {app_state.get(Variables.asa_owner)}")
+
+    @staticmethod
+    def check_buy(app_state: dict,
+                  nft_owner_address: str,
+                  buy_price: int,
+                  asa_id: Optional[int] = None,
+                  escrow_address: Optional[str] = None):
+        method = AppMethods.buy
+
+        if app_state.get(Variables.app_state) != AppState.selling_in_progress:
+            raise PreflightError(method, "the NFT is not on sale")
+
+        if buy_price != app_state.get(Variables.asa_price):
+            raise PreflightError(method, f"the price {buy_price} differs from the asking price "
+                                         f"{app_state.get(Variables.asa_price)}")
+
+        if nft_owner_address != app_state.get(Variables.asa_owner):
+            raise PreflightError(method, f"the payment goes to {nft_owner_address} instead of the owner "
+                                         f"{app_state.get(Variables.asa_owner)}")
+
+        if asa_id is not None and asa_id != app_state.get(Variables.asa_id):
+            raise PreflightError(method, f"the NFT {asa_id} is not sold by this application")
+
+        if escrow_address is not None and escrow_address != app_state.get(Variables.escrow_address):
+            raise PreflightError(method, f"the escrow {escrow_address} is not registered in the application")
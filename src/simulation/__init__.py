@@ -0,0 +1,5 @@
+from src.simulation.contract_harness import MarketplaceContractHarness
+from src.simulation.local_ledger import LocalLedger
+from src.simulation.load_generator import LoadGenerator, LoadReport
+from src.simulation.stub_node import StubNodeServer
+from src.simulation.teal_evaluator import TealEvaluator
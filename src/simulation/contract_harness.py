@@ -0,0 +1,163 @@
+from typing import Dict, List, Optional
+
+from algosdk.encoding import decode_address, encode_address
+from algosdk.future import transaction as algo_txn
+
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+from src.simulation.local_ledger import GENESIS_HASH, GENESIS_ID
+from src.simulation.teal_evaluator import EvaluationResult, TealEvaluator
+
+Variables = NFTMarketplaceSchema.Variables
+AppMethods = NFTMarketplaceSchema.AppMethods
+AppState = NFTMarketplaceSchema.AppState
+
+
+def placeholder_address(seed: int) -> str:
+    """
+    A valid, deterministic address that no one holds the key of.
+    """
+    return encode_address(bytes([seed]) * 32)
+
+
+class MarketplaceContractHarness:
+    """
+    Builds the transaction groups of one listing and evaluates the marketplace approval program and the escrow on
+    them with a TealEvaluator, so the contracts can be checked and measured without a node:
+        harness = MarketplaceContractHarness(NFTMarketplaceASC1())
+        result = harness.evaluate_app(harness.buy_group(), index=0, global_state=harness.global_state())
+    The escrow address of the harness is a plain address, since the approval program only compares it.
+    """
+
+    APP_ID = 1001
+    ASA_ID = 2002
+    PRICE = 1000000
+
+    def __init__(self, nft_marketplace_asc1=None):
+        from pyteal import compileTeal, Mode
+        from src.smart_contracts import NFTMarketplaceASC1, nft_escrow
+
+        self.nft_marketplace_asc1 = nft_marketplace_asc1 or NFTMarketplaceASC1()
+
+        self.admin_address = placeholder_address(1)
+        self.owner_address = placeholder_address(2)
+        self.buyer_address = placeholder_address(3)
+        self.escrow_address = placeholder_address(4)
+
+        self.approval = TealEvaluator(compileTeal(self.nft_marketplace_asc1.approval_program(),
+                                                  mode=Mode.Application, version=4))
+        self.escrow = TealEvaluator(compileTeal(nft_escrow(app_id=self.APP_ID, asa_id=self.ASA_ID),
+                                                mode=Mode.Signature, version=4))
+
+        self.suggested_params = algo_txn.SuggestedParams(fee=1000, first=1, last=1001, gh=GENESIS_HASH,
+                                                         gen=GENESIS_ID, flat_fee=True)
+
+    # State
+
+    def global_state(self, app_state: int = AppState.selling_in_progress, price: Optional[int] = None,
+                     owner_address: Optional[str] = None, escrow_address: Optional[str] = None) -> Dict[bytes, object]:
+        """
+        Global state of an initialized listing, by default on sale for PRICE.
+        """
+        return {
+            Variables.app_state.encode(): app_state,
+            Variables.asa_id.encode(): self.ASA_ID,
+            Variables.asa_price.encode(): self.PRICE if price is None else price,
+            Variables.asa_owner.encode(): decode_address(owner_address or self.owner_address),
+            Variables.app_admin.encode(): decode_address(self.admin_address),
+            Variables.escrow_address.encode(): decode_address(escrow_address or self.escrow_address),
+        }
+
+    def created_state(self) -> Dict[bytes, object]:
+        """
+        Global state right after the application was created, before initializeEscrow.
+        """
+        return {
+            Variables.app_state.encode(): AppState.not_initialized,
+            Variables.asa_id.encode(): self.ASA_ID,
+            Variables.asa_owner.encode(): decode_address(self.owner_address),
+            Variables.app_admin.encode(): decode_address(self.admin_address),
+        }
+
+    def asset_params(self, clawback_address: Optional[str] = None) -> Dict[int, dict]:
+        """
+        Params of the NFT once the setup group handed its clawback to the escrow.
+        """
+        return {self.ASA_ID: {"clawback": clawback_address or self.escrow_address,
+                              "manager": None, "reserve": None, "freeze": None, "default-frozen": True}}
+
+    # Transactions
+
+    def app_call(self, method: str, *args, sender: Optional[str] = None, foreign_assets: Optional[list] = None,
+                 app_id: Optional[int] = None):
+        return algo_txn.ApplicationNoOpTxn(sender=sender or self.owner_address,
+                                           sp=self.suggested_params,
+                                           index=self.APP_ID if app_id is None else app_id,
+                                           app_args=[method, *args],
+                                           foreign_assets=foreign_assets)
+
+    def create_call(self):
+        return algo_txn.ApplicationCreateTxn(sender=self.admin_address,
+                                             sp=self.suggested_params,
+                                             on_complete=algo_txn.OnComplete.NoOpOC.real,
+                                             approval_program=b"\x04",
+                                             clear_program=b"\x04",
+                                             global_schema=self.nft_marketplace_asc1.global_schema,
+                                             local_schema=self.nft_marketplace_asc1.local_schema,
+                                             app_args=[decode_address(self.owner_address),
+                                                       decode_address(self.admin_address)],
+                                             foreign_assets=[self.ASA_ID])
+
+    def payment(self, sender: str, receiver: str, amount: int):
+        return algo_txn.PaymentTxn(sender=sender, sp=self.suggested_params, receiver=receiver, amt=amount)
+
+    def asset_transfer(self, sender: str, receiver: str, amount: int, asa_id: Optional[int] = None,
+                       revocation_target: Optional[str] = None):
+        return algo_txn.AssetTransferTxn(sender=sender, sp=self.suggested_params, receiver=receiver, amt=amount,
+                                         index=self.ASA_ID if asa_id is None else asa_id,
+                                         revocation_target=revocation_target)
+
+    def make_sell_offer_call(self, price: int = PRICE, sender: Optional[str] = None):
+        return self.app_call(AppMethods.make_sell_offer, price, sender=sender)
+
+    def stop_sell_offer_call(self, sender: Optional[str] = None):
+        return self.app_call(AppMethods.stop_sell_offer, sender=sender)
+
+    def initialize_escrow_call(self, escrow_address: Optional[str] = None):
+        return self.app_call(AppMethods.initialize_escrow, decode_address(escrow_address or self.escrow_address),
+                             sender=self.admin_address, foreign_assets=[self.ASA_ID])
+
+    def buy_group(self, with_opt_in: bool = False, price: int = PRICE) -> list:
+        """
+        The group NFTMarketplace submits for a purchase: [opt-in,] buy call, payment, escrow transfer.
+        """
+        group = [self.app_call(AppMethods.buy, sender=self.buyer_address),
+                 self.payment(self.buyer_address, self.owner_address, price),
+                 self.asset_transfer(self.escrow_address, self.buyer_address, 1,
+                                     revocation_target=self.owner_address)]
+        if with_opt_in:
+            group.insert(0, self.asset_transfer(self.buyer_address, self.buyer_address, 0))
+        return group
+
+    def setup_group(self) -> list:
+        """
+        The group of NFTMarketplace.setup_listing: asset config, initializeEscrow, escrow funding.
+        """
+        asset_config = algo_txn.AssetConfigTxn(sender=self.owner_address, sp=self.suggested_params,
+                                               index=self.ASA_ID, manager="", reserve="", freeze="",
+                                               clawback=self.escrow_address, strict_empty_address_check=False)
+        return [asset_config,
+                self.initialize_escrow_call(),
+                self.payment(self.admin_address, self.escrow_address, 1000000)]
+
+    # Evaluation
+
+    def evaluate_app(self, txns: List, index: int, global_state: Optional[dict] = None,
+                     assets: Optional[Dict[int, dict]] = None) -> EvaluationResult:
+        txn = txns[index]
+        return self.approval.evaluate(txns, index=index,
+                                      app_id=txn.index,
+                                      global_state=self.global_state() if global_state is None else global_state,
+                                      assets=self.asset_params() if assets is None else assets)
+
+    def evaluate_escrow(self, txns: List, index: int) -> EvaluationResult:
+        return self.escrow.evaluate(txns, index=index)
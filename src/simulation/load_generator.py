@@ -0,0 +1,238 @@
+import contextlib
+import io
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from algosdk import account as algo_acc
+from algosdk.error import AlgodHTTPError
+
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+from src.repository.deployment_registry import ListingRecord
+from src.repository.marketplace_repository import NFTMarketplaceRepository
+from src.services import NetworkInteraction
+from src.services.nft_marketplace import NFTMarketplace
+from src.services.preflight import PreflightError
+from src.simulation.local_ledger import LocalLedger
+
+Variables = NFTMarketplaceSchema.Variables
+AppState = NFTMarketplaceSchema.AppState
+
+
+class OperationStats:
+    """
+    Outcomes and confirmation latencies of one kind of operation.
+    attempts = preflight_rejected + submitted, submitted = confirmed + rejected.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.attempts = 0
+        self.preflight_rejected = 0
+        self.submitted = 0
+        self.confirmed = 0
+        self.rejected = 0
+        self.latencies: List[float] = []
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str, latency: Optional[float] = None):
+        with self._lock:
+            self.attempts += 1
+            if outcome == "preflight_rejected":
+                self.preflight_rejected += 1
+                return
+
+            self.submitted += 1
+            if outcome == "confirmed":
+                self.confirmed += 1
+                self.latencies.append(latency)
+            else:
+                self.rejected += 1
+
+    @property
+    def conflict_rate(self) -> float:
+        """
+        Share of the attempts that lost a race, whether they were caught locally or by the ledger.
+        """
+        return (self.preflight_rejected + self.rejected) / self.attempts if self.attempts else 0.0
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        index = min(len(latencies) - 1, int(round(percent / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+
+class LoadReport:
+
+    def __init__(self, duration: float, operations: List[OperationStats]):
+        self.duration = duration
+        self.operations = operations
+
+    @property
+    def throughput(self) -> float:
+        """
+        Confirmed operations per second.
+        """
+        return sum(stats.confirmed for stats in self.operations) / self.duration if self.duration else 0.0
+
+    @property
+    def wasted_submissions(self) -> int:
+        """
+        Transactions that were signed and sent, but rejected.
+        """
+        return sum(stats.rejected for stats in self.operations)
+
+    def summary(self) -> str:
+        lines = [f"duration {self.duration:.1f}s, throughput {self.throughput:.1f} confirmed ops/s, "
+                 f"wasted submissions {self.wasted_submissions}",
+                 f"{'operation':<16}{'attempts':>10}{'confirmed':>11}{'rejected':>10}{'preflight':>11}"
+                 f"{'conflicts':>11}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}"]
+
+        for stats in self.operations:
+            percentiles = [stats.percentile(p) for p in (50, 90, 99)]
+            formatted = [f"{p * 1000:>9.0f}" if p is not None else f"{'-':>9}" for p in percentiles]
+            lines.append(f"{stats.name:<16}{stats.attempts:>10}{stats.confirmed:>11}{stats.rejected:>10}"
+                         f"{stats.preflight_rejected:>11}{stats.conflict_rate:>10.1%} {''.join(formatted)}")
+        return "\n".join(lines)
+
+
+class LoadGenerator:
+    """
+    Drives simulated sellers and buyers through NFTMarketplace.make_sell_offer and buy_nft_with_opt_in against a
+    LocalLedger. Sellers keep every listing they own on sale; buyers pick listings with a Zipf-like popularity, so a
+    few listings are heavily contended, and buyers that win relist the NFT.
+    """
+
+    def __init__(self,
+                 sellers: int = 10,
+                 buyers: int = 100,
+                 listings_per_seller: int = 5,
+                 duration: float = 10.0,
+                 round_time: float = 0.1,
+                 price: int = 1000,
+                 popularity_skew: float = 1.0,
+                 preflight: bool = True,
+                 seed: Optional[int] = None):
+        """
+        :param popularity_skew: exponent of the listing popularity; 0 picks listings uniformly.
+        :param preflight: whether buyers validate against the state they read before submitting.
+        """
+        self.sellers = sellers
+        self.buyers = buyers
+        self.listings_per_seller = listings_per_seller
+        self.duration = duration
+        self.round_time = round_time
+        self.price = price
+        self.popularity_skew = popularity_skew
+        self.preflight = preflight
+        self.random = random.Random(seed)
+
+        self.sell_stats = OperationStats("makeSellOffer")
+        self.buy_stats = OperationStats("buy")
+
+        self.ledger = None
+        self.marketplaces: List[NFTMarketplace] = []
+        self._weights: List[float] = []
+        self._deadline = 0.0
+
+    def run(self) -> LoadReport:
+        self.ledger = LocalLedger(round_time=self.round_time)
+        admin_pk, admin_address = algo_acc.generate_account()
+        seller_accounts = [algo_acc.generate_account() for _ in range(self.sellers)]
+        buyer_accounts = [algo_acc.generate_account() for _ in range(self.buyers)]
+
+        for seller_pk, seller_address in seller_accounts:
+            for _ in range(self.listings_per_seller):
+                self.marketplaces.append(self._create_listing(seller_address, admin_pk, admin_address))
+        self._weights = [1 / (rank + 1) ** self.popularity_skew for rank in range(len(self.marketplaces))]
+
+        self.ledger.start()
+        start = time.perf_counter()
+        self._deadline = start + self.duration
+
+        # NetworkInteraction reports every confirmation round, which would drown the report.
+        with contextlib.redirect_stdout(io.StringIO()):
+            with ThreadPoolExecutor(max_workers=self.sellers + self.buyers) as executor:
+                for seller_pk, seller_address in seller_accounts:
+                    executor.submit(self._seller, seller_pk, seller_address)
+                for buyer_pk, buyer_address in buyer_accounts:
+                    executor.submit(self._buyer, buyer_pk, buyer_address)
+
+        elapsed = time.perf_counter() - start
+        self.ledger.stop()
+        return LoadReport(duration=elapsed, operations=[self.sell_stats, self.buy_stats])
+
+    def _create_listing(self, seller_address, admin_pk, admin_address) -> NFTMarketplace:
+        asa_id = self.ledger.create_asset(seller_address)
+        app_id, program = self.ledger.create_listing(asa_id, owner_address=seller_address, admin_address=admin_address)
+        state = NFTMarketplaceRepository.load_app_state_from_client(self.ledger, app_id)
+
+        record = ListingRecord(app_id=app_id,
+                               asa_id=asa_id,
+                               escrow_program=program,
+                               escrow_address=state[Variables.escrow_address],
+                               owner_address=seller_address,
+                               admin_address=admin_address,
+                               creator_address=seller_address,
+                               unit_name="SIM",
+                               asset_name=f"Simulated NFT {asa_id}",
+                               nft_url="")
+        return NFTMarketplace.from_listing_record(record, admin_pk=admin_pk, client=self.ledger)
+
+    def _running(self) -> bool:
+        return time.perf_counter() < self._deadline
+
+    def _seller(self, seller_pk, seller_address):
+        while self._running():
+            for nft_marketplace in self.marketplaces:
+                state = NFTMarketplaceRepository.load_app_state_from_client(self.ledger, nft_marketplace.app_id)
+                if state[Variables.asa_owner] == seller_address and state[Variables.app_state] == AppState.active:
+                    self._sell(nft_marketplace, seller_pk, state)
+            time.sleep(self.round_time)
+
+    def _buyer(self, buyer_pk, buyer_address):
+        while self._running():
+            nft_marketplace = self.random.choices(self.marketplaces, weights=self._weights)[0]
+            state = NFTMarketplaceRepository.load_app_state_from_client(self.ledger, nft_marketplace.app_id)
+            if state[Variables.app_state] != AppState.selling_in_progress or \
+                    state[Variables.asa_owner] == buyer_address:
+                time.sleep(self.round_time / 2)
+                continue
+
+            if self._buy(nft_marketplace, buyer_pk, buyer_address, state):
+                state = NFTMarketplaceRepository.load_app_state_from_client(self.ledger, nft_marketplace.app_id)
+                self._sell(nft_marketplace, buyer_pk, state)
+
+    def _sell(self, nft_marketplace: NFTMarketplace, seller_pk, state: dict):
+        start = time.perf_counter()
+        try:
+            nft_marketplace.make_sell_offer(sell_price=self.price, nft_owner_pk=seller_pk, app_state=state)
+        except PreflightError:
+            self.sell_stats.record("preflight_rejected")
+            return
+        except AlgodHTTPError:
+            self.sell_stats.record("rejected")
+            return
+        self.sell_stats.record("confirmed", time.perf_counter() - start)
+
+    def _buy(self, nft_marketplace: NFTMarketplace, buyer_pk, buyer_address, state: dict) -> bool:
+        start = time.perf_counter()
+        try:
+            tx_id = nft_marketplace.buy_nft_with_opt_in(nft_owner_address=state[Variables.asa_owner],
+                                                        buyer_address=buyer_address,
+                                                        buyer_pk=buyer_pk,
+                                                        buy_price=state[Variables.asa_price],
+                                                        app_state=state if self.preflight else None)
+            NetworkInteraction.wait_for_confirmation(self.ledger, tx_id)
+        except PreflightError:
+            self.buy_stats.record("preflight_rejected")
+            return False
+        except AlgodHTTPError:
+            self.buy_stats.record("rejected")
+            return False
+        self.buy_stats.record("confirmed", time.perf_counter() - start)
+        return True
@@ -0,0 +1,307 @@
+import base64
+import hashlib
+import threading
+from collections import defaultdict
+from typing import List, Tuple
+
+import msgpack
+from algosdk import constants, encoding
+from algosdk.encoding import decode_address
+from algosdk.error import AlgodHTTPError
+from algosdk.future import transaction as algo_txn
+
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+from src.services.preflight import MarketplacePreflight, PreflightError
+
+GENESIS_ID = "local-ledger-v1"
+GENESIS_HASH = base64.b64encode(hashlib.sha256(GENESIS_ID.encode()).digest()).decode()
+
+Variables = NFTMarketplaceSchema.Variables
+AppMethods = NFTMarketplaceSchema.AppMethods
+AppState = NFTMarketplaceSchema.AppState
+
+
+def escrow_program(app_id: int) -> bytes:
+    """
+    A minimal valid TEAL program that differs per application, so every simulated listing has its own escrow address:
+        #pragma version 4
+        intcblock <app_id>
+        intc_0
+    """
+    varuint = bytearray()
+    value = app_id
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            varuint.append(byte | 0x80)
+        else:
+            varuint.append(byte)
+            break
+    return bytes([4, 0x20, 1]) + bytes(varuint) + bytes([0x22])
+
+
+class LocalLedger:
+    """
+    In-memory stand-in for an algod client that runs the marketplace without a network. It implements the client
+    methods the services use and evaluates NFTMarketplaceASC1 and the escrow with the MarketplacePreflight predicates.
+    Like algod, a transaction group is evaluated on top of the pending transactions when it is submitted and rejected
+    with an AlgodHTTPError if it fails; accepted groups are confirmed when the next round closes. Reads return the
+    state of the last closed round. Signatures are not verified.
+    """
+
+    def __init__(self, round_time: float = 0.1):
+        self.round_time = round_time
+
+        self._condition = threading.Condition()
+        self._round = 1
+        self._next_id = 1
+
+        # Pending state, which includes the transactions of the pool, and the state of the last closed round.
+        self._apps = dict()
+        self._holdings = defaultdict(dict)
+        self._committed_apps = dict()
+        self._committed_holdings = dict()
+        self._touched_apps = set()
+        self._touched_accounts = set()
+
+        self._pool: List[str] = []
+        self._confirmed = dict()
+
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # Setup
+
+    def create_asset(self, creator_address: str) -> int:
+        with self._condition:
+            asa_id = self._allocate_id()
+            self._holdings[creator_address][asa_id] = 1
+            self._committed_holdings[creator_address] = dict(self._holdings[creator_address])
+            return asa_id
+
+    def create_listing(self, asa_id: int, owner_address: str, admin_address: str) -> Tuple[int, bytes]:
+        """
+        Creates an initialized marketplace application with its escrow.
+        :return: (app_id, escrow program)
+        """
+        with self._condition:
+            app_id = self._allocate_id()
+            program = escrow_program(app_id)
+            self._apps[app_id] = {
+                Variables.app_state: AppState.active,
+                Variables.asa_id: asa_id,
+                Variables.asa_owner: owner_address,
+                Variables.app_admin: admin_address,
+                Variables.escrow_address: algo_txn.LogicSig(program).address(),
+                Variables.asa_price: 0,
+            }
+            self._committed_apps[app_id] = dict(self._apps[app_id])
+            return app_id, program
+
+    def start(self):
+        self._thread = threading.Thread(target=self._produce_rounds, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    # Algod client methods
+
+    def status(self) -> dict:
+        with self._condition:
+            return {"last-round": self._round}
+
+    def status_after_block(self, block_num: int) -> dict:
+        with self._condition:
+            self._condition.wait_for(lambda: self._round > block_num or self._stopped.is_set())
+            return {"last-round": self._round}
+
+    def suggested_params(self) -> algo_txn.SuggestedParams:
+        with self._condition:
+            first_round = self._round
+        return algo_txn.SuggestedParams(fee=0,
+                                        first=first_round,
+                                        last=first_round + 1000,
+                                        gh=GENESIS_HASH,
+                                        gen=GENESIS_ID,
+                                        flat_fee=False)
+
+    def send_transaction(self, txn, **kwargs) -> str:
+        return self.send_transactions([txn])
+
+    def send_transactions(self, txns, **kwargs) -> str:
+        txids = [signed_txn.transaction.get_txid() for signed_txn in txns]
+
+        with self._condition:
+            for txid in txids:
+                if txid in self._confirmed or txid in self._pool:
+                    raise AlgodHTTPError(f"TransactionPool.Remember: transaction already in ledger: {txid}")
+
+            try:
+                self._evaluate([signed_txn.transaction for signed_txn in txns])
+            except PreflightError as e:
+                raise AlgodHTTPError(f"TransactionPool.Remember: transaction {txids[0]}: logic eval error: "
+                                     f"{e.reason}")
+
+            self._pool.extend(txids)
+
+        return txids[0]
+
+    def send_raw_transaction(self, txn, **kwargs) -> str:
+        """
+        :param txn: base64 of the concatenated msgpack of the signed transactions, as sent by BatchSubmitter.
+        """
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(base64.b64decode(txn))
+        return self.send_transactions([encoding.future_msgpack_decode(signed_txn) for signed_txn in unpacker])
+
+    def pending_transaction_info(self, txid: str) -> dict:
+        with self._condition:
+            if txid in self._confirmed:
+                return {"confirmed-round": self._confirmed[txid], "pool-error": ""}
+            if txid in self._pool:
+                return {"confirmed-round": 0, "pool-error": ""}
+        raise AlgodHTTPError(f"txn does not exist: {txid}")
+
+    def application_info(self, app_id: int) -> dict:
+        with self._condition:
+            state = self._committed_apps.get(app_id)
+            if state is None:
+                raise AlgodHTTPError("application does not exist")
+            return {"id": app_id, "params": {"global-state": self._encode_global_state(state)}}
+
+    def account_info(self, address: str) -> dict:
+        with self._condition:
+            holdings = self._committed_holdings.get(address, dict())
+            return {
+                "address": address,
+                "assets": [{"asset-id": asa_id, "amount": amount} for asa_id, amount in holdings.items()],
+                "created-apps": [],
+            }
+
+    def compile(self, source, **kwargs):
+        raise AlgodHTTPError("the local ledger does not compile TEAL; rehydrate listings with from_listing_record")
+
+    # Internals
+
+    def _allocate_id(self) -> int:
+        new_id = self._next_id
+        self._next_id += 1
+        return new_id
+
+    def _produce_rounds(self):
+        while not self._stopped.wait(self.round_time):
+            with self._condition:
+                self._round += 1
+                for txid in self._pool:
+                    self._confirmed[txid] = self._round
+                self._pool.clear()
+
+                for app_id in self._touched_apps:
+                    self._committed_apps[app_id] = dict(self._apps[app_id])
+                for address in self._touched_accounts:
+                    self._committed_holdings[address] = dict(self._holdings[address])
+                self._touched_apps.clear()
+                self._touched_accounts.clear()
+
+                self._condition.notify_all()
+
+    def _evaluate(self, txns: list):
+        """
+        Evaluates the group on copies of the pending state and applies it only if every transaction passes.
+        """
+        apps = dict()
+        holdings = dict()
+
+        def app(app_id):
+            if app_id not in apps:
+                if app_id not in self._apps:
+                    raise PreflightError("appl", f"application {app_id} does not exist")
+                apps[app_id] = dict(self._apps[app_id])
+            return apps[app_id]
+
+        def account(address):
+            if address not in holdings:
+                holdings[address] = dict(self._holdings.get(address, dict()))
+            return holdings[address]
+
+        for index, txn in enumerate(txns):
+            if txn.type == constants.appcall_txn:
+                self._evaluate_app_call(txns, index, app(txn.index))
+            elif txn.type == constants.assettransfer_txn:
+                self._evaluate_asset_transfer(txn, account)
+
+        self._apps.update(apps)
+        self._holdings.update(holdings)
+        self._touched_apps.update(apps)
+        self._touched_accounts.update(holdings)
+
+    @staticmethod
+    def _evaluate_app_call(txns: list, index: int, state: dict):
+        txn = txns[index]
+        args = [arg.encode() if isinstance(arg, str) else arg for arg in (txn.app_args or [])]
+        method = args[0].decode() if args and isinstance(args[0], bytes) else None
+
+        if method == AppMethods.make_sell_offer:
+            price = args[1] if isinstance(args[1], int) else int.from_bytes(args[1], "big")
+            MarketplacePreflight.check_make_sell_offer(app_state=state, seller_address=txn.sender, sell_price=price)
+            state[Variables.asa_price] = price
+            state[Variables.app_state] = AppState.selling_in_progress
+
+        elif method == AppMethods.stop_sell_offer:
+            MarketplacePreflight.check_stop_sell_offer(app_state=state, seller_address=txn.sender)
+            state[Variables.app_state] = AppState.active
+
+        elif method == AppMethods.buy:
+            if index + 2 >= len(txns):
+                raise PreflightError(method, "the payment and the asset transfer are missing")
+            payment, transfer = txns[index + 1], txns[index + 2]
+            if payment.type != constants.payment_txn or transfer.type != constants.assettransfer_txn:
+                raise PreflightError(method, "invalid group")
+            if payment.sender != txn.sender or transfer.receiver != txn.sender:
+                raise PreflightError(method, "the payment and the NFT must come from and go to the caller")
+            if transfer.revocation_target != state.get(Variables.asa_owner):
+                raise PreflightError(method, "the NFT is not revoked from its owner")
+
+            MarketplacePreflight.check_buy(app_state=state,
+                                           nft_owner_address=payment.receiver,
+                                           buy_price=payment.amt,
+                                           asa_id=transfer.index,
+                                           escrow_address=transfer.sender)
+            state[Variables.asa_owner] = txn.sender
+            state[Variables.app_state] = AppState.active
+
+        else:
+            raise PreflightError(str(method), "unsupported application call")
+
+    @staticmethod
+    def _evaluate_asset_transfer(txn, account):
+        receiver = account(txn.receiver)
+        if txn.amount == 0 and txn.sender == txn.receiver:
+            receiver.setdefault(txn.index, 0)
+            return
+
+        if txn.index not in receiver:
+            raise PreflightError("axfer", f"{txn.receiver} has not opted-in to {txn.index}")
+
+        source = account(txn.revocation_target or txn.sender)
+        if source.get(txn.index, 0) < txn.amount:
+            raise PreflightError("axfer", f"underflow on {txn.index}")
+
+        source[txn.index] -= txn.amount
+        receiver[txn.index] += txn.amount
+
+    @staticmethod
+    def _encode_global_state(state: dict) -> list:
+        global_state = []
+        for key, value in state.items():
+            encoded_key = base64.b64encode(key.encode()).decode()
+            if NFTMarketplaceSchema.global_state_types.get(key) == NFTMarketplaceSchema.ADDRESS:
+                encoded_value = {"type": 1, "bytes": base64.b64encode(decode_address(value)).decode()}
+            else:
+                encoded_value = {"type": 2, "uint": value}
+            global_state.append({"key": encoded_key, "value": encoded_value})
+        return global_state
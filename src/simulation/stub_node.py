@@ -0,0 +1,128 @@
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubNodeServer:
+    """
+    Local HTTP stand-in for an algod or indexer node, for trying out EndpointRouter with real AlgodClient and
+    IndexerClient instances. It answers the status, wait-for-block, suggested params and health endpoints, accepts
+    every submitted transaction and program to compile and answers account, application, asset and pending
+    transaction lookups, and transaction searches with no result; a pending transaction is confirmed in the round
+    set in `confirmed`. The round, the latency and whether the node fails can be changed while it runs:
+        node = StubNodeServer(latency=0.05).start()
+        client = algod.AlgodClient("token", node.address)
+        node.healthy = False  # every request now fails with a 503
+        node.failing_requests, node.error_code = 2, 429  # only the next two requests fail, with a 429
+    Every request path that was answered is appended to `paths`.
+    """
+
+    def __init__(self, last_round: int = 1, latency: float = 0.0, healthy: bool = True, port: int = 0):
+        self.last_round = last_round
+        self.latency = latency
+        self.healthy = healthy
+        self.failing_requests = 0
+        self.error_code = 503
+        self.requests = 0
+        self.paths = []
+        self.confirmed = dict()
+
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self._unavailable():
+                    return
+
+                path = self.path.split("?")[0]
+                if path == "/v2/transactions/params":
+                    return self._respond(200, {"consensus-version": "future", "fee": 0, "min-fee": 1000,
+                                               "genesis-hash": "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=",
+                                               "genesis-id": "stub-v1", "last-round": node.last_round})
+                if path == "/v2/transactions":
+                    return self._respond(200, {"txId": self._first_txid(body)})
+                if path == "/v2/teal/compile":
+                    return self._respond(200, {"hash": "", "result": base64.b64encode(body).decode()})
+                return self._respond(404, {"message": f"{self.path} is not served by the stub node"})
+
+            def do_GET(self):
+                if self._unavailable():
+                    return
+
+                path = self.path.split("?")[0]
+                if path.startswith("/v2/accounts/"):
+                    return self._respond(200, {"address": path.rsplit("/", 1)[1], "amount": 0,
+                                               "round": node.last_round})
+                if path.startswith("/v2/assets/"):
+                    return self._respond(200, {"index": int(path.rsplit("/", 1)[1]), "params": {}})
+                if path.startswith("/v2/applications/"):
+                    return self._respond(200, {"id": int(path.rsplit("/", 1)[1]), "params": {}})
+                if path == "/v2/transactions/params":
+                    return self._respond(200, {"consensus-version": "future", "fee": 0, "min-fee": 1000,
+                                               "genesis-hash": "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=",
+                                               "genesis-id": "stub-v1", "last-round": node.last_round})
+                if path == "/v2/transactions":
+                    return self._respond(200, {"current-round": node.last_round, "transactions": []})
+                if path.startswith("/v2/transactions/pending/"):
+                    txid = path.rsplit("/", 1)[1]
+                    return self._respond(200, {"confirmed-round": node.confirmed.get(txid, 0), "pool-error": ""})
+                if path == "/v2/status" or path.startswith("/v2/status/wait-for-block-after/"):
+                    return self._respond(200, {"last-round": node.last_round,
+                                               "catchup-time": 0,
+                                               "time-since-last-round": 0})
+                if path == "/health":
+                    return self._respond(200, {"round": node.last_round,
+                                               "db-available": True,
+                                               "is-migrating": False,
+                                               "message": str(node.last_round)})
+                return self._respond(404, {"message": f"{path} is not served by the stub node"})
+
+            def _unavailable(self) -> bool:
+                node.requests += 1
+                time.sleep(node.latency)
+
+                if not node.healthy or node.failing_requests > 0:
+                    node.failing_requests = max(node.failing_requests - 1, 0)
+                    self._respond(node.error_code, {"message": "node unavailable"})
+                    return True
+                node.paths.append(self.path.split("?")[0])
+                return False
+
+            @staticmethod
+            def _first_txid(body: bytes) -> str:
+                import msgpack
+                from algosdk import encoding
+
+                unpacker = msgpack.Unpacker(raw=False)
+                unpacker.feed(body)
+                return encoding.future_msgpack_decode(next(unpacker)).get_txid()
+
+            def _respond(self, code: int, body: dict):
+                payload = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubNodeServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
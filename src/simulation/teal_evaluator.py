@@ -0,0 +1,341 @@
+import ast
+import base64
+from typing import Dict, List, NamedTuple, Optional, Union
+
+from algosdk import constants
+from algosdk.encoding import decode_address
+
+ZERO_ADDRESS = bytes(32)
+
+TYPE_ENUMS = {
+    constants.payment_txn: 1,
+    constants.keyreg_txn: 2,
+    constants.assetconfig_txn: 3,
+    constants.assettransfer_txn: 4,
+    constants.assetfreeze_txn: 5,
+    constants.appcall_txn: 6,
+}
+
+NAMED_INTS = dict(TYPE_ENUMS, NoOp=0, OptIn=1, CloseOut=2, ClearState=3, UpdateApplication=4, DeleteApplication=5)
+
+# asset_params_get field -> key of the asset params returned by algod.
+ASSET_PARAMS = {
+    "AssetManager": "manager",
+    "AssetReserve": "reserve",
+    "AssetFreeze": "freeze",
+    "AssetClawback": "clawback",
+    "AssetDefaultFrozen": "default-frozen",
+    "AssetTotal": "total",
+    "AssetDecimals": "decimals",
+    "AssetUnitName": "unit-name",
+    "AssetName": "name",
+    "AssetURL": "url",
+}
+
+Value = Union[int, bytes]
+
+
+class TealError(Exception):
+    pass
+
+
+class EvaluationResult(NamedTuple):
+    approved: bool
+    cost: int
+    global_state: Dict[bytes, Value]
+    error: Optional[str] = None
+
+
+class TealEvaluator:
+    """
+    Interpreter for the subset of TEAL v4 the marketplace programs compile to, for testing them without a node. It
+    runs the TEAL source produced by compileTeal against a group of algosdk transactions and reports whether the
+    program approves, the opcode budget it used and, in application mode, the global state it leaves. Every opcode
+    it supports costs 1 in TEAL v4. Signatures, balances and the other transactions' programs are not checked.
+        evaluator = TealEvaluator(compileTeal(NFTMarketplaceASC1().approval_program(), Mode.Application, version=4))
+        result = evaluator.evaluate(group, index=0, app_id=app_id, global_state=state)
+    """
+
+    MAX_COST = 700
+
+    def __init__(self, teal_source: str):
+        self.instructions: List[List[str]] = []
+        self.labels: Dict[str, int] = dict()
+
+        for line in teal_source.splitlines():
+            line = line.split("//")[0].strip()
+            if not line or line.startswith("#pragma"):
+                continue
+            if line.endswith(":"):
+                self.labels[line[:-1]] = len(self.instructions)
+            else:
+                self.instructions.append(line.split(maxsplit=1) if line.startswith("byte ") else line.split())
+
+    def evaluate(self,
+                 txns: list,
+                 index: int,
+                 app_id: int = 0,
+                 global_state: Optional[Dict[bytes, Value]] = None,
+                 assets: Optional[Dict[int, dict]] = None) -> EvaluationResult:
+        """
+        :param txns: unsigned algosdk transactions of the group.
+        :param index: position of the transaction the program is evaluated for.
+        :param app_id: id of the application in application mode, 0 while it is created.
+        :param global_state: global state of the application before the call. It is not modified.
+        :param assets: asset id -> asset params, as returned by algod, for asset_params_get.
+        :return:
+        """
+        run = _Run(self, txns, index, app_id, dict(global_state or dict()), assets or dict())
+        try:
+            approved = run.execute()
+            error = None if approved else "rejected"
+        except TealError as e:
+            approved, error = False, str(e)
+
+        return EvaluationResult(approved=approved,
+                                cost=run.cost,
+                                global_state=run.global_state if approved else dict(global_state or dict()),
+                                error=error)
+
+
+class _Run:
+    def __init__(self, evaluator: TealEvaluator, txns: list, index: int, app_id: int,
+                 global_state: Dict[bytes, Value], assets: Dict[int, dict]):
+        self.evaluator = evaluator
+        self.txns = txns
+        self.index = index
+        self.app_id = app_id
+        self.global_state = global_state
+        self.assets = assets
+
+        self.stack: List[Value] = []
+        self.scratch: List[Value] = [0] * 256
+        self.cost = 0
+
+    def execute(self) -> bool:
+        instructions = self.evaluator.instructions
+        pc = 0
+        while pc < len(instructions):
+            self.cost += 1
+            if self.cost > TealEvaluator.MAX_COST:
+                raise TealError("dynamic cost budget exceeded")
+
+            op, *args = instructions[pc]
+            pc += 1
+
+            if op in ("b", "bnz", "bz"):
+                if op == "b" or (self._pop_int() != 0) == (op == "bnz"):
+                    pc = self._label(args[0])
+            elif op == "return":
+                return self._pop_int() != 0
+            elif op == "err":
+                raise TealError("err opcode executed")
+            else:
+                self._step(op, args)
+
+        if len(self.stack) != 1:
+            raise TealError(f"stack has {len(self.stack)} values at the end of the program")
+        return self._pop_int() != 0
+
+    def _step(self, op: str, args: List[str]):
+        push = self.stack.append
+
+        if op == "int":
+            push(NAMED_INTS[args[0]] if args[0] in NAMED_INTS else int(args[0], 0))
+        elif op == "byte":
+            push(self._parse_bytes(args[0]))
+        elif op in ("==", "!="):
+            b, a = self.stack.pop(), self.stack.pop()
+            if type(a) != type(b):
+                raise TealError(f"{op} compares {type(a).__name__} with {type(b).__name__}")
+            push(int((a == b) == (op == "==")))
+        elif op in ("<", "<=", ">", ">=", "&&", "||", "+", "-"):
+            b, a = self._pop_int(), self._pop_int()
+            push(self._binary(op, a, b))
+        elif op == "!":
+            push(int(self._pop_int() == 0))
+        elif op == "btoi":
+            value = self._pop_bytes()
+            if len(value) > 8:
+                raise TealError("btoi of more than 8 bytes")
+            push(int.from_bytes(value, "big"))
+        elif op == "itob":
+            push(self._pop_int().to_bytes(8, "big"))
+        elif op == "len":
+            push(len(self._pop_bytes()))
+        elif op == "assert":
+            if self._pop_int() == 0:
+                raise TealError("assert failed")
+        elif op == "pop":
+            self.stack.pop()
+        elif op == "dup":
+            push(self.stack[-1])
+        elif op == "store":
+            self.scratch[int(args[0])] = self.stack.pop()
+        elif op == "load":
+            push(self.scratch[int(args[0])])
+        elif op == "global":
+            push(self._global(args[0]))
+        elif op in ("txn", "txna"):
+            push(self._field(self.index, args[0], *args[1:]))
+        elif op in ("gtxn", "gtxna"):
+            push(self._field(int(args[0]), args[1], *args[2:]))
+        elif op in ("gtxns", "gtxnsa"):
+            push(self._field(self._pop_int(), args[0], *args[1:]))
+        elif op == "app_global_get":
+            push(self.global_state.get(self._pop_bytes(), 0))
+        elif op == "app_global_get_ex":
+            key, app = self._pop_bytes(), self._pop_int()
+            if app not in (0, self.app_id):
+                raise TealError("only the current application is available")
+            push(self.global_state.get(key, 0))
+            push(int(key in self.global_state))
+        elif op == "app_global_put":
+            value = self.stack.pop()
+            self.global_state[self._pop_bytes()] = value
+        elif op == "asset_params_get":
+            self._asset_params_get(args[0])
+        else:
+            raise TealError(f"unsupported opcode {op}")
+
+    # Operands
+
+    def _pop_int(self) -> int:
+        value = self.stack.pop()
+        if not isinstance(value, int):
+            raise TealError("expected an integer")
+        return value
+
+    def _pop_bytes(self) -> bytes:
+        value = self.stack.pop()
+        if not isinstance(value, bytes):
+            raise TealError("expected bytes")
+        return value
+
+    @staticmethod
+    def _binary(op: str, a: int, b: int) -> int:
+        if op == "+":
+            if a + b >= 2 ** 64:
+                raise TealError("+ overflowed")
+            return a + b
+        if op == "-":
+            if a < b:
+                raise TealError("- would result in a negative value")
+            return a - b
+        return int({"<": a < b, "<=": a <= b, ">": a > b, ">=": a >= b,
+                    "&&": a != 0 and b != 0, "||": a != 0 or b != 0}[op])
+
+    @staticmethod
+    def _parse_bytes(literal: str) -> bytes:
+        if literal.startswith('"'):
+            return ast.literal_eval("b" + literal)
+        if literal.startswith("0x"):
+            return bytes.fromhex(literal[2:])
+        if literal.startswith("base64 "):
+            return base64.b64decode(literal.split()[1])
+        raise TealError(f"unsupported byte constant {literal}")
+
+    def _label(self, label: str) -> int:
+        if label not in self.evaluator.labels:
+            raise TealError(f"unknown label {label}")
+        return self.evaluator.labels[label]
+
+    # Transaction and global fields
+
+    def _global(self, field: str) -> Value:
+        if field == "GroupSize":
+            return len(self.txns)
+        if field == "ZeroAddress":
+            return ZERO_ADDRESS
+        if field == "MinTxnFee":
+            return constants.min_txn_fee
+        if field == "CurrentApplicationID":
+            return self.app_id
+        raise TealError(f"unsupported global {field}")
+
+    def _field(self, group_index: int, field: str, array_index: Optional[str] = None) -> Value:
+        if not 0 <= group_index < len(self.txns):
+            raise TealError(f"transaction {group_index} is outside of a group of {len(self.txns)}")
+        txn = self.txns[group_index]
+
+        if array_index is not None:
+            values = {"ApplicationArgs": getattr(txn, "app_args", None),
+                      "Assets": getattr(txn, "foreign_assets", None),
+                      "Applications": getattr(txn, "foreign_apps", None)}.get(field)
+            position = int(array_index)
+            if field not in ("ApplicationArgs", "Assets", "Applications"):
+                raise TealError(f"unsupported array field {field}")
+            if not values or position >= len(values):
+                raise TealError(f"{field} {position} is out of range")
+            return values[position]
+
+        if field == "GroupIndex":
+            return group_index
+        if field == "TypeEnum":
+            return TYPE_ENUMS[txn.type]
+        if field == "Sender":
+            return decode_address(txn.sender)
+        if field == "Fee":
+            return txn.fee
+        if field == "FirstValid":
+            return txn.first_valid_round
+        if field == "LastValid":
+            return txn.last_valid_round
+        if field == "RekeyTo":
+            return self._address(txn.rekey_to)
+        if field == "NumAppArgs":
+            return len(getattr(txn, "app_args", None) or [])
+        if field == "NumAssets":
+            return len(getattr(txn, "foreign_assets", None) or [])
+        if field == "OnCompletion":
+            return getattr(txn, "on_complete", 0)
+
+        is_payment = txn.type == constants.payment_txn
+        is_transfer = txn.type == constants.assettransfer_txn
+        is_app_call = txn.type == constants.appcall_txn
+
+        if field == "Receiver":
+            return self._address(txn.receiver if is_payment else None)
+        if field == "Amount":
+            return txn.amt if is_payment else 0
+        if field == "CloseRemainderTo":
+            return self._address(txn.close_remainder_to if is_payment else None)
+        if field == "XferAsset":
+            return txn.index if is_transfer else 0
+        if field == "AssetAmount":
+            return txn.amount if is_transfer else 0
+        if field == "AssetSender":
+            return self._address(txn.revocation_target if is_transfer else None)
+        if field == "AssetReceiver":
+            return self._address(txn.receiver if is_transfer else None)
+        if field == "AssetCloseTo":
+            return self._address(txn.close_assets_to if is_transfer else None)
+        if field == "ApplicationID":
+            return (txn.index or 0) if is_app_call else 0
+        raise TealError(f"unsupported transaction field {field}")
+
+    @staticmethod
+    def _address(address: Optional[str]) -> bytes:
+        return decode_address(address) if address else ZERO_ADDRESS
+
+    def _asset_params_get(self, field: str):
+        reference = self._pop_int()
+        foreign_assets = getattr(self.txns[self.index], "foreign_assets", None) or []
+        # Since v4 the asset is given either by its position in the foreign assets or by its id.
+        asa_id = foreign_assets[reference] if reference < len(foreign_assets) else reference
+        if asa_id not in foreign_assets:
+            raise TealError(f"asset {asa_id} is not in the foreign assets")
+
+        params = self.assets.get(asa_id)
+        if params is None or field not in ASSET_PARAMS:
+            self.stack.extend([0, 0])
+            return
+
+        value = params.get(ASSET_PARAMS[field])
+        if field in ("AssetManager", "AssetReserve", "AssetFreeze", "AssetClawback"):
+            value = self._address(value)
+        elif field == "AssetDefaultFrozen":
+            value = int(bool(value))
+        elif isinstance(value, str):
+            value = value.encode()
+        self.stack.extend([value if value is not None else 0, 1])
@@ -1,2 +1,26 @@
-from .nft_marketplace_asc1 import NFTMarketplaceASC1
-from .nft_escrow import nft_escrow
+"""
+The contracts import pyteal, so they are loaded on first access instead of when the package is imported.
+"""
+import importlib
+
+_contracts = {
+    "NFTMarketplaceASC1": ".nft_marketplace_asc1",
+    "NFTMarketplaceASC1Optimized": ".nft_marketplace_asc1_optimized",
+    "nft_escrow": ".nft_escrow",
+}
+
+__all__ = list(_contracts)
+
+
+def __getattr__(name):
+    module_name = _contracts.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,18 +1,28 @@
 from pyteal import *
 
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+
 
 def nft_escrow(app_id: int, asa_id: int):
+    """
+    The escrow's asset transfer is the last transaction of the buy group. It is preceded by the application call and
+    the payment, and optionally by the buyer's opt-in at the start of the group. The application call must be a buy,
+    since the other methods may be called in larger groups.
+    """
     return Seq([
-        Assert(Global.group_size() == Int(3)),
-        Assert(Gtxn[0].application_id() == Int(app_id)),
+        Assert(Or(Global.group_size() == Int(3), Global.group_size() == Int(4))),
+        Assert(Txn.group_index() == Global.group_size() - Int(1)),
+        Assert(Gtxn[Txn.group_index() - Int(2)].type_enum() == TxnType.ApplicationCall),
+        Assert(Gtxn[Txn.group_index() - Int(2)].application_id() == Int(app_id)),
+        Assert(Gtxn[Txn.group_index() - Int(2)].application_args[0] == Bytes(NFTMarketplaceSchema.AppMethods.buy)),
 
-        Assert(Gtxn[1].type_enum() == TxnType.Payment),
+        Assert(Gtxn[Txn.group_index() - Int(1)].type_enum() == TxnType.Payment),
 
-        Assert(Gtxn[2].asset_amount() == Int(1)),
-        Assert(Gtxn[2].xfer_asset() == Int(asa_id)),
-        Assert(Gtxn[2].fee() <= Int(1000)),
-        Assert(Gtxn[2].asset_close_to() == Global.zero_address()),
-        Assert(Gtxn[2].rekey_to() == Global.zero_address()),
+        Assert(Txn.asset_amount() == Int(1)),
+        Assert(Txn.xfer_asset() == Int(asa_id)),
+        Assert(Txn.fee() <= Int(1000)),
+        Assert(Txn.asset_close_to() == Global.zero_address()),
+        Assert(Txn.rekey_to() == Global.zero_address()),
 
         Return(Int(1))
     ])
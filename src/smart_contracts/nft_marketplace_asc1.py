@@ -2,27 +2,27 @@ from pyteal import *
 import algosdk
 
 from src.marketplace_interfaces import NFTMarketplaceInterface
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
 
 
 class NFTMarketplaceASC1(NFTMarketplaceInterface):
+    # Name stored in a ListingRecord for the listings deployed with this contract.
+    variant = "original"
+
     class Variables:
-        escrow_address = Bytes("ESCROW_ADDRESS")
-        asa_id = Bytes("ASA_ID")
-        asa_price = Bytes("ASA_PRICE")
-        asa_owner = Bytes("ASA_OWNER")
-        app_state = Bytes("APP_STATE")
-        app_admin = Bytes("APP_ADMIN")
-
-    class AppMethods:
-        initialize_escrow = "initializeEscrow"
-        make_sell_offer = "makeSellOffer"
-        buy = "buy"
-        stop_sell_offer = "stopSellOffer"
+        escrow_address = Bytes(NFTMarketplaceSchema.Variables.escrow_address)
+        asa_id = Bytes(NFTMarketplaceSchema.Variables.asa_id)
+        asa_price = Bytes(NFTMarketplaceSchema.Variables.asa_price)
+        asa_owner = Bytes(NFTMarketplaceSchema.Variables.asa_owner)
+        app_state = Bytes(NFTMarketplaceSchema.Variables.app_state)
+        app_admin = Bytes(NFTMarketplaceSchema.Variables.app_admin)
+
+    AppMethods = NFTMarketplaceSchema.AppMethods
 
     class AppState:
-        not_initialized = Int(0)
-        active = Int(1)
-        selling_in_progress = Int(2)
+        not_initialized = Int(NFTMarketplaceSchema.AppState.not_initialized)
+        active = Int(NFTMarketplaceSchema.AppState.active)
+        selling_in_progress = Int(NFTMarketplaceSchema.AppState.selling_in_progress)
 
     def application_start(self):
         actions = Cond(
@@ -59,7 +59,8 @@ class NFTMarketplaceASC1(NFTMarketplaceInterface):
 
     def initialize_escrow(self, escrow_address):
         """
-        Application call from the app_admin.
+        Application call from the app_admin. It is either sent alone or as the second transaction of the setup group,
+        after the asset config transaction that hands the clawback to the escrow.
         :return:
         """
         curr_escrow_address = App.globalGetEx(Int(0), self.Variables.escrow_address)
@@ -75,7 +76,9 @@ class NFTMarketplaceASC1(NFTMarketplaceInterface):
             Assert(curr_escrow_address.hasValue() == Int(0)),
 
             Assert(App.globalGet(self.Variables.app_admin) == Txn.sender()),
-            Assert(Global.group_size() == Int(1)),
+            # Either a single call or the middle of the setup group: asset config, this call, escrow funding.
+            Assert(Or(Global.group_size() == Int(1),
+                      And(Global.group_size() == Int(3), Txn.group_index() == Int(1)))),
 
             asset_escrow,
             manager_address,
@@ -96,20 +99,20 @@ class NFTMarketplaceASC1(NFTMarketplaceInterface):
 
     def make_sell_offer(self, sell_price):
         """
-        Single application call with 2 arguments.
+        Application call with 2 arguments.
         - method_name
         - price
+        The call may be grouped with other calls, so an owner can reprice many listings in one atomic group. The
+        escrow only releases the NFT to a buy call, so grouping can not be used to move the NFT.
         :return:
         """
-        valid_number_of_transactions = Global.group_size() == Int(1)
         app_is_active = Or(App.globalGet(self.Variables.app_state) == self.AppState.active,
                            App.globalGet(self.Variables.app_state) == self.AppState.selling_in_progress)
 
         valid_seller = Txn.sender() == App.globalGet(self.Variables.asa_owner)
         valid_number_of_arguments = Txn.application_args.length() == Int(2)
 
-        can_sell = And(valid_number_of_transactions,
-                       app_is_active,
+        can_sell = And(app_is_active,
                        valid_seller,
                        valid_number_of_arguments)
 
@@ -127,33 +130,48 @@ class NFTMarketplaceASC1(NFTMarketplaceInterface):
         1. Application call.
         2. Payment from buyer to seller.
         3. Asset transfer from escrow to buyer.
+        A buyer that has not opted-in to the NFT yet can prepend the opt-in transaction, making the application call
+        the second of 4 transactions.
         :return:
         """
-        valid_number_of_transactions = Global.group_size() == Int(3)
+        opt_in = Gtxn[0]
+        payment = Gtxn[Txn.group_index() + Int(1)]
+        asa_transfer = Gtxn[Txn.group_index() + Int(2)]
+
+        valid_group = Or(
+            And(Global.group_size() == Int(3), Txn.group_index() == Int(0)),
+            And(Global.group_size() == Int(4),
+                Txn.group_index() == Int(1),
+                opt_in.type_enum() == TxnType.AssetTransfer,
+                opt_in.xfer_asset() == App.globalGet(self.Variables.asa_id),
+                opt_in.asset_amount() == Int(0),
+                opt_in.sender() == Txn.sender(),
+                opt_in.asset_receiver() == Txn.sender())
+        )
         asa_is_on_sale = App.globalGet(self.Variables.app_state) == self.AppState.selling_in_progress
 
         valid_payment_to_seller = And(
-            Gtxn[1].type_enum() == TxnType.Payment,
-            Gtxn[1].receiver() == App.globalGet(self.Variables.asa_owner),
-            Gtxn[1].amount() == App.globalGet(self.Variables.asa_price),
-            Gtxn[1].sender() == Gtxn[0].sender(),
-            Gtxn[1].sender() == Gtxn[2].asset_receiver()
+            payment.type_enum() == TxnType.Payment,
+            payment.receiver() == App.globalGet(self.Variables.asa_owner),
+            payment.amount() == App.globalGet(self.Variables.asa_price),
+            payment.sender() == Txn.sender(),
+            payment.sender() == asa_transfer.asset_receiver()
         )
 
         valid_asa_transfer_from_escrow_to_buyer = And(
-            Gtxn[2].type_enum() == TxnType.AssetTransfer,
-            Gtxn[2].sender() == App.globalGet(self.Variables.escrow_address),
-            Gtxn[2].xfer_asset() == App.globalGet(self.Variables.asa_id),
-            Gtxn[2].asset_amount() == Int(1)
+            asa_transfer.type_enum() == TxnType.AssetTransfer,
+            asa_transfer.sender() == App.globalGet(self.Variables.escrow_address),
+            asa_transfer.xfer_asset() == App.globalGet(self.Variables.asa_id),
+            asa_transfer.asset_amount() == Int(1)
         )
 
-        can_buy = And(valid_number_of_transactions,
+        can_buy = And(valid_group,
                       asa_is_on_sale,
                       valid_payment_to_seller,
                       valid_asa_transfer_from_escrow_to_buyer)
 
         update_state = Seq([
-            App.globalPut(self.Variables.asa_owner, Gtxn[0].sender()),
+            App.globalPut(self.Variables.asa_owner, Txn.sender()),
             App.globalPut(self.Variables.app_state, self.AppState.active),
             Return(Int(1))
         ])
@@ -162,15 +180,13 @@ class NFTMarketplaceASC1(NFTMarketplaceInterface):
 
     def stop_sell_offer(self):
         """
-        Single application call.
+        Application call that may be grouped with other calls, like makeSellOffer.
         :return:
         """
-        valid_number_of_transactions = Global.group_size() == Int(1)
         valid_caller = Txn.sender() == App.globalGet(self.Variables.asa_owner)
         app_is_initialized = App.globalGet(self.Variables.app_state) != self.AppState.not_initialized
 
-        can_stop_selling = And(valid_number_of_transactions,
-                               valid_caller,
+        can_stop_selling = And(valid_caller,
                                app_is_initialized)
 
         update_state = Seq([
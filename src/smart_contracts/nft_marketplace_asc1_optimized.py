@@ -0,0 +1,128 @@
+from pyteal import *
+
+from src.smart_contracts.nft_marketplace_asc1 import NFTMarketplaceASC1
+
+
+class NFTMarketplaceASC1Optimized(NFTMarketplaceASC1):
+    """
+    Cheaper variant of NFTMarketplaceASC1 that accepts and rejects exactly the same transactions. In TEAL v4 almost
+    every opcode costs 1, so the savings come from executing fewer of them:
+    - The creation check is a single bnz on the application id and the hot paths (buy, makeSellOffer) are
+      dispatched first. The method argument is compared directly: txna costs the same as a scratch load and a byte
+      comparison the same as an integer one, so neither caching it nor a numeric selector would be cheaper.
+    - Every global variable is read at most once per call. A global read costs 2 opcodes and caching it costs 3, so
+      a value needed twice is compared with a group field that was already checked against it instead.
+    - buy is compiled once per group layout, so the payment and the asset transfer are read at constant positions
+      (1 opcode per field instead of 4 for the group index arithmetic).
+    - Checks are expressed as a sequence of asserts so evaluation stops at the first failing predicate.
+    """
+
+    variant = "optimized"
+
+    def application_start(self):
+        dispatch = Cond(
+            [Txn.application_args[0] == Bytes(self.AppMethods.buy), self.buy()],
+
+            [Txn.application_args[0] == Bytes(self.AppMethods.make_sell_offer),
+             self.make_sell_offer(sell_price=Txn.application_args[1])],
+
+            [Txn.application_args[0] == Bytes(self.AppMethods.stop_sell_offer), self.stop_sell_offer()],
+
+            [Txn.application_args[0] == Bytes(self.AppMethods.initialize_escrow),
+             self.initialize_escrow(escrow_address=Txn.application_args[1])]
+        )
+
+        return If(Txn.application_id()).Then(dispatch).Else(self.app_initialization())
+
+    def make_sell_offer(self, sell_price):
+        """
+        Application call with 2 arguments, which may be grouped with other calls.
+        - method_name
+        - price
+        The APP_STATE global only ever holds not_initialized, active or selling_in_progress,
+        so "active or selling_in_progress" is checked as "not not_initialized".
+        :return:
+        """
+        return Seq([
+            Assert(Txn.application_args.length() == Int(2)),
+            Assert(Txn.sender() == App.globalGet(self.Variables.asa_owner)),
+            Assert(App.globalGet(self.Variables.app_state) != self.AppState.not_initialized),
+
+            App.globalPut(self.Variables.asa_price, Btoi(sell_price)),
+            App.globalPut(self.Variables.app_state, self.AppState.selling_in_progress),
+            Return(Int(1))
+        ])
+
+    def buy(self):
+        """
+        Atomic transfer of 3 transactions:
+        1. Application call.
+        2. Payment from buyer to seller.
+        3. Asset transfer from escrow to buyer.
+        A buyer that has not opted-in to the NFT yet can prepend the opt-in transaction, making the application call
+        the second of 4 transactions.
+        :return:
+        """
+        return Seq([
+            Assert(App.globalGet(self.Variables.app_state) == self.AppState.selling_in_progress),
+            If(Global.group_size() == Int(3))
+            .Then(self._buy_at(group_index=0))
+            .Else(Seq([
+                Assert(Global.group_size() == Int(4)),
+                self._buy_at(group_index=1)
+            ]))
+        ])
+
+    def _buy_at(self, group_index: int):
+        """
+        The buy checks for an application call at group_index, followed by the payment and the asset transfer.
+        :param group_index: 0, or 1 when the buyer's opt-in comes first.
+        :return:
+        """
+        payment = Gtxn[group_index + 1]
+        asa_transfer = Gtxn[group_index + 2]
+
+        checks = [
+            Assert(Txn.group_index() == Int(group_index)),
+
+            Assert(payment.type_enum() == TxnType.Payment),
+            Assert(asa_transfer.type_enum() == TxnType.AssetTransfer),
+            Assert(asa_transfer.asset_amount() == Int(1)),
+            Assert(payment.sender() == Txn.sender()),
+            Assert(asa_transfer.asset_receiver() == Txn.sender()),
+
+            Assert(payment.receiver() == App.globalGet(self.Variables.asa_owner)),
+            Assert(payment.amount() == App.globalGet(self.Variables.asa_price)),
+            Assert(asa_transfer.sender() == App.globalGet(self.Variables.escrow_address)),
+            Assert(asa_transfer.xfer_asset() == App.globalGet(self.Variables.asa_id)),
+        ]
+
+        if group_index == 1:
+            opt_in = Gtxn[0]
+            # The transfer was checked against ASA_ID above, so the global is not read again.
+            checks += [
+                Assert(opt_in.type_enum() == TxnType.AssetTransfer),
+                Assert(opt_in.asset_amount() == Int(0)),
+                Assert(opt_in.sender() == Txn.sender()),
+                Assert(opt_in.asset_receiver() == Txn.sender()),
+                Assert(opt_in.xfer_asset() == asa_transfer.xfer_asset()),
+            ]
+
+        return Seq(checks + [
+            App.globalPut(self.Variables.asa_owner, Txn.sender()),
+            App.globalPut(self.Variables.app_state, self.AppState.active),
+            Return(Int(1))
+        ])
+
+    def stop_sell_offer(self):
+        """
+        Application call that may be grouped with other calls.
+        :return:
+        """
+        return Seq([
+            Assert(Txn.sender() == App.globalGet(self.Variables.asa_owner)),
+            Assert(App.globalGet(self.Variables.app_state) != self.AppState.not_initialized),
+
+            App.globalPut(self.Variables.app_state, self.AppState.active),
+            Return(Int(1))
+        ])
@@ -0,0 +1,59 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Entry points of the read-only tools and worker processes, and the full contract import for comparison.
+MODULES = [
+    "src.services",
+    "src.services.nft_marketplace",
+    "src.services.app_state_refresher",
+    "src.services.marketplace_events",
+    "src.repository.marketplace_repository",
+    "src.repository.nft_repository",
+    "src.repository.ownership_index",
+    "src.blockchain_utils.credentials",
+    "src.smart_contracts",
+    "src.smart_contracts.nft_marketplace_asc1",
+]
+
+HEAVY_MODULES = ["pyteal", "algosdk.future.transaction", "nacl.signing"]
+
+RUNS = 5
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, runs: int = RUNS) -> dict:
+    """
+    Imports the module in fresh interpreters, so nothing is shared with earlier imports.
+    :param module: dotted module name.
+    :param runs: number of interpreters started.
+    :return: median import time in milliseconds and the heavy modules the import loaded.
+    """
+    timings = []
+    loaded = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True,
+                                text=True,
+                                check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"] * 1000)
+        loaded = result["loaded"]
+
+    return dict(milliseconds=statistics.median(timings), loaded=loaded)
+
+
+print(f"{'module':<45}{'import ms':>12}  heavy modules loaded")
+for module_name in MODULES:
+    measurement = measure_import(module_name)
+    print(f"{module_name:<45}{measurement['milliseconds']:>12.1f}  {', '.join(measurement['loaded']) or '-'}")
@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from src.services.app_state_refresher import AppStateRefresher
+from src.simulation.contract_harness import placeholder_address
+from src.simulation.local_ledger import LocalLedger
+
+APP_ID = 7
+
+
+class FakeClient:
+    """
+    algod stand-in whose next application_info can be held back after it read the state, to order a load against a
+    state change.
+    """
+
+    def __init__(self, price: int):
+        self.price = price
+        self.error = None
+        self.read = threading.Event()
+        self._release = None
+
+    def hold_next_read(self) -> threading.Event:
+        self.read.clear()
+        self._release = threading.Event()
+        return self._release
+
+    def application_info(self, app_id: int) -> dict:
+        price = self.price
+        release, self._release = self._release, None
+        if release is not None:
+            self.read.set()
+            release.wait(5)
+        if self.error is not None:
+            raise self.error
+
+        state = {"ASA_PRICE": price, "APP_STATE": 2, "ASA_OWNER": placeholder_address(2)}
+        return {"id": app_id, "params": {"global-state": LocalLedger._encode_global_state(state)}}
+
+
+@pytest.fixture
+def client():
+    return FakeClient(price=100)
+
+
+@pytest.fixture
+def errors():
+    return []
+
+
+@pytest.fixture
+def refresher(client, errors):
+    refresher = AppStateRefresher(client=client, refresh_interval=3600,
+                                  on_error=lambda app_id, error: errors.append((app_id, error)))
+    yield refresher
+    refresher.stop()
+
+
+def start_held_refresh(refresher, client) -> (threading.Thread, threading.Event):
+    """
+    Starts a background refresh that reads the current state and then waits until it is released.
+    """
+    release = client.hold_next_read()
+    refresh = threading.Thread(target=refresher._refresh, args=(APP_ID,))
+    refresh.start()
+    assert client.read.wait(5)
+    return refresh, release
+
+
+def test_refresh_started_before_invalidate_does_not_overwrite_it(refresher, client):
+    assert refresher.get(APP_ID)["ASA_PRICE"] == 100
+
+    # A background refresh reads the state before our own transaction changes it and completes last.
+    refresh, release = start_held_refresh(refresher, client)
+    client.price = 200
+    invalidated = refresher.invalidate(APP_ID)
+    release.set()
+    refresh.join(5)
+
+    assert invalidated["ASA_PRICE"] == 200
+    assert refresher.get(APP_ID)["ASA_PRICE"] == 200
+
+
+def test_failed_refresh_keeps_the_state_and_reports_the_error(refresher, client, errors):
+    assert refresher.get(APP_ID)["ASA_PRICE"] == 100
+
+    client.price = 200
+    client.error = ConnectionError("node unavailable")
+    refresher._refresh(APP_ID)
+
+    assert refresher.get(APP_ID)["ASA_PRICE"] == 100
+    assert errors == [(APP_ID, client.error)]
+    assert refresher.refresh_errors[APP_ID] is client.error
+
+    client.error = None
+    refresher._refresh(APP_ID)
+
+    assert refresher.get(APP_ID)["ASA_PRICE"] == 200
+    assert APP_ID not in refresher.refresh_errors
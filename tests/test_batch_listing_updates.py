@@ -0,0 +1,124 @@
+import pytest
+from algosdk import account as algo_acc
+
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+from src.repository.deployment_registry import ListingRecord
+from src.repository.marketplace_repository import NFTMarketplaceRepository
+from src.services.batch_service import MarketplaceBatchService
+from src.services.nft_marketplace import NFTMarketplace
+from src.services.preflight import PreflightError
+from src.simulation.contract_harness import MarketplaceContractHarness
+from src.simulation.local_ledger import LocalLedger
+from src.smart_contracts import NFTMarketplaceASC1, NFTMarketplaceASC1Optimized
+
+Variables = NFTMarketplaceSchema.Variables
+AppState = NFTMarketplaceSchema.AppState
+
+LISTINGS = 20
+
+
+@pytest.fixture(scope="module", params=[NFTMarketplaceASC1, NFTMarketplaceASC1Optimized])
+def harness(request):
+    return MarketplaceContractHarness(request.param())
+
+
+@pytest.mark.parametrize("app_state, build", [
+    (AppState.active, lambda harness: harness.make_sell_offer_call()),
+    (AppState.selling_in_progress, lambda harness: harness.make_sell_offer_call()),
+    (AppState.selling_in_progress, lambda harness: harness.stop_sell_offer_call()),
+])
+def test_every_call_of_a_full_group_is_accepted(harness, app_state, build):
+    group = [build(harness) for _ in range(16)]
+
+    for index in range(len(group)):
+        result = harness.evaluate_app(group, index=index, global_state=harness.global_state(app_state=app_state))
+        assert result.approved, (index, result.error)
+
+
+@pytest.mark.parametrize("build", [
+    lambda harness: harness.make_sell_offer_call(sender=harness.buyer_address),
+    lambda harness: harness.stop_sell_offer_call(sender=harness.buyer_address),
+    lambda harness: harness.app_call(NFTMarketplaceSchema.AppMethods.buy, sender=harness.buyer_address,
+                                     app_id=harness.APP_ID + 1),
+])
+@pytest.mark.parametrize("with_opt_in", [False, True])
+def test_escrow_only_releases_the_nft_to_a_buy_of_its_app(harness, build, with_opt_in):
+    group = harness.buy_group(with_opt_in=with_opt_in)
+    group[-3] = build(harness)
+
+    assert not harness.evaluate_escrow(group, index=len(group) - 1).approved
+
+
+@pytest.fixture(scope="module")
+def ledger():
+    ledger = LocalLedger(round_time=0.01)
+    ledger.start()
+    yield ledger
+    ledger.stop()
+
+
+@pytest.fixture
+def seller():
+    return algo_acc.generate_account()
+
+
+def create_marketplaces(ledger, owner_address: str, count: int):
+    admin_pk, admin_address = algo_acc.generate_account()
+    marketplaces = []
+    for _ in range(count):
+        asa_id = ledger.create_asset(owner_address)
+        app_id, program = ledger.create_listing(asa_id, owner_address=owner_address, admin_address=admin_address)
+        state = NFTMarketplaceRepository.load_app_state_from_client(ledger, app_id)
+        record = ListingRecord(app_id=app_id, asa_id=asa_id, escrow_program=program,
+                               escrow_address=state[Variables.escrow_address], owner_address=owner_address,
+                               admin_address=admin_address, creator_address=owner_address, unit_name="NFT",
+                               asset_name=f"NFT {asa_id}", nft_url=None)
+        marketplaces.append(NFTMarketplace.from_listing_record(record, admin_pk=admin_pk, client=ledger))
+    return marketplaces
+
+
+def app_state(ledger, nft_marketplace) -> dict:
+    return NFTMarketplaceRepository.load_app_state_from_client(ledger, nft_marketplace.app_id)
+
+
+def test_reprice_and_delist_more_listings_than_fit_in_a_group(ledger, seller):
+    seller_pk, seller_address = seller
+    marketplaces = create_marketplaces(ledger, seller_address, LISTINGS)
+    batch_service = MarketplaceBatchService(ledger)
+
+    results = batch_service.reprice([(nft_marketplace, 1000 + i) for i, nft_marketplace in enumerate(marketplaces)],
+                                    nft_owner_pk=seller_pk)
+
+    assert [result.app_id for result in results] == [nft_marketplace.app_id for nft_marketplace in marketplaces]
+    assert all(result.succeeded and result.tx_id for result in results), [result.error for result in results]
+    # The listings went out in two groups.
+    assert len({result.confirmed_round for result in results}) <= 2
+    for i, nft_marketplace in enumerate(marketplaces):
+        state = app_state(ledger, nft_marketplace)
+        assert (state[Variables.app_state], state[Variables.asa_price]) == (AppState.selling_in_progress, 1000 + i)
+
+    results = batch_service.delist(marketplaces, nft_owner_pk=seller_pk)
+
+    assert all(result.succeeded for result in results), [result.error for result in results]
+    assert all(app_state(ledger, nft_marketplace)[Variables.app_state] == AppState.active
+               for nft_marketplace in marketplaces)
+
+
+def test_each_listing_reports_its_own_outcome(ledger, seller):
+    seller_pk, seller_address = seller
+    _, stranger_address = algo_acc.generate_account()
+    marketplaces = create_marketplaces(ledger, seller_address, LISTINGS)
+    foreign = create_marketplaces(ledger, stranger_address, 2)
+    batch_service = MarketplaceBatchService(ledger)
+
+    # The first foreign listing is caught by the preflight; the second one is not checked and, being in the second
+    # group, makes only the listings of that group fail.
+    sell_offers = [(nft_marketplace, 1000) for nft_marketplace in marketplaces[:16] + foreign + marketplaces[16:]]
+    app_states = {foreign[0].app_id: app_state(ledger, foreign[0])}
+    results = batch_service.reprice(sell_offers, nft_owner_pk=seller_pk, app_states=app_states)
+
+    assert all(result.succeeded for result in results[:16])
+    assert isinstance(results[16].error, PreflightError)
+    assert all(result.error is not None and result.confirmed_round is None for result in results[17:])
+    assert [app_state(ledger, nft_marketplace)[Variables.app_state] for nft_marketplace in marketplaces] == \
+        [AppState.selling_in_progress] * 16 + [AppState.active] * (LISTINGS - 16)
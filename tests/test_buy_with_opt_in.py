@@ -0,0 +1,95 @@
+import pytest
+from algosdk import account as algo_acc
+
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+from src.repository.deployment_registry import ListingRecord
+from src.repository.marketplace_repository import NFTMarketplaceRepository
+from src.services import NetworkInteraction
+from src.services.nft_marketplace import NFTMarketplace
+from src.simulation.contract_harness import MarketplaceContractHarness, placeholder_address
+from src.simulation.local_ledger import LocalLedger
+from src.smart_contracts import NFTMarketplaceASC1, NFTMarketplaceASC1Optimized
+
+Variables = NFTMarketplaceSchema.Variables
+AppState = NFTMarketplaceSchema.AppState
+
+
+@pytest.fixture(scope="module", params=[NFTMarketplaceASC1, NFTMarketplaceASC1Optimized])
+def harness(request):
+    return MarketplaceContractHarness(request.param())
+
+
+@pytest.mark.parametrize("with_opt_in", [False, True])
+def test_buy_group_is_accepted_by_the_contract_and_the_escrow(harness, with_opt_in):
+    group = harness.buy_group(with_opt_in=with_opt_in)
+    app_index = 1 if with_opt_in else 0
+
+    result = harness.evaluate_app(group, index=app_index)
+    assert result.approved, result.error
+    assert result.global_state[Variables.asa_owner.encode()] == harness.global_state(
+        owner_address=harness.buyer_address)[Variables.asa_owner.encode()]
+    assert result.global_state[Variables.app_state.encode()] == AppState.active
+
+    escrow_result = harness.evaluate_escrow(group, index=len(group) - 1)
+    assert escrow_result.approved, escrow_result.error
+
+
+@pytest.mark.parametrize("field, value", [
+    ("index", MarketplaceContractHarness.ASA_ID + 1),
+    ("sender", placeholder_address(9)),
+    ("receiver", placeholder_address(9)),
+    ("amount", 1),
+])
+def test_prepended_transaction_must_be_the_buyers_opt_in_to_the_nft(harness, field, value):
+    group = harness.buy_group(with_opt_in=True)
+    setattr(group[0], field, value)
+
+    assert not harness.evaluate_app(group, index=1).approved
+
+
+def test_prepended_transaction_must_be_an_asset_transfer(harness):
+    group = harness.buy_group()
+    group.insert(0, harness.payment(harness.buyer_address, harness.buyer_address, 0))
+
+    assert not harness.evaluate_app(group, index=1).approved
+
+
+def test_escrow_only_releases_the_nft_as_the_last_transaction(harness):
+    group = harness.buy_group(with_opt_in=True)
+    group.append(group.pop(0))
+
+    assert not harness.evaluate_escrow(group, index=2).approved
+
+
+@pytest.fixture
+def ledger():
+    ledger = LocalLedger(round_time=0.01)
+    ledger.start()
+    yield ledger
+    ledger.stop()
+
+
+def test_first_time_buyer_buys_in_a_single_group(ledger):
+    admin_pk, admin_address = algo_acc.generate_account()
+    seller_pk, seller_address = algo_acc.generate_account()
+    buyer_pk, buyer_address = algo_acc.generate_account()
+
+    asa_id = ledger.create_asset(seller_address)
+    app_id, program = ledger.create_listing(asa_id, owner_address=seller_address, admin_address=admin_address)
+    state = NFTMarketplaceRepository.load_app_state_from_client(ledger, app_id)
+    record = ListingRecord(app_id=app_id, asa_id=asa_id, escrow_program=program,
+                           escrow_address=state[Variables.escrow_address], owner_address=seller_address,
+                           admin_address=admin_address, creator_address=seller_address, unit_name="NFT",
+                           asset_name="NFT", nft_url=None)
+    nft_marketplace = NFTMarketplace.from_listing_record(record, admin_pk=admin_pk, client=ledger)
+
+    nft_marketplace.make_sell_offer(sell_price=1000, nft_owner_pk=seller_pk)
+    assert not nft_marketplace.is_opted_in(buyer_address)
+
+    tx_id = nft_marketplace.buy_nft_with_opt_in(nft_owner_address=seller_address, buyer_address=buyer_address,
+                                                buyer_pk=buyer_pk, buy_price=1000)
+    NetworkInteraction.wait_for_confirmation(ledger, tx_id)
+
+    state = NFTMarketplaceRepository.load_app_state_from_client(ledger, app_id)
+    assert state[Variables.asa_owner] == buyer_address
+    assert {"asset-id": asa_id, "amount": 1} in ledger.account_info(buyer_address)["assets"]
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+from algosdk.future import transaction as algo_txn
+
+from src.repository.deployment_registry import DeploymentRegistry, ListingRecord
+from src.services.deployment_pipeline import DeploymentPipeline
+from src.services.nft_marketplace import NFTMarketplace
+from src.services.nft_service import NFTService
+from src.simulation.contract_harness import placeholder_address
+from src.simulation.local_ledger import escrow_program
+from src.smart_contracts import NFTMarketplaceASC1, NFTMarketplaceASC1Optimized
+
+ADMIN = placeholder_address(1)
+OWNER = placeholder_address(2)
+ESCROW_PROGRAM = escrow_program(10)
+ESCROW = algo_txn.LogicSig(ESCROW_PROGRAM).address()
+
+
+def listing_record(app_id: int, **fields) -> ListingRecord:
+    values = dict(app_id=app_id, asa_id=app_id + 1, escrow_program=ESCROW_PROGRAM, escrow_address=ESCROW,
+                  owner_address=OWNER, admin_address=ADMIN, creator_address=ADMIN, unit_name="bot",
+                  asset_name=f"Algobot {app_id}", nft_url=None)
+    values.update(fields)
+    return ListingRecord(**values)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = DeploymentRegistry(str(tmp_path / "deployments.db"))
+    yield registry
+    registry.close()
+
+
+class FakeMarketplace(NFTMarketplace):
+    """
+    NFTMarketplace whose grouped setup succeeds (or fails) without a network.
+    """
+
+    def __init__(self, app_id: int, nft_marketplace_asc1, fail: bool = False):
+        super().__init__(admin_pk=None, admin_address=ADMIN, nft_id=app_id + 1, client=None,
+                         nft_marketplace_asc1=nft_marketplace_asc1)
+        self.deployed_app_id = app_id
+        self.fail = fail
+        self._escrow_app_id = app_id
+        self._escrow_bytes = ESCROW_PROGRAM
+
+    def setup_listing(self, nft_owner_address, nft_creator_pk):
+        self.app_id = self.deployed_app_id
+        if self.fail:
+            raise RuntimeError("rejected")
+        return f"app-{self.app_id}", f"setup-{self.app_id}"
+
+
+def nft_service(app_id: int) -> NFTService:
+    return NFTService.from_listing_record(listing_record(app_id), nft_creator_pk=None, client=None)
+
+
+def test_pipeline_records_every_deployed_listing_with_its_contract_variant(registry):
+    listings = [
+        (nft_service(10), FakeMarketplace(10, NFTMarketplaceASC1())),
+        (nft_service(20), FakeMarketplace(20, NFTMarketplaceASC1Optimized())),
+        (nft_service(30), FakeMarketplace(30, NFTMarketplaceASC1(), fail=True)),
+    ]
+
+    results = DeploymentPipeline(listings, grouped_setup=True, registry=registry).deploy(nft_owner_address=OWNER)
+
+    assert [result.succeeded for result in results] == [True, True, False]
+    assert [(record.app_id, record.contract_variant, record.owner_address) for record in registry.listings()] == [
+        (10, "original", OWNER), (20, "optimized", OWNER)]
+
+
+@pytest.mark.parametrize("contract_variant, contract", [
+    ("original", NFTMarketplaceASC1),
+    ("optimized", NFTMarketplaceASC1Optimized),
+])
+def test_rehydrated_marketplace_uses_the_recorded_contract(registry, contract_variant, contract):
+    record = listing_record(10, contract_variant=contract_variant)
+    nft_marketplace = NFTMarketplace.from_listing_record(record, admin_pk=None, client=None)
+
+    # Recording the rehydrated listing again keeps its variant without loading the contract.
+    assert registry.record_listing(nft_service(10), nft_marketplace, owner_address=OWNER) == record
+    assert nft_marketplace._nft_marketplace_asc1 is None
+
+    assert type(nft_marketplace.nft_marketplace_asc1) is contract
+    assert nft_marketplace.contract_variant == contract_variant
+
+
+def test_registry_created_before_contract_variants_is_migrated(tmp_path):
+    path = str(tmp_path / "deployments.db")
+    record = listing_record(10)
+    legacy_columns = ListingRecord._fields[:-1]
+    with sqlite3.connect(path) as connection:
+        connection.execute(f"CREATE TABLE listings ({', '.join(legacy_columns)}, PRIMARY KEY (app_id))")
+        connection.execute(f"INSERT INTO listings VALUES ({', '.join('?' for _ in legacy_columns)})",
+                           tuple(record)[:-1])
+    connection.close()
+
+    registry = DeploymentRegistry(path)
+    try:
+        assert registry.listings() == [record]
+        assert registry.listing(10).contract_variant == "original"
+    finally:
+        registry.close()
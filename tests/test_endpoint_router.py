@@ -0,0 +1,236 @@
+import threading
+
+import pytest
+from algosdk import account as algo_acc
+from algosdk.error import AlgodHTTPError
+from algosdk.future import transaction as algo_txn
+from algosdk.v2client import algod, indexer
+
+from src.blockchain_utils import credentials
+from src.blockchain_utils.endpoint_router import EndpointRouter, NoCaughtUpEndpointError
+from src.repository.deployment_registry import ListingRecord
+from src.services.nft_marketplace import NFTMarketplace
+from src.simulation.contract_harness import placeholder_address
+from src.simulation.local_ledger import escrow_program
+from src.simulation.stub_node import StubNodeServer
+
+
+@pytest.fixture
+def nodes():
+    started = []
+
+    def start(**kwargs) -> StubNodeServer:
+        node = StubNodeServer(**kwargs).start()
+        started.append(node)
+        return node
+
+    yield start
+    for node in started:
+        node.stop()
+
+
+@pytest.fixture
+def router_of():
+    routers = []
+
+    def create(*nodes) -> EndpointRouter:
+        router = EndpointRouter([algod.AlgodClient("token", node.address) for node in nodes], probe_interval=3600)
+        routers.append(router)
+        return router
+
+    yield create
+    for router in routers:
+        router.stop()
+
+
+def served(node: StubNodeServer, prefix: str) -> int:
+    return sum(1 for path in node.paths if path.startswith(prefix))
+
+
+def test_failed_node_fails_over_and_recovers(nodes, router_of):
+    fast, slow = nodes(last_round=10), nodes(last_round=10, latency=0.05)
+    router = router_of(fast, slow)
+
+    fast.healthy = False
+    assert router.status()["last-round"] == 10
+    assert served(slow, "/v2/status") == 2  # The probe and the call.
+    assert [endpoint.healthy for endpoint in router.endpoints] == [False, True]
+
+    fast.healthy = True
+    router.probe()
+    router.status()
+
+    # The failed request is not served: the construction probe, the new probe and the call.
+    assert served(fast, "/v2/status") == 3
+    assert [endpoint.healthy for endpoint in router.endpoints] == [True, True]
+
+
+def test_calls_never_fall_back_to_a_lagging_node(nodes, router_of):
+    caught_up, lagging = nodes(last_round=100, latency=0.05), nodes(last_round=90)
+    router = router_of(caught_up, lagging)
+
+    router.status()
+    assert served(lagging, "/v2/status") == 1  # Only the probe.
+
+    caught_up.healthy = False
+    for _ in range(2):
+        with pytest.raises(AlgodHTTPError):
+            router.status()
+    assert served(lagging, "/v2/status") == 1
+
+    # Once the lagging node catches up, it takes over.
+    lagging.last_round = 99
+    router.probe()
+    assert router.status()["last-round"] == 99
+
+
+def test_failed_indexer_fails_over(nodes):
+    failing, healthy = nodes(last_round=10), nodes(last_round=10, latency=0.05)
+    router = EndpointRouter([indexer.IndexerClient("token", node.address) for node in (failing, healthy)],
+                            kind=EndpointRouter.INDEXER, probe_interval=3600)
+    try:
+        failing.healthy = False
+        assert router.search_transactions(asset_id=1)["current-round"] == 10
+
+        assert served(healthy, "/v2/transactions") == 1
+        assert [endpoint.healthy for endpoint in router.endpoints] == [False, True]
+    finally:
+        router.stop()
+
+
+def signed_payment():
+    private_key, address = algo_acc.generate_account()
+    params = algo_txn.SuggestedParams(fee=1000, first=1, last=1000, gh="SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=",
+                                      flat_fee=True)
+    _, receiver = algo_acc.generate_account()
+    return algo_txn.PaymentTxn(address, params, receiver, 1000).sign(private_key)
+
+
+def confirm_payment(router, submitting: StubNodeServer, confirmed_round: int):
+    """
+    Sends a payment through the router, which hands it to the fastest node, `submitting`, and waits until the node
+    reports it confirmed in `confirmed_round`.
+    """
+    signed_txn = signed_payment()
+    router.send_transaction(signed_txn)
+    assert served(submitting, "/v2/transactions") == 1
+
+    submitting.confirmed[signed_txn.get_txid()] = confirmed_round
+    assert router.pending_transaction_info(signed_txn.get_txid())["confirmed-round"] == confirmed_round
+    assert served(submitting, "/v2/transactions/pending/") == 1
+    return signed_txn.transaction
+
+
+def become_faster(router, node: StubNodeServer, other: StubNodeServer):
+    node.latency, other.latency = 0.0, 0.05
+    for _ in range(3):
+        router.probe()
+    assert router.candidates()[0].name == node.address
+
+
+def test_reads_after_a_confirmation_go_to_a_node_that_reached_its_round(nodes, router_of):
+    submitting, other = nodes(last_round=10), nodes(last_round=10, latency=0.05)
+    router = router_of(submitting, other)
+    txn = confirm_payment(router, submitting, confirmed_round=11)
+    submitting.last_round = 11
+
+    # The other node is within max_round_lag and now the fastest, but has not seen the transaction yet.
+    become_faster(router, other, submitting)
+    router.account_info(txn.sender)
+    router.account_info(txn.receiver)
+    router.account_info(placeholder_address(1))
+    assert served(submitting, "/v2/accounts/") == 2
+    assert served(other, "/v2/accounts/") == 1
+
+    other.last_round = 11
+    router.probe()
+    router.account_info(txn.sender)
+    assert served(other, "/v2/accounts/") == 2
+
+
+def test_reads_after_a_buy_with_opt_in_go_to_a_node_that_reached_its_round(nodes, router_of):
+    submitting, other = nodes(last_round=10), nodes(last_round=10, latency=0.05)
+    router = router_of(submitting, other)
+    seller, admin = placeholder_address(2), placeholder_address(3)
+    buyer_pk, buyer_address = algo_acc.generate_account()
+    program = escrow_program(10)
+    record = ListingRecord(app_id=10, asa_id=11, escrow_program=program,
+                           escrow_address=algo_txn.LogicSig(program).address(), owner_address=seller,
+                           admin_address=admin, creator_address=admin, unit_name="NFT", asset_name="NFT 11",
+                           nft_url=None)
+    nft_marketplace = NFTMarketplace.from_listing_record(record, admin_pk=None, client=router)
+
+    # The group starts with the opt-in, whose txid is the one waited on.
+    tx_id = nft_marketplace.buy_nft_with_opt_in(nft_owner_address=seller, buyer_address=buyer_address,
+                                                buyer_pk=buyer_pk, buy_price=1000)
+    submitting.confirmed[tx_id] = 11
+    submitting.last_round = 11
+    router.pending_transaction_info(tx_id)
+    become_faster(router, other, submitting)
+    submitting.paths.clear()
+
+    router.account_info(seller)
+    router.account_info(record.escrow_address)
+    router.application_info(record.app_id)
+    router.asset_info(record.asa_id)
+    router.account_info(placeholder_address(4))
+
+    assert submitting.paths == [f"/v2/accounts/{seller}", f"/v2/accounts/{record.escrow_address}",
+                                "/v2/applications/10", "/v2/assets/11"]
+    assert other.paths[-1] == f"/v2/accounts/{placeholder_address(4)}"
+
+
+def test_read_pinned_to_a_failed_node_is_not_served_by_a_lagging_one(nodes, router_of):
+    submitting, other = nodes(last_round=10), nodes(last_round=10, latency=0.05)
+    router = router_of(submitting, other)
+    txn = confirm_payment(router, submitting, confirmed_round=11)
+    submitting.last_round = 11
+    become_faster(router, other, submitting)
+
+    submitting.healthy = False
+    for _ in range(2):
+        with pytest.raises(AlgodHTTPError):
+            router.account_info(txn.sender)
+    assert served(other, "/v2/accounts/") == 0
+
+
+def test_read_pinned_past_every_node_raises_a_connection_error(nodes, router_of):
+    submitting, other = nodes(last_round=10), nodes(last_round=10, latency=0.05)
+    router = router_of(submitting, other)
+    txn = confirm_payment(router, submitting, confirmed_round=11)
+    # The node that confirmed the transaction comes back from a restart behind the confirmation round.
+    router.probe()
+
+    with pytest.raises(NoCaughtUpEndpointError) as error:
+        router.account_info(txn.sender)
+    assert isinstance(error.value, ConnectionError)
+    assert served(submitting, "/v2/accounts/") == served(other, "/v2/accounts/") == 0
+
+
+def test_configured_indexer_router_and_its_probe_thread_are_created_once(nodes, monkeypatch):
+    config = {"client_credentials": {"token": "token", "address": "http://localhost:4001"},
+              "indexer_endpoints": [{"address": nodes().address}, {"address": nodes().address}]}
+    monkeypatch.setattr(credentials, "load_config", lambda: config)
+    stopped_at_exit = []
+    monkeypatch.setattr(credentials.atexit, "register", stopped_at_exit.append)
+    shared = (credentials.get_routed_indexer, credentials.get_rate_limited_indexer, credentials.get_response_cache)
+    for function in shared:
+        function.cache_clear()
+
+    try:
+        router = credentials.get_routed_indexer()
+        threads = threading.active_count()
+        gateways = [credentials.get_rate_limited_indexer() for _ in range(20)]
+
+        assert all(gateway.client is router for gateway in gateways)
+        assert credentials.get_routed_indexer() is router
+        assert threading.active_count() == threads
+        assert stopped_at_exit == [router.stop]
+    finally:
+        for stop in stopped_at_exit:
+            stop()
+        for function in shared:
+            function.cache_clear()
+
+    router._thread.join(timeout=1)
+    assert not router._thread.is_alive()
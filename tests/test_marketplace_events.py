@@ -0,0 +1,131 @@
+import asyncio
+import base64
+
+import pytest
+from algosdk.error import IndexerHTTPError
+
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+from src.services.marketplace_events import MarketplaceEvent, MarketplaceEventFollower
+from src.simulation.contract_harness import placeholder_address
+
+APP_ID = 7
+ROUND = 10
+SELLER = placeholder_address(2)
+
+
+def app_call(tx_id: str, round_number: int, *args: bytes) -> dict:
+    return {"id": tx_id, "tx-type": "appl", "sender": SELLER, "confirmed-round": round_number,
+            "application-transaction": {"application-id": APP_ID,
+                                        "application-args": [base64.b64encode(arg).decode() for arg in args]}}
+
+
+def make_sell_offer(tx_id: str, price: int, round_number: int = ROUND) -> dict:
+    return app_call(tx_id, round_number, NFTMarketplaceSchema.AppMethods.make_sell_offer.encode(),
+                    price.to_bytes(8, "big"))
+
+
+def stop_sell_offer(tx_id: str, round_number: int) -> dict:
+    return app_call(tx_id, round_number, NFTMarketplaceSchema.AppMethods.stop_sell_offer.encode())
+
+
+class FakeClient:
+    def status(self):
+        return {"last-round": ROUND - 1}
+
+    def status_after_block(self, block_num: int):
+        return {"last-round": block_num + 1}
+
+
+class FakeIndexer:
+    """
+    Indexer that lags behind algod for its first `lagging_responses` searches and fails its first `failing_searches`
+    searches of the history of an application, one transaction per page.
+    """
+
+    def __init__(self, transactions, lagging_responses=0, failing_searches=0):
+        self.transactions = transactions
+        self.lagging_responses = lagging_responses
+        self.failing_searches = failing_searches
+        self.history_searches = []
+
+    def search_transactions(self, limit=None, next_page=None, txn_type=None, min_round=None, max_round=None,
+                            application_id=None):
+        if application_id is not None:
+            self.history_searches.append((application_id, max_round, next_page))
+            if self.failing_searches:
+                self.failing_searches -= 1
+                raise IndexerHTTPError("Service Unavailable")
+        elif self.lagging_responses:
+            self.lagging_responses -= 1
+            return {"current-round": min_round - 1, "transactions": []}
+
+        found = [txn for txn in self.transactions
+                 if (min_round or 0) <= txn["confirmed-round"] <= (max_round or ROUND)
+                 and (txn_type is None or txn["tx-type"] == txn_type)
+                 and (application_id is None
+                      or txn["application-transaction"]["application-id"] == application_id)]
+        if application_id is None:
+            return {"current-round": ROUND, "transactions": found}
+
+        offset = int(next_page or 0)
+        response = {"current-round": ROUND, "transactions": found[offset:offset + 1]}
+        if offset + 1 < len(found):
+            response["next-token"] = str(offset + 1)
+        return response
+
+
+def follow(indexer, count: int):
+    """
+    Runs a follower from ROUND until it published `count` events.
+    """
+
+    async def collect():
+        follower = MarketplaceEventFollower(FakeClient(), indexer, app_ids=[APP_ID], indexer_poll_interval=0.01)
+        queue = follower.subscribe()
+        task = asyncio.ensure_future(follower.run())
+        try:
+            return [await asyncio.wait_for(queue.get(), 5) for _ in range(count)]
+        finally:
+            follower.stop()
+            task.cancel()
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("history, kind", [
+    ([make_sell_offer("listed", 50, round_number=3)], MarketplaceEvent.PRICE_CHANGED),
+    ([make_sell_offer("listed", 50, round_number=3), stop_sell_offer("stopped", 5)], MarketplaceEvent.LISTED),
+    ([], MarketplaceEvent.LISTED),
+])
+def test_first_sell_offer_after_a_restart_is_classified_from_the_call_history(history, kind):
+    indexer = FakeIndexer(history + [make_sell_offer("a", 100), make_sell_offer("b", 200)])
+
+    first, second = follow(indexer, 2)
+
+    assert (first.kind, first.price) == (kind, 100)
+    assert (second.kind, second.price) == (MarketplaceEvent.PRICE_CHANGED, 200)
+    # The history before the round is read once, through every page.
+    assert [search[:2] for search in indexer.history_searches] == [(APP_ID, ROUND - 1)] * max(len(history), 1)
+
+
+def test_indexer_errors_are_not_taken_as_an_nft_that_is_not_on_sale():
+    indexer = FakeIndexer([make_sell_offer("listed", 50, round_number=3), make_sell_offer("a", 100)],
+                          failing_searches=2)
+
+    event, = follow(indexer, 1)
+
+    assert event.kind == MarketplaceEvent.PRICE_CHANGED
+    assert len(indexer.history_searches) == 3
+
+
+def test_follower_waits_for_a_lagging_indexer_without_blocking_the_event_loop(monkeypatch):
+    def blocking_sleep(seconds):
+        raise AssertionError("the follower blocked a thread while waiting for the indexer")
+
+    monkeypatch.setattr("time.sleep", blocking_sleep)
+    indexer = FakeIndexer([make_sell_offer("a", 100)], lagging_responses=3)
+
+    event, = follow(indexer, 1)
+
+    assert event.kind == MarketplaceEvent.LISTED
+    assert indexer.lagging_responses == 0
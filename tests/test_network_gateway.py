@@ -0,0 +1,145 @@
+import pytest
+from algosdk.error import AlgodHTTPError, IndexerHTTPError
+from algosdk.v2client import indexer
+
+from src.blockchain_utils import credentials
+from src.blockchain_utils.network_gateway import NetworkGateway
+from src.simulation.stub_node import StubNodeServer
+
+
+class FlakyClient:
+    """
+    algod stand-in whose status answers with the queued errors before succeeding.
+    """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+
+    def status(self):
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"last-round": 1}
+
+    def search_transactions(self, **kwargs):
+        return self.status()
+
+
+def gateway(client, **kwargs):
+    return NetworkGateway(client, base_backoff=0, **kwargs)
+
+
+def test_retried_rate_limit_responses_are_counted():
+    client_gateway = gateway(FlakyClient(AlgodHTTPError("slow down", code=429)))
+
+    assert client_gateway.status() == {"last-round": 1}
+
+    metrics = client_gateway.metrics.snapshot()
+    assert metrics["rate_limit_responses"] == {NetworkGateway.STATUS: 1}
+    assert metrics["retries"] == {NetworkGateway.STATUS: 1}
+    assert metrics["failures"] == dict()
+
+
+def test_rate_limit_response_that_is_not_retried_is_a_failure_only():
+    client_gateway = gateway(FlakyClient(AlgodHTTPError("slow down", code=429)), max_retries=0)
+
+    with pytest.raises(AlgodHTTPError):
+        client_gateway.status()
+
+    metrics = client_gateway.metrics.snapshot()
+    assert metrics["rate_limit_responses"] == dict()
+    assert metrics["retries"] == dict()
+    assert metrics["failures"] == {NetworkGateway.STATUS: 1}
+
+
+def test_client_errors_are_not_retried():
+    client_gateway = gateway(FlakyClient(AlgodHTTPError("bad request", code=400)))
+
+    with pytest.raises(AlgodHTTPError):
+        client_gateway.status()
+
+    assert client_gateway.metrics.snapshot()["retries"] == dict()
+
+
+@pytest.fixture
+def config(monkeypatch):
+    config = {"client_credentials": {"token": "token", "address": "http://localhost:4001",
+                                     "indexer_address": "http://localhost:8980"}}
+    monkeypatch.setattr(credentials, "load_config", lambda: config)
+    clear_shared_clients()
+    yield config
+    clear_shared_clients()
+
+
+def clear_shared_clients():
+    for shared in (credentials.get_rate_limited_client, credentials.get_rate_limited_indexer,
+                   credentials.get_routed_client, credentials.get_routed_indexer, credentials.get_response_cache):
+        shared.cache_clear()
+
+
+def test_partial_rate_limits_keep_the_default_bucket_values(config):
+    config["rate_limits"] = {"submit": {"rate": 1}, "compile": {"capacity": 1}, "read": None}
+
+    client_gateway = credentials.get_rate_limited_client()
+
+    submit_rate, submit_capacity = NetworkGateway.DEFAULT_BUCKETS[NetworkGateway.SUBMIT]
+    compile_rate, compile_capacity = NetworkGateway.DEFAULT_BUCKETS[NetworkGateway.COMPILE]
+    read_rate, read_capacity = NetworkGateway.DEFAULT_BUCKETS[NetworkGateway.READ]
+    buckets = client_gateway.buckets
+    assert (buckets["submit"].rate, buckets["submit"].capacity) == (1, submit_capacity)
+    assert (buckets["compile"].rate, buckets["compile"].capacity) == (compile_rate, 1)
+    assert (buckets["read"].rate, buckets["read"].capacity) == (read_rate, read_capacity)
+
+
+def test_indexer_reads_are_rate_limited(config):
+    config["rate_limits"] = {"read": {"rate": 3, "capacity": 4}}
+
+    indexer_gateway = credentials.get_rate_limited_indexer()
+    indexer_gateway.client = FlakyClient()
+    indexer_gateway.search_transactions(asset_id=1)
+
+    assert indexer_gateway.buckets[NetworkGateway.READ].capacity == 4
+    assert indexer_gateway.metrics.snapshot()["requests"] == {NetworkGateway.READ: 1}
+
+
+def test_rate_limited_clients_are_shared_by_every_caller(config):
+    config["rate_limits"] = {"read": {"rate": 1, "capacity": 1}}
+
+    first, second = credentials.get_rate_limited_indexer(), credentials.get_rate_limited_indexer()
+    first.client = FlakyClient()
+    first.search_transactions(asset_id=1)
+
+    assert first is second
+    assert second.buckets[NetworkGateway.READ] is first.buckets[NetworkGateway.READ]
+    # The token taken by the first caller is missing for the second one.
+    assert second.buckets[NetworkGateway.READ]._tokens < 1
+    assert credentials.get_rate_limited_client() is credentials.get_rate_limited_client()
+
+
+@pytest.fixture
+def node():
+    node = StubNodeServer().start()
+    yield node
+    node.stop()
+
+
+def test_indexer_rate_limit_responses_are_retried(node):
+    node.failing_requests, node.error_code = 2, 429
+    indexer_gateway = gateway(indexer.IndexerClient("token", node.address))
+
+    assert indexer_gateway.search_transactions(asset_id=1) is not None
+
+    metrics = indexer_gateway.metrics.snapshot()
+    assert metrics["rate_limit_responses"] == metrics["retries"] == {NetworkGateway.READ: 2}
+    assert metrics["failures"] == dict()
+
+
+def test_indexer_server_errors_are_retried_until_they_fail(node):
+    node.healthy = False
+    indexer_gateway = gateway(indexer.IndexerClient("token", node.address), max_retries=1)
+
+    with pytest.raises(IndexerHTTPError) as error:
+        indexer_gateway.search_transactions(asset_id=1)
+
+    assert NetworkGateway.http_status(error.value) == 503
+    metrics = indexer_gateway.metrics.snapshot()
+    assert (metrics["retries"], metrics["failures"]) == ({NetworkGateway.READ: 1}, {NetworkGateway.READ: 1})
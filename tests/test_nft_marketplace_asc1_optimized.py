@@ -0,0 +1,135 @@
+import copy
+import itertools
+
+import pytest
+
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+from src.simulation.contract_harness import MarketplaceContractHarness, placeholder_address
+from src.smart_contracts import NFTMarketplaceASC1, NFTMarketplaceASC1Optimized
+
+AppMethods = NFTMarketplaceSchema.AppMethods
+AppState = NFTMarketplaceSchema.AppState
+
+STRANGER = placeholder_address(9)
+
+
+@pytest.fixture(scope="module")
+def harnesses():
+    return MarketplaceContractHarness(NFTMarketplaceASC1()), MarketplaceContractHarness(NFTMarketplaceASC1Optimized())
+
+
+def mutated(group, position, **fields):
+    group = copy.deepcopy(group)
+    for name, value in fields.items():
+        setattr(group[position], name, value)
+    return group
+
+
+def group_mutations(harness, group):
+    """
+    The group itself, every single-field change of every transaction that the contract inspects, and changes to the
+    shape of the group.
+    """
+    yield group
+    for position, txn in enumerate(group):
+        yield mutated(group, position, sender=STRANGER)
+        yield mutated(group, position, fee=2000)
+        if hasattr(txn, "receiver"):
+            yield mutated(group, position, receiver=STRANGER)
+        if hasattr(txn, "amt"):
+            yield mutated(group, position, amt=txn.amt + 1)
+            yield mutated(group, position, amt=0)
+        if hasattr(txn, "amount"):
+            yield mutated(group, position, amount=txn.amount + 1)
+            yield mutated(group, position, amount=0)
+        if hasattr(txn, "index") and txn.index:
+            yield mutated(group, position, index=txn.index + 1)
+        if getattr(txn, "app_args", None):
+            yield mutated(group, position, app_args=txn.app_args[:1])
+            yield mutated(group, position, app_args=txn.app_args + [b"extra"])
+            yield mutated(group, position, app_args=[b"sell"] + txn.app_args[1:])
+
+        yield group[:position] + group[position + 1:]
+        yield group[:position] + [harness.payment(harness.buyer_address, harness.owner_address, harness.PRICE)] \
+            + group[position:]
+        yield group[:position] + [harness.asset_transfer(harness.buyer_address, harness.buyer_address, 0)] \
+            + group[position:]
+
+    for first, second in itertools.combinations(range(len(group)), 2):
+        swapped = list(group)
+        swapped[first], swapped[second] = swapped[second], swapped[first]
+        yield swapped
+
+
+def scenarios(harness):
+    """
+    (group, global state) pairs covering every method of the contract, in every application state.
+    """
+    bases = [
+        harness.buy_group(),
+        harness.buy_group(with_opt_in=True),
+        [harness.make_sell_offer_call()],
+        [harness.make_sell_offer_call(price=2 ** 64 - 1)],
+        [harness.make_sell_offer_call(), harness.make_sell_offer_call(price=5)],
+        [harness.app_call(AppMethods.make_sell_offer, b"\x01" * 9)],
+        [harness.stop_sell_offer_call()],
+        [harness.stop_sell_offer_call(), harness.make_sell_offer_call()],
+        [harness.initialize_escrow_call()],
+        harness.setup_group(),
+        [harness.app_call(b"unknown")],
+        [harness.app_call(AppMethods.buy, sender=harness.buyer_address)],
+    ]
+    states = [harness.global_state(app_state=app_state) for app_state in
+              (AppState.not_initialized, AppState.active, AppState.selling_in_progress)]
+    states += [harness.created_state(), harness.global_state(owner_address=STRANGER)]
+
+    for base in bases:
+        for group in group_mutations(harness, base):
+            for global_state in states:
+                yield group, global_state
+
+
+def test_both_contracts_accept_the_same_calls(harnesses):
+    original, optimized = harnesses
+    checked = accepted = 0
+
+    for group, global_state in scenarios(original):
+        for index, txn in enumerate(group):
+            if getattr(txn, "index", None) != original.APP_ID or not hasattr(txn, "app_args"):
+                continue
+
+            expected = original.evaluate_app(group, index=index, global_state=global_state)
+            actual = optimized.evaluate_app(group, index=index, global_state=global_state)
+
+            assert actual.approved == expected.approved, (index, group, expected.error, actual.error)
+            assert actual.global_state == expected.global_state
+            checked += 1
+            accepted += expected.approved
+
+    # The scenarios exercise both outcomes of every method.
+    assert checked > 1000
+    assert 50 < accepted < checked
+
+
+def test_both_contracts_initialize_the_same_state(harnesses):
+    original, optimized = harnesses
+    expected = original.evaluate_app([original.create_call()], index=0, global_state=dict())
+    actual = optimized.evaluate_app([optimized.create_call()], index=0, global_state=dict())
+
+    assert expected.approved and actual.approved
+    assert actual.global_state == expected.global_state == original.created_state()
+
+
+@pytest.mark.parametrize("name, build, index", [
+    ("buy", lambda harness: harness.buy_group(), 0),
+    ("buy with opt-in", lambda harness: harness.buy_group(with_opt_in=True), 1),
+    ("makeSellOffer", lambda harness: [harness.make_sell_offer_call()], 0),
+    ("stopSellOffer", lambda harness: [harness.stop_sell_offer_call()], 0),
+])
+def test_optimized_contract_uses_less_budget(harnesses, name, build, index):
+    original, optimized = harnesses
+    expected = original.evaluate_app(build(original), index=index)
+    actual = optimized.evaluate_app(build(optimized), index=index)
+
+    assert expected.approved and actual.approved
+    assert actual.cost < expected.cost
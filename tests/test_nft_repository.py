@@ -0,0 +1,138 @@
+import time
+
+from src.repository.nft_repository import NFTRepository
+from src.repository.ownership_index import OwnershipIndex
+from src.simulation.contract_harness import placeholder_address
+
+NFT_ID = 5
+CREATOR = placeholder_address(1)
+HOLDER = placeholder_address(2)
+
+
+class FakeIndexer:
+    """
+    Serves the balances of NFT_ID and asset transfers in pages of `page_size`, following next-token. Like the
+    indexer when the SDK leaves a zero min_balance out of the request, it returns zero balances too.
+    """
+
+    def __init__(self, balances, transfers=(), page_size: int = 2):
+        self.balances = balances
+        self.transfers = list(transfers)
+        self.page_size = page_size
+        self.balance_requests = 0
+        self.transaction_searches = []
+
+    def asset_info(self, asset_id, **kwargs):
+        return {"asset": {"index": asset_id, "params": {"url": f"https://nfts.example/{asset_id}.png"}},
+                "current-round": 10}
+
+    def asset_balances(self, asset_id, limit=None, next_page=None, min_balance=None, **kwargs):
+        self.balance_requests += 1
+        return self._page(self.balances if asset_id == NFT_ID else [], "balances", limit, next_page)
+
+    def search_transactions(self, limit=None, next_page=None, **params):
+        self.transaction_searches.append(params)
+        transfers = [txn for txn in self.transfers
+                     if txn["confirmed-round"] >= params.get("min_round", 0)
+                     and txn["asset-transfer-transaction"]["asset-id"] == params.get("asset_id")]
+        return self._page(transfers, "transactions", limit, next_page)
+
+    def _page(self, items, result_key, limit, next_page):
+        start = int(next_page or 0)
+        end = start + (limit or self.page_size)
+        response = {result_key: items[start:end], "current-round": 10}
+        if end < len(items):
+            response["next-token"] = str(end)
+        return response
+
+
+def balance(address: str, amount: int) -> dict:
+    return {"address": address, "amount": amount, "is-frozen": False}
+
+
+def test_nft_holders_skips_zero_balances_on_every_page():
+    indexer = FakeIndexer([balance(CREATOR, 0), balance(placeholder_address(3), 0), balance(HOLDER, 1),
+                           balance(placeholder_address(4), 0)])
+
+    holders = list(NFTRepository(indexer=indexer).nft_holders(NFT_ID))
+
+    assert holders == [balance(HOLDER, 1)]
+
+
+def test_nft_image_is_read_without_waiting(monkeypatch):
+    def blocking_sleep(seconds):
+        raise AssertionError("nft_image waited before reading the asset")
+
+    monkeypatch.setattr("time.sleep", blocking_sleep)
+
+    assert NFTRepository(indexer=FakeIndexer([])).nft_image(NFT_ID) == f"https://nfts.example/{NFT_ID}.png"
+
+
+def transfer(asset_id: int, receiver: str, confirmed_round: int) -> dict:
+    return {"tx-type": "axfer", "confirmed-round": confirmed_round,
+            "asset-transfer-transaction": {"asset-id": asset_id, "receiver": receiver, "amount": 1}}
+
+
+def test_nft_owner_is_the_first_positive_balance_behind_the_creators_zero_balance():
+    indexer = FakeIndexer([balance(CREATOR, 0), balance(placeholder_address(3), 0), balance(HOLDER, 1)])
+
+    assert NFTRepository(indexer=indexer, sync_interval=None).nft_owner(NFT_ID) == HOLDER
+    # The owner was on the second page.
+    assert indexer.balance_requests == 2
+
+
+def test_nft_without_a_positive_balance_has_no_owner():
+    ownership_index = OwnershipIndex(FakeIndexer([balance(CREATOR, 0)]))
+
+    ownership_index.seed([NFT_ID])
+
+    assert NFT_ID in ownership_index
+    assert ownership_index.owner_of(NFT_ID) is None
+
+
+def test_later_owner_lookups_are_answered_from_the_index():
+    buyer = placeholder_address(5)
+    indexer = FakeIndexer([balance(CREATOR, 0), balance(HOLDER, 1)])
+    nft_repository = NFTRepository(indexer=indexer, sync_interval=None)
+    assert nft_repository.nft_owner(NFT_ID) == HOLDER
+
+    indexer.transfers = [transfer(NFT_ID + 1, CREATOR, 11), transfer(NFT_ID, buyer, 12)]
+    assert nft_repository.nft_owner(NFT_ID) == HOLDER
+    assert (indexer.balance_requests, indexer.transaction_searches) == (1, [])
+
+    nft_repository.ownership_index.sync()
+
+    assert nft_repository.nft_owner(NFT_ID) == buyer
+    assert indexer.transaction_searches == [{"txn_type": "axfer", "asset_id": NFT_ID, "min_round": 11}]
+
+
+def test_owners_are_synced_in_the_background():
+    buyer = placeholder_address(5)
+    indexer = FakeIndexer([balance(HOLDER, 1)])
+    nft_repository = NFTRepository(indexer=indexer, sync_interval=0.01)
+    try:
+        assert nft_repository.nft_owner(NFT_ID) == HOLDER
+        indexer.transfers = [transfer(NFT_ID, buyer, 12)]
+
+        deadline = time.monotonic() + 5
+        while nft_repository.nft_owner(NFT_ID) != buyer and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert nft_repository.nft_owner(NFT_ID) == buyer
+        assert indexer.balance_requests == 1
+    finally:
+        nft_repository.stop()
+
+
+def test_sync_searches_the_transfers_of_each_indexed_nft_only():
+    other_nft = NFT_ID + 1
+    indexer = FakeIndexer([balance(HOLDER, 1)],
+                          transfers=[transfer(other_nft, CREATOR, 11), transfer(NFT_ID + 2, CREATOR, 11)])
+    ownership_index = OwnershipIndex(indexer)
+    ownership_index.seed([NFT_ID, other_nft])
+
+    assert ownership_index.sync() == 1
+
+    assert [search["asset_id"] for search in indexer.transaction_searches] == [NFT_ID, other_nft]
+    assert ownership_index.owner_of(other_nft) == CREATOR
+    assert ownership_index.assets_of(HOLDER) == {NFT_ID}
@@ -0,0 +1,127 @@
+import base64
+
+import msgpack
+import pytest
+from algosdk import account as algo_acc
+from algosdk import constants, encoding
+from algosdk.error import AlgodHTTPError
+from algosdk.future import transaction as algo_txn
+from nacl.signing import VerifyKey
+
+from src.blockchain_utils.offline_pipeline import BatchSubmitter, OfflineSigner, PreparedBatchWriter, read_records
+from src.blockchain_utils.signer import AddressOnlySigner
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+from src.repository.deployment_registry import ListingRecord
+from src.repository.marketplace_repository import NFTMarketplaceRepository
+from src.services.nft_marketplace import NFTMarketplace
+from src.services.nft_service import NFTService
+from src.simulation.local_ledger import LocalLedger, escrow_program
+
+Variables = NFTMarketplaceSchema.Variables
+AppState = NFTMarketplaceSchema.AppState
+
+SUGGESTED_PARAMS = algo_txn.SuggestedParams(fee=1000, first=1, last=1000, flat_fee=True,
+                                            gh="SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=")
+
+
+def listing_record(app_id: int, asa_id: int, program: bytes, owner_address: str, admin_address: str) -> ListingRecord:
+    return ListingRecord(app_id=app_id, asa_id=asa_id, escrow_program=program,
+                         escrow_address=algo_txn.LogicSig(program).address(), owner_address=owner_address,
+                         admin_address=admin_address, creator_address=owner_address, unit_name="NFT",
+                         asset_name=f"NFT {asa_id}", nft_url=None)
+
+
+def decode_signed(raw: bytes):
+    return encoding.future_msgpack_decode(base64.b64encode(raw).decode())
+
+
+def test_mint_listing_and_funding_are_prepared_without_keys_and_signed_offline(tmp_path):
+    creator_pk, creator_address = algo_acc.generate_account()
+    admin_pk, admin_address = algo_acc.generate_account()
+    creator, admin = AddressOnlySigner(creator_address), AddressOnlySigner(admin_address)
+    nft_service = NFTService(nft_creator_address=creator_address, nft_creator_pk=creator, client=None,
+                             unit_name="NFT", asset_name="NFT 11")
+    record = listing_record(10, 11, escrow_program(10), owner_address=creator_address, admin_address=admin_address)
+    nft_marketplace = NFTMarketplace.from_listing_record(record, admin_pk=admin, client=None)
+
+    unsigned_path, signed_path = str(tmp_path / "batch.unsigned"), str(tmp_path / "batch.signed")
+    with PreparedBatchWriter(unsigned_path) as batch:
+        ids = [nft_service.prepare_nft(batch, suggested_params=SUGGESTED_PARAMS),
+               nft_marketplace.prepare_setup_listing(batch, nft_creator_pk=creator,
+                                                     suggested_params=SUGGESTED_PARAMS),
+               nft_marketplace.prepare_fund_escrow(batch, suggested_params=SUGGESTED_PARAMS)]
+
+    assert ids == [0, 1, 2]
+    assert [(len(record["txns"]), record["last_valid"]) for record in read_records(unsigned_path)] == \
+        [(1, 1000), (3, 1000), (1, 1000)]
+    with pytest.raises(ValueError):
+        creator.sign(nft_service._create_nft_txn(sign_transaction=False, suggested_params=SUGGESTED_PARAMS))
+
+    signer = OfflineSigner([creator_pk, admin_pk], processes=1)
+    assert signer.sign_file(unsigned_path, signed_path) == (3, 0)
+
+    records = list(read_records(signed_path))
+    signed = [[decode_signed(raw) for raw in record["stxns"]] for record in records]
+    assert [[stxn.transaction.sender for stxn in group] for group in signed] == \
+        [[creator_address], [creator_address, admin_address, admin_address], [admin_address]]
+    assert signed[1][2].transaction.receiver == nft_marketplace.escrow_address
+    assert len({stxn.transaction.group for stxn in signed[1]}) == 1 and signed[1][0].transaction.group
+    for stxn in sum(signed, []):
+        message = constants.txid_prefix + base64.b64decode(encoding.msgpack_encode(stxn.transaction))
+        VerifyKey(encoding.decode_address(stxn.transaction.sender)).verify(message, base64.b64decode(stxn.signature))
+    assert all(record["last_valid"] == 1000 for record in records)
+
+
+@pytest.fixture
+def ledger():
+    ledger = LocalLedger(round_time=0.01)
+    ledger.start()
+    yield ledger
+    ledger.stop()
+
+
+def test_records_past_their_last_valid_round_are_not_submitted(ledger, tmp_path):
+    seller_pk, seller_address = algo_acc.generate_account()
+    _, admin_address = algo_acc.generate_account()
+    seller = AddressOnlySigner(seller_address)
+    marketplaces = []
+    for _ in range(2):
+        asa_id = ledger.create_asset(seller_address)
+        app_id, program = ledger.create_listing(asa_id, owner_address=seller_address, admin_address=admin_address)
+        record = listing_record(app_id, asa_id, program, owner_address=seller_address, admin_address=admin_address)
+        marketplaces.append(NFTMarketplace.from_listing_record(record, admin_pk=None, client=ledger))
+
+    expiring_params = ledger.suggested_params()
+    expiring_params.last = expiring_params.first
+    unsigned_path, signed_path = str(tmp_path / "offers.unsigned"), str(tmp_path / "offers.signed")
+    with PreparedBatchWriter(unsigned_path) as batch:
+        marketplaces[0].prepare_sell_offer(batch, sell_price=500, nft_owner_pk=seller)
+        marketplaces[1].prepare_sell_offer(batch, sell_price=500, nft_owner_pk=seller,
+                                           suggested_params=expiring_params)
+    OfflineSigner([seller_pk], processes=1).sign_file(unsigned_path, signed_path)
+    ledger.status_after_block(expiring_params.last)
+
+    valid, expired = BatchSubmitter(ledger, max_in_flight=2).submit_file(signed_path)
+
+    assert valid.error is None and valid.confirmed_round is not None
+    assert expired.expired and expired.tx_id is None
+    assert [NFTMarketplaceRepository.load_app_state_from_client(ledger, nft_marketplace.app_id)[Variables.app_state]
+            for nft_marketplace in marketplaces] == [AppState.selling_in_progress, AppState.active]
+
+
+class DeadTransactionClient:
+    def status(self):
+        return {"last-round": 5}
+
+    def send_raw_transaction(self, txn):
+        raise AlgodHTTPError("TransactionPool.Remember: txn dead: round 6 outside of 7--1006", 400)
+
+
+def test_records_rejected_outside_of_their_validity_window_are_marked_expired(tmp_path):
+    signed_path = str(tmp_path / "batch.signed")
+    with open(signed_path, "wb") as file:
+        file.write(msgpack.packb({"id": 0, "stxns": [b""], "last_valid": 1006}, use_bin_type=True))
+
+    result, = BatchSubmitter(DeadTransactionClient(), wait_for_confirmation=False).submit_file(signed_path)
+
+    assert result.expired and "txn dead" in result.error
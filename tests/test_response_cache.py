@@ -0,0 +1,122 @@
+import pytest
+from algosdk import account as algo_acc
+from algosdk.future import transaction as algo_txn
+
+from src.blockchain_utils import credentials
+from src.blockchain_utils.endpoint_router import EndpointRouter
+from src.blockchain_utils.response_cache import (IMMUTABLE, INDEXER_RULES, ROUND_SCOPED, CachingAlgodClient,
+                                                 ResponseCache)
+from src.services.network_interaction import NetworkInteraction
+from src.simulation.stub_node import StubNodeServer
+
+APP_ID = 7
+
+
+@pytest.fixture
+def node():
+    node = StubNodeServer(last_round=10).start()
+    yield node
+    node.stop()
+
+
+def served(node: StubNodeServer, prefix: str) -> int:
+    return sum(1 for path in node.paths if path.startswith(prefix))
+
+
+def test_response_is_stamped_with_the_round_known_before_it_was_loaded():
+    cache = ResponseCache()
+    cache.observe_round({"last-round": 10})
+
+    def load():
+        # A status answered by another thread while the application is loaded.
+        cache.observe_round({"last-round": 11})
+        return {"id": APP_ID, "params": {}}
+
+    cache.request("app", ROUND_SCOPED, load)
+    cache.request("app", ROUND_SCOPED, lambda: {"id": APP_ID, "params": {}})
+
+    assert cache.metrics.snapshot()["misses"] == {ROUND_SCOPED: 2}
+
+
+def test_response_is_stamped_with_the_round_it_reports():
+    cache = ResponseCache()
+    cache.observe_round({"last-round": 10})
+
+    cache.request("account", ROUND_SCOPED, lambda: {"address": "a", "round": 9})
+    cache.request("account", ROUND_SCOPED, lambda: {"address": "a", "round": 10})
+    cache.request("account", ROUND_SCOPED, lambda: {"address": "a", "round": 10})
+
+    assert cache.metrics.snapshot()["misses"] == {ROUND_SCOPED: 2}
+    assert cache.metrics.hit_rate(ROUND_SCOPED) == pytest.approx(1 / 3)
+
+
+def test_single_asset_lookups_are_kept_and_asset_searches_are_round_scoped():
+    assert ResponseCache.classify("GET", "/v2/assets/5", INDEXER_RULES) == IMMUTABLE
+    assert ResponseCache.classify("GET", "/v2/assets?asset-id=5", INDEXER_RULES) == ROUND_SCOPED
+
+
+def signed_payment():
+    private_key, address = algo_acc.generate_account()
+    params = algo_txn.SuggestedParams(fee=1000, first=1, last=1000, gh="SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=",
+                                      flat_fee=True)
+    return algo_txn.PaymentTxn(address, params, address, 1000).sign(private_key)
+
+
+def test_reads_cached_before_our_transaction_is_confirmed_are_loaded_again(node):
+    client = CachingAlgodClient("token", node.address)
+    signed_txn = signed_payment()
+    sender = signed_txn.transaction.sender
+
+    for _ in range(2):
+        client.account_info(sender)
+        client.application_info(APP_ID)
+    assert (served(node, "/v2/accounts/"), served(node, "/v2/applications/")) == (1, 1)
+
+    client.send_transaction(signed_txn)
+    node.confirmed[signed_txn.get_txid()] = 11
+    node.last_round = 11
+    NetworkInteraction.wait_for_confirmation(client, signed_txn.get_txid())
+
+    assert client.account_info(sender)["round"] == 11
+    client.application_info(APP_ID)
+    assert (served(node, "/v2/accounts/"), served(node, "/v2/applications/")) == (2, 2)
+
+
+def test_compiled_programs_are_cached(node):
+    client = CachingAlgodClient("token", node.address)
+
+    programs = [NetworkInteraction.compile_program(client, source) for source in ("int 1", "int 1", "int 0")]
+
+    assert programs == [b"int 1", b"int 1", b"int 0"]
+    assert served(node, "/v2/teal/compile") == 2
+    assert client.cache.metrics.snapshot()["hits"] == {IMMUTABLE: 1}
+
+
+@pytest.fixture
+def config(monkeypatch):
+    config = {"client_credentials": {"token": "token", "address": "http://localhost:4001"}}
+    monkeypatch.setattr(credentials, "load_config", lambda: config)
+    clear_shared_clients()
+    yield config
+    clear_shared_clients()
+
+
+def clear_shared_clients():
+    for shared in (credentials.get_rate_limited_client, credentials.get_routed_client, credentials.get_response_cache):
+        shared.cache_clear()
+
+
+def test_rate_limited_client_reads_through_the_shared_cache(config, node):
+    other = StubNodeServer(last_round=10).start()
+    config["algod_endpoints"] = [{"address": node.address}, {"address": other.address}]
+    client = credentials.get_rate_limited_client()
+    try:
+        assert isinstance(client.client, EndpointRouter)
+        assert {endpoint.client.cache for endpoint in client.client.endpoints} == {credentials.get_response_cache()}
+
+        for _ in range(3):
+            NetworkInteraction.compile_program(client, "int 1")
+        assert served(node, "/v2/teal/compile") + served(other, "/v2/teal/compile") == 1
+    finally:
+        client.client.stop()
+        other.stop()
@@ -0,0 +1,58 @@
+import pytest
+
+from src.marketplace_interfaces.nft_marketplace_schema import NFTMarketplaceSchema
+from src.simulation.contract_harness import MarketplaceContractHarness, placeholder_address
+from src.smart_contracts import NFTMarketplaceASC1, NFTMarketplaceASC1Optimized
+
+Variables = NFTMarketplaceSchema.Variables
+AppState = NFTMarketplaceSchema.AppState
+
+
+@pytest.fixture(scope="module", params=[NFTMarketplaceASC1, NFTMarketplaceASC1Optimized])
+def harness(request):
+    return MarketplaceContractHarness(request.param())
+
+
+def test_initialize_escrow_is_accepted_in_the_middle_of_the_setup_group(harness):
+    result = harness.evaluate_app(harness.setup_group(), index=1, global_state=harness.created_state())
+
+    assert result.approved, result.error
+    assert result.global_state[Variables.app_state.encode()] == AppState.active
+    assert result.global_state[Variables.escrow_address.encode()] == harness.global_state()[
+        Variables.escrow_address.encode()]
+
+
+def test_initialize_escrow_is_still_accepted_alone(harness):
+    result = harness.evaluate_app([harness.initialize_escrow_call()], index=0, global_state=harness.created_state())
+
+    assert result.approved, result.error
+
+
+@pytest.mark.parametrize("shape", ["first of three", "second of two", "second of four"])
+def test_initialize_escrow_is_rejected_in_any_other_group(harness, shape):
+    asset_config, app_call, funding = harness.setup_group()
+    group, index = {
+        "first of three": ([app_call, asset_config, funding], 0),
+        "second of two": ([asset_config, app_call], 1),
+        "second of four": ([asset_config, app_call, funding, funding], 1),
+    }[shape]
+
+    assert not harness.evaluate_app(group, index=index, global_state=harness.created_state()).approved
+
+
+def test_initialize_escrow_is_rejected_from_anyone_but_the_admin(harness):
+    group = harness.setup_group()
+    group[1].sender = placeholder_address(9)
+
+    assert not harness.evaluate_app(group, index=1, global_state=harness.created_state()).approved
+
+
+def test_initialize_escrow_is_rejected_once_initialized(harness):
+    assert not harness.evaluate_app(harness.setup_group(), index=1, global_state=harness.global_state()).approved
+
+
+def test_initialize_escrow_is_rejected_unless_the_clawback_is_the_escrow(harness):
+    assets = harness.asset_params(clawback_address=placeholder_address(9))
+
+    assert not harness.evaluate_app(harness.setup_group(), index=1, global_state=harness.created_state(),
+                                    assets=assets).approved
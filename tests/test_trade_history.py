@@ -0,0 +1,116 @@
+import base64
+
+import numpy as np
+import pytest
+
+from src.repository.trade_history import TradeHistory
+from src.simulation.contract_harness import placeholder_address
+
+SELLER = placeholder_address(2)
+BUYER = placeholder_address(3)
+
+
+def test_turnover_by_owner_is_exact_beyond_float_precision():
+    history = TradeHistory()
+    # 2 ** 53 + 1 is the smallest integer that a float64 cannot represent.
+    price = 2 ** 53 + 1
+    for timestamp in range(3):
+        history.add_trade(round_number=timestamp, timestamp=timestamp, app_id=1, asa_id=2, price=price,
+                          buyer=BUYER, seller=SELLER)
+
+    assert history.turnover_by_owner() == {SELLER: (3 * price, 0), BUYER: (0, 3 * price)}
+    assert history.volume() == 3 * price
+
+
+def test_turnover_by_owner_only_counts_the_window():
+    history = TradeHistory()
+    history.add_trade(round_number=1, timestamp=100, app_id=1, asa_id=2, price=5, buyer=BUYER, seller=SELLER)
+    history.add_trade(round_number=2, timestamp=200, app_id=1, asa_id=2, price=7, buyer=SELLER, seller=BUYER)
+
+    assert history.turnover_by_owner(start=150) == {BUYER: (7, 0), SELLER: (0, 7)}
+
+
+def history_of(*trades) -> TradeHistory:
+    """
+    :param trades: (timestamp, asa_id, price, amount) of each trade, in any order.
+    """
+    history = TradeHistory(initial_capacity=2)
+    for timestamp, asa_id, price, amount in trades:
+        history.add_trade(round_number=timestamp // 10, timestamp=timestamp, app_id=asa_id - 1, asa_id=asa_id,
+                          price=price, amount=amount, buyer=BUYER, seller=SELLER)
+    return history
+
+
+def test_vwap_weights_the_unit_price_by_the_amount_traded():
+    history = history_of((100, 2, 10, 1), (200, 2, 30, 2))
+
+    assert history.vwap() == pytest.approx(40 / 3)
+    assert history.vwap(start=150) == pytest.approx(15)
+    assert history.vwap(start=300) is None
+
+
+def test_floor_price_and_volume_filter_by_time_window_and_asa():
+    history = history_of((300, 4, 8, 1), (100, 2, 5, 1), (200, 2, 7, 1), (400, 2, 9, 1))
+
+    assert history.floor_price() == 5
+    # The window includes its start and excludes its end.
+    assert history.floor_price(start=200, end=400) == 7
+    assert history.floor_price(asa_ids=[4]) == 8
+    assert history.floor_price(start=200, end=400, asa_ids=[2]) == 7
+    assert history.floor_price(asa_ids=[3]) is None
+    assert history.volume(start=100, end=300, asa_ids=[2]) == 12
+
+
+def test_series_aggregates_trades_added_out_of_order_into_buckets():
+    history = history_of((150, 2, 20, 1), (10, 2, 10, 1), (90, 2, 30, 2), (260, 2, 5, 1))
+
+    series = history.series(bucket_seconds=100)
+
+    assert series["bucket_start"].tolist() == [0, 100, 200]
+    assert series["trades"].tolist() == [2, 1, 1]
+    assert series["volume"].tolist() == [40, 20, 5]
+    assert series["vwap"].tolist() == pytest.approx([40 / 3, 20, 5])
+    assert series["floor_price"].tolist() == [10, 20, 5]
+    assert history.column("timestamp").tolist() == [10, 90, 150, 260]
+    assert history.series(bucket_seconds=100, start=300)["trades"].tolist() == []
+
+
+def buy_group(price: int, asa_id: int) -> list:
+    return [{"tx-type": "appl", "sender": BUYER,
+             "application-transaction": {"application-id": asa_id - 1,
+                                         "application-args": [base64.b64encode(b"buy").decode()]}},
+            {"tx-type": "pay", "sender": BUYER, "payment-transaction": {"amount": price, "receiver": SELLER}},
+            {"tx-type": "axfer", "sender": placeholder_address(4),
+             "asset-transfer-transaction": {"asset-id": asa_id, "amount": 1, "receiver": BUYER}}]
+
+
+def test_only_buy_groups_are_ingested():
+    history = TradeHistory()
+
+    assert history.ingest_group(buy_group(price=500, asa_id=2), round_number=10, timestamp=1000)
+    assert not history.ingest_group(buy_group(price=500, asa_id=2)[1:], round_number=11, timestamp=1010)
+
+    assert len(history) == 1
+    assert (history.column("app_id")[0], history.column("asa_id")[0], history.column("price")[0]) == (1, 2, 500)
+    assert history.turnover_by_owner() == {SELLER: (500, 0), BUYER: (0, 500)}
+
+
+def test_saved_history_is_loaded_memory_mapped_and_accepts_new_trades(tmp_path):
+    directory = str(tmp_path / "trades")
+    history_of((100, 2, 5, 1), (200, 2, 7, 1), (300, 4, 8, 1)).save(directory)
+
+    loaded = TradeHistory.load(directory)
+    assert isinstance(loaded.column("price"), np.memmap)
+    assert not loaded.column("price").flags.writeable
+    assert (len(loaded), loaded.floor_price(start=150), loaded.vwap()) == (3, 7, pytest.approx(20 / 3))
+
+    newcomer = placeholder_address(5)
+    loaded.add_trade(round_number=5, timestamp=50, app_id=1, asa_id=2, price=3, buyer=newcomer, seller=SELLER)
+
+    assert len(loaded) == 4
+    assert loaded.column("timestamp").tolist() == [50, 100, 200, 300]
+    assert loaded.floor_price() == 3
+    assert loaded.turnover_by_owner()[newcomer] == (0, 3)
+    # The saved files are left untouched.
+    assert len(TradeHistory.load(directory)) == 3
+    assert TradeHistory.load(directory, mmap=False).column("price").tolist() == [5, 7, 8]